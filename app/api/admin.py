@@ -0,0 +1,90 @@
+from fastapi import APIRouter, HTTPException, Header, Query, status
+from fastapi.responses import PlainTextResponse
+import asyncio
+import hmac
+import logging
+from app.config import get_settings
+from app.services.profiler import sample_stacks, collapsed, request_gate, request_profiles
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+def admin_token_ok(admin_token: str) -> bool:
+    """Constant-time check against PROFILING_ADMIN_TOKEN; an unset token grants nothing"""
+    expected = get_settings().PROFILING_ADMIN_TOKEN
+    if not expected or not admin_token:
+        return False
+    return hmac.compare_digest(admin_token.encode(), expected.encode())
+
+def _check_access(admin_token: str):
+    settings = get_settings()
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling disabled")
+    if not settings.PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="PROFILING_ADMIN_TOKEN is not set")
+    if not admin_token_ok(admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+async def profile_request(request, call_next):
+    """
+    HTTP middleware: deterministic profile of requests sent with X-VerifAI-Profile: 1 and the admin token
+
+    cProfile records everything the event loop runs, so while a request is
+    profiled the others are held back: it waits for the requests in flight
+    to finish (up to PROFILING_DRAIN_SECONDS) and new ones wait until it is
+    done. Profiled requests queue behind each other. The report header says
+    what may still be mixed in.
+    """
+    wants_profile = request.headers.get("x-verifai-profile") == "1"
+    if not wants_profile or not admin_token_ok(request.headers.get("x-admin-token", "")):
+        await request_gate.enter()
+        try:
+            return await call_next(request)
+        finally:
+            request_gate.leave()
+
+    await request_gate.wait_open()
+    still_running = await request_gate.close(get_settings().PROFILING_DRAIN_SECONDS)
+    profile = request_profiles.start()
+    if profile is None:
+        request_gate.open()
+        return await call_next(request)
+
+    header = f"# {request.method} {request.url.path}: other requests held while profiled; background loop tasks included\n"
+    if still_running:
+        header += f"# WARNING: {still_running} earlier request(s) were still running and are included\n"
+    try:
+        response = await call_next(request)
+    finally:
+        profile_id = request_profiles.finish(profile, header)
+        request_gate.open()
+    response.headers["X-VerifAI-Profile-Id"] = profile_id
+    return response
+
+@router.get("/profile/sample", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, gt=0),
+    x_admin_token: str = Header(default="")
+):
+    """
+    Sample every thread of this worker for N seconds.
+    Returns collapsed stacks (feed to flamegraph.pl or speedscope).
+    """
+    _check_access(x_admin_token)
+    seconds = min(seconds, get_settings().PROFILING_MAX_SECONDS)
+
+    logger.info("Sampling profiler running for %.1fs", seconds)
+    loop = asyncio.get_running_loop()
+    stacks = await loop.run_in_executor(None, sample_stacks, seconds, interval_ms / 1000)
+    return PlainTextResponse(collapsed(stacks))
+
+@router.get("/profile/requests/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(profile_id: str, x_admin_token: str = Header(default="")):
+    """cProfile report of a request sent with the X-VerifAI-Profile header"""
+    _check_access(x_admin_token)
+
+    report = request_profiles.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(report)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Query
+import logging
+from app.services.rollups import get_rollup_store
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
+
+# Longest window the hourly rollups can answer (30 days)
+MAX_WINDOW_MINUTES = 43200
+
+@router.get("/decisions")
+async def decisions_over_time(
+    window_minutes: int = Query(60, ge=1, le=MAX_WINDOW_MINUTES),
+    max_points: int = Query(120, ge=1, le=2000)
+):
+    """Decisions per time bucket; long windows are downsampled to max_points"""
+    return get_rollup_store().decision_series(window_minutes * 60, max_points)
+
+@router.get("/scores")
+async def fraud_score_distribution(window_minutes: int = Query(60, ge=1, le=MAX_WINDOW_MINUTES)):
+    """Fraud score histogram (20 bins over 0-1)"""
+    return get_rollup_store().score_histogram(window_minutes * 60)
+
+@router.get("/categories")
+async def category_totals(window_minutes: int = Query(60, ge=1, le=MAX_WINDOW_MINUTES)):
+    """Per merchant category: count, amount, blocked, average score"""
+    return {'categories': get_rollup_store().category_totals(window_minutes * 60)}
+
+@router.get("/merchants/top")
+async def top_risky_merchants(
+    window_minutes: int = Query(60, ge=1, le=MAX_WINDOW_MINUTES),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Merchants with the most blocked transactions, then the highest average score"""
+    return {'merchants': get_rollup_store().top_merchants(window_minutes * 60, limit)}
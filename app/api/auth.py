@@ -5,6 +5,7 @@ from app.database import get_db
 from app.models import User, VerificationToken, VerificationTokenType
 from app.services.auth_service import AuthService
 from app.services.email_service import EmailService
+from app.services.audit_sink import get_audit_sink
 from datetime import datetime, timedelta
 import logging
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -149,6 +150,7 @@ async def signup(
         )
         
         logger.info(f"✅ User registered: {user.email}")
+        get_audit_sink().emit("signup", "info", "User registered", user_id=user.id)
         
         # Return tokens
         tokens = auth_service.create_token_pair(user.id, user.email)
@@ -177,6 +179,10 @@ async def login(
     # Find user
     user = db.query(User).filter(User.email == request.email).first()
     if not user or not auth_service.verify_password(request.password, user.password_hash):
+        get_audit_sink().emit(
+            "login_failed", "warning", "Invalid email or password",
+            user_id=user.id if user else None
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -185,6 +191,7 @@ async def login(
     # Check if account is locked
     if user.is_account_locked:
         if user.locked_until and datetime.utcnow() < user.locked_until:
+            get_audit_sink().emit("login_blocked", "warning", "Login attempt on locked account", user_id=user.id)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Account locked until {user.locked_until}"
@@ -199,6 +206,7 @@ async def login(
     db.commit()
     
     logger.info(f"✅ User logged in: {user.email}")
+    get_audit_sink().emit("login", "info", "User logged in", user_id=user.id)
     
     # Return tokens
     tokens = auth_service.create_token_pair(user.id, user.email)
@@ -281,6 +289,7 @@ async def verify_email(
     db.commit()
     
     logger.info(f"✅ Email verified: {user.email}")
+    get_audit_sink().emit("email_verified", "info", "Email verified", user_id=user.id)
     
     return {"message": "Email verified successfully"}
 
@@ -323,6 +332,7 @@ async def forgot_password(
         )
         
         logger.info(f"✅ Password reset email sent: {user.email}")
+        get_audit_sink().emit("password_reset_requested", "info", "Password reset requested", user_id=user.id)
         
         return {"message": "If email exists, reset link will be sent"}
     
@@ -363,5 +373,6 @@ async def reset_password(
     db.commit()
     
     logger.info(f"✅ Password reset: {user.email}")
+    get_audit_sink().emit("password_reset", "warning", "Password changed via reset token", user_id=user.id)
     
     return {"message": "Password reset successfully"}
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Request/response codec for the transaction endpoints
+
+JSON bodies are parsed and validated in one pass by pydantic-core
+(model_validate_json) instead of json.loads followed by model validation,
+and responses are encoded with orjson directly, skipping FastAPI's
+jsonable_encoder walk. Internal callers may send and/or accept
+application/x-msgpack instead of JSON (requires the msgpack package).
+"""
+
+import json
+from functools import lru_cache
+
+from fastapi import HTTPException, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+@lru_cache()
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+def wants_msgpack(header_value: str) -> bool:
+    return MSGPACK_MEDIA_TYPE in (header_value or "")
+
+def request_body_schema(model) -> dict:
+    """openapi_extra for routes that read the raw body instead of a model parameter"""
+    schema = {"schema": model.model_json_schema()}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": schema, MSGPACK_MEDIA_TYPE: schema},
+        }
+    }
+
+def decode_body(model, body: bytes, content_type: str) -> BaseModel:
+    """Parse and validate a request body; errors surface as FastAPI's usual 422"""
+
+    try:
+        if wants_msgpack(content_type):
+            msgpack = _msgpack()
+            if msgpack is None:
+                raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+            try:
+                data = msgpack.unpackb(body, raw=False, timestamp=3)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid MessagePack body: {e}")
+            return model.model_validate(data)
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        errors = [
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False, include_context=False)
+        ]
+        raise RequestValidationError(errors, body=body)
+
+def dumps_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=str, separators=(",", ":")).encode("utf-8")
+
+def encode_response(content, accept: str = "", headers: dict = None) -> Response:
+    """Encode a plain dict result; MessagePack only when the caller accepts it and it is installed"""
+
+    msgpack = _msgpack() if wants_msgpack(accept) else None
+    if msgpack is not None:
+        return Response(msgpack.packb(content, default=str), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    return Response(dumps_json(content), media_type="application/json", headers=headers)
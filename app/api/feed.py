@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import logging
+from app.api.codec import dumps_json
+from app.config import get_settings
+from app.services.decision_feed import SlowConsumer, get_decision_feed
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/v1/feed", tags=["feed"])
+
+def _csv_set(value: Optional[str]):
+    if not value:
+        return None
+    return frozenset(item.strip().upper() for item in value.split(",") if item.strip())
+
+def _sse(event) -> bytes:
+    if event.encoded is None:
+        event.encoded = b"id: %d\ndata: %s\n\n" % (event.seq, dumps_json(event.data))
+    return event.encoded
+
+@router.get("/decisions")
+async def decision_feed(
+    decision: Optional[str] = Query(None, description="Comma-separated decisions, e.g. BLOCKED,HOLD"),
+    risk_level: Optional[str] = Query(None, description="Comma-separated risk levels, e.g. CRITICAL,MEDIUM"),
+    min_score: float = Query(0.0, ge=0.0, le=1.0),
+    last_event_id: Optional[int] = Header(None)
+):
+    """Server-Sent Events stream of scoring decisions, filtered server side"""
+
+    feed = get_decision_feed()
+    if feed.full:
+        raise HTTPException(status_code=503, detail="Too many feed subscribers", headers={"Retry-After": "5"})
+    keepalive = get_settings().FEED_KEEPALIVE_SECONDS
+    decisions, risk_levels = _csv_set(decision), _csv_set(risk_level)
+
+    async def stream():
+        # Subscribed only once the body is actually being sent: a client gone before
+        # the first chunk never starts the generator, so its finally would never run
+        subscription = feed.subscribe(decisions, risk_levels, min_score, last_event_id)
+        if subscription is None:
+            yield b"event: dropped\ndata: %s\n\n" % dumps_json({'reason': "too many feed subscribers"})
+            return
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                if not await feed.wait(subscription, keepalive):
+                    yield b": keepalive\n\n"
+                    continue
+                try:
+                    events = feed.read(subscription)
+                except SlowConsumer as e:
+                    yield b"event: dropped\ndata: %s\n\n" % dumps_json({'reason': str(e)})
+                    return
+                chunks = [_sse(event) for event in events]
+                if subscription.missed:
+                    chunks.insert(0, b"event: gap\ndata: %s\n\n" % dumps_json({'missed': subscription.missed}))
+                    subscription.missed = 0
+                if chunks:
+                    yield b"".join(chunks)
+        finally:
+            feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
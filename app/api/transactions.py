@@ -1,17 +1,25 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from typing import Optional
 import uuid
 import logging
-from app.services.agent import AgentController
+from app.services.agent_runtime import get_agent, record_unscored_decision
+from app.api.codec import decode_body, encode_response, request_body_schema
+from app.config import get_settings
+from app.services.admission import AdmissionRejected, deadline_from_budget, get_admission_controller
+from app.services.idempotency import get_idempotency_cache, request_fingerprint, IdempotencyConflict
 from app.models.schemas import TransactionRequest, TransactionResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["transactions"])
 
-# Initialize agent
-agent = AgentController()
-
-@router.post("/transactions/process", response_model=dict)
-async def process_transaction(request: TransactionRequest):
+@router.post("/transactions/process", response_model=dict, openapi_extra=request_body_schema(TransactionRequest))
+async def process_transaction(
+    http_request: Request,
+    explain: bool = False,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    deadline_ms: Optional[int] = Header(default=None, alias="X-Deadline-Ms"),
+    agent=Depends(get_agent)
+):
     """
     Main endpoint - Process a transaction through VerifAI
     
@@ -25,32 +33,76 @@ async def process_transaction(request: TransactionRequest):
         "device_ip": "192.168.1.100",
         "user_location": {"lat": 19.0760, "lon": 72.8777}
     }
+    
+    HOLD/BLOCK responses include the top contributing features;
+    pass ?explain=true to get them for approvals too.
+    
+    Retries carrying the same Idempotency-Key get the stored decision back
+    (marked with an Idempotent-Replayed header) instead of being rescored.
+    
+    Bodies may be JSON or application/x-msgpack; send
+    Accept: application/x-msgpack to get a MessagePack response.
+    
+    X-Deadline-Ms is the caller's remaining budget. When scoring capacity
+    cannot serve the request in time it gets a MANUAL_REVIEW decision
+    (or a 503, with ADMISSION_SHED_MODE=reject) instead of waiting.
+    The deadline bounds queueing only: an admitted scoring always runs to
+    completion (cancelling it mid-LEARN would leave history, velocity and
+    the device index half-updated), so a response can still arrive after
+    the deadline by up to one scoring time.
     """
     
+    deadline = deadline_from_budget(deadline_ms)
+    request = decode_body(TransactionRequest, await http_request.body(), http_request.headers.get("content-type"))
+    accept = http_request.headers.get("accept")
+    
     try:
-        # Convert request to dict
-        tx_dict = request.dict()
-        tx_dict['id'] = str(uuid.uuid4())
+        tx_dict = request.model_dump()
         
-        # Add mock fields - Dynamic for demo purposes
-        if tx_dict['amount'] > 10000:
-            tx_dict['location_distance'] = 2500  # Far away
-            tx_dict['transactions_today'] = 15   # Velocity attack
-            tx_dict['is_new_device'] = True      # New device
-        else:
-            tx_dict['location_distance'] = 10
-            tx_dict['transactions_today'] = 1
-            tx_dict['is_new_device'] = False
+        async def score():
+            tx_dict['id'] = str(uuid.uuid4())
+            return await get_admission_controller().run(
+                lambda: agent.process_transaction(tx_dict, explain=explain), deadline
+            )
         
-        # Process through agent
-        result = await agent.process_transaction(tx_dict)
+        if not idempotency_key:
+            return encode_response(await score(), accept)
         
-        return result
+        # Keys are scoped per user so two clients cannot collide
+        result, replayed = await get_idempotency_cache().get_or_compute(
+            f"{request.user_id}:{idempotency_key}",
+            # explain changes the stored response, so it is part of what the key stands for
+            request_fingerprint(request.model_dump(), {'explain': explain}),
+            score
+        )
+        headers = {"Idempotent-Replayed": "true"} if replayed else None
+        return encode_response(result, accept, headers)
     
+    except AdmissionRejected as e:
+        if get_settings().ADMISSION_SHED_MODE == "reject":
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        result = degraded_decision(tx_dict['id'], e.reason)
+        record_unscored_decision(result, tx_dict)
+        return encode_response(result, accept)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing transaction: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def degraded_decision(tx_id: str, reason: str) -> dict:
+    """Unscored fallback when admission control sheds a request"""
+    return {
+        'transaction_id': tx_id,
+        'fraud_score': None,
+        'risk_level': 'UNKNOWN',
+        'decision': 'MANUAL_REVIEW',
+        'reason': f"Scoring capacity exceeded ({reason}); queued for manual review",
+        'actions': ['🕒 MANUAL_REVIEW_QUEUED'],
+        'requires_confirmation': True,
+        'degraded': True
+    }
+
 @router.get("/transactions/status/{transaction_id}")
 async def get_status(transaction_id: str):
     """Get transaction status"""
@@ -63,8 +115,21 @@ async def get_status(transaction_id: str):
         "message": "Status retrieved successfully"
     }
 
+@router.get("/transactions/explain/{transaction_id}")
+async def get_explanation(transaction_id: str, agent=Depends(get_agent)):
+    """Cached feature contributions for a recently scored transaction"""
+    
+    explanation = agent.explainer.get(transaction_id) if agent.explainer else None
+    if explanation is None:
+        raise HTTPException(status_code=404, detail="No explanation cached for this transaction")
+    
+    return {
+        "transaction_id": transaction_id,
+        "explanation": explanation
+    }
+
 @router.post("/transactions/verify/{transaction_id}")
-async def verify_transaction(transaction_id: str, user_confirmed: bool):
+async def verify_transaction(transaction_id: str, user_confirmed: bool, agent=Depends(get_agent)):
     """
     User confirms or denies WhatsApp verification
     This triggers the LEARN phase
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
+import asyncio
 import uuid
 import logging
+from app.services.profile_store import get_profile_store
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["users"])
@@ -30,14 +32,20 @@ async def register_user(request: dict):
 
 @router.get("/users/{user_id}")
 async def get_user_profile(user_id: str):
-    """Get user profile"""
+    """Get the user's behavioral profile (materialized as transactions are scored)"""
     
-    return {
-        'user_id': user_id,
-        'avg_transaction_amount': 5000.0,
-        'typical_daily_frequency': 2,
-        'typical_locations': [
-            {'lat': 19.0760, 'lon': 72.8777}
-        ],
-        'last_updated': '2025-12-04T14:00:00'
-    }
+    store = get_profile_store()
+    profile = store.peek(user_id)
+    if profile is None:
+        try:
+            profile = await asyncio.get_running_loop().run_in_executor(None, store.load, user_id)
+        except Exception as e:
+            logger.error(f"Error loading profile for {user_id}: {e}")
+            # Serve what this worker has seen rather than nothing
+            profile = store.peek(user_id, partial=True)
+            if profile is None:
+                raise HTTPException(status_code=503, detail="Profile store unavailable")
+    
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile for this user yet")
+    return profile
@@ -21,6 +21,11 @@ class Settings(BaseSettings):
     # Fraud Detection Thresholds
     FRAUD_HIGH_RISK_THRESHOLD: float = 0.80
     FRAUD_MEDIUM_RISK_THRESHOLD: float = 0.50
+    FRAUD_LOW_RISK_THRESHOLD: float = 0.20
+    
+    # Decision policy rule table (JSON, hot-reloaded; empty = thresholds only)
+    POLICY_RULES_PATH: str = ""
+    POLICY_RELOAD_INTERVAL_SECONDS: float = 5.0
     
     # ML Model Path
     ML_MODEL_PATH: str = "app/ml/models/xgboost_fraud_model.pkl"
@@ -38,6 +43,104 @@ class Settings(BaseSettings):
 
     # Logo URL (GitHub raw or CDN)
     LOGO_URL: str = "https://raw.githubusercontent.com/ethancodes-6969/VerifAI-AgenticAI/main/assets/verifai-logo.png"
+
+    # Maintenance (token purge / audit-log archival)
+    MAINTENANCE_ENABLED: bool = False
+    MAINTENANCE_INTERVAL_SECONDS: int = 3600
+    MAINTENANCE_BATCH_SIZE: int = 500
+    MAINTENANCE_MAX_BATCHES: int = 200
+    AUDIT_LOG_RETENTION_DAYS: int = 90
+    AUDIT_ARCHIVE_DIR: str = "data/audit_archive"
+
+    # Audit event sink (batched AuditLog writer)
+    AUDIT_SINK_BATCH_SIZE: int = 500
+    AUDIT_SINK_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_SINK_SLOW_THRESHOLD_MS: int = 500
+    AUDIT_SINK_RECOVERY_INTERVAL_SECONDS: int = 30
+    AUDIT_SINK_MAX_QUEUE: int = 100000
+    AUDIT_SINK_SPILL_PATH: str = "data/audit_spill.jsonl"
+
+    # Scoring cascade: linear pre-screen approves clear low-risk transactions before XGBoost
+    CASCADE_ENABLED: bool = False
+    CASCADE_MODEL_PATH: str = "app/ml/models/cascade.pkl"
+
+    # Explanations (TreeSHAP top features) for HOLD/BLOCK decisions
+    EXPLAIN_NON_APPROVED: bool = True
+
+    # Idempotency-Key result cache
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 100000
+    IDEMPOTENCY_REDIS_ENABLED: bool = False
+
+    # Admission control for /transactions/process
+    ADMISSION_MAX_IN_FLIGHT: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_DEFAULT_BUDGET_MS: int = 2000  # when the client sends no X-Deadline-Ms
+    ADMISSION_MAX_BUDGET_MS: int = 30000
+    ADMISSION_SHED_MODE: str = "degrade"  # degrade (MANUAL_REVIEW) | reject (503)
+
+    # Client-supplied event time (TransactionRequest.timestamp) must fall in this window
+    EVENT_TIME_MAX_SKEW_SECONDS: int = 300
+    EVENT_TIME_MAX_AGE_SECONDS: int = 30 * 86400
+
+    # Durable per-user state: periodic snapshots + LEARN journal, restored at startup
+    STATE_SNAPSHOT_ENABLED: bool = False
+    STATE_SNAPSHOT_DIR: str = "data/state"
+    STATE_SNAPSHOT_INTERVAL_SECONDS: int = 300
+    STATE_JOURNAL_FLUSH_SECONDS: float = 1.0
+
+    # Materialized user profiles (GET /api/v1/users/{user_id})
+    PROFILES_ENABLED: bool = True
+    PROFILE_CACHE_MAX_ENTRIES: int = 100000
+    PROFILE_FLUSH_INTERVAL_MS: int = 1000
+    PROFILE_RETRY_INTERVAL_SECONDS: int = 30
+    PROFILE_MAX_LOCATIONS: int = 3
+
+    # Dashboard analytics rollups (GET /api/v1/analytics/*)
+    ROLLUPS_ENABLED: bool = True
+    ROLLUP_MINUTE_BUCKETS: int = 1440  # one day of per-minute buckets
+    ROLLUP_HOUR_BUCKETS: int = 720  # 30 days of per-hour buckets
+    ROLLUP_MAX_MERCHANTS_PER_BUCKET: int = 500
+
+    # Live decision feed (GET /api/v1/feed/decisions, Server-Sent Events)
+    FEED_ENABLED: bool = True
+    FEED_BUFFER_SIZE: int = 4096
+    FEED_TICK_MS: int = 100  # subscribers are woken at most this often
+    FEED_MAX_SUBSCRIBERS: int = 1000
+    FEED_SLOW_CONSUMER: str = "skip"  # skip (jump ahead, send a gap event) | drop (disconnect)
+    FEED_KEEPALIVE_SECONDS: int = 15
+
+    # User-affinity sharding: >0 scores in that many worker processes, users consistent-hashed to one
+    SHARD_WORKERS: int = 0
+
+    # Streaming consumer (python -m app.consumer)
+    STREAM_SOURCE: str = "file"  # file | kafka
+    STREAM_INPUT_PATH: str = "data/stream/transactions.jsonl"
+    STREAM_OUTPUT_PATH: str = "data/stream/decisions.jsonl"
+    STREAM_BATCH_SIZE: int = 256
+    STREAM_MAX_IN_FLIGHT: int = 64
+    STREAM_POLL_TIMEOUT_MS: int = 500
+    KAFKA_BOOTSTRAP_SERVERS: str = "localhost:9092"
+    KAFKA_INPUT_TOPIC: str = "verifai.transactions"
+    KAFKA_OUTPUT_TOPIC: str = "verifai.decisions"
+    KAFKA_GROUP_ID: str = "verifai-scoring"
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # text | json
+    LOG_ASYNC: bool = True
+    LOG_SAMPLE_RATE_APPROVED: float = 0.01
+    LOG_SAMPLE_RATE_HOLD: float = 1.0
+    LOG_SAMPLE_RATE_BLOCKED: float = 1.0
+
+    # Profiling (admin endpoints + X-VerifAI-Profile header)
+    PROFILING_ENABLED: bool = False
+    PROFILING_ADMIN_TOKEN: str = ""  # required: profiling is refused while empty
+    PROFILING_MAX_SECONDS: int = 60
+    PROFILING_DRAIN_SECONDS: float = 5.0  # wait for in-flight requests before profiling one
+
+    # Device index
+    DEVICE_INDEX_WARM_ON_STARTUP: bool = True
     
     class Config:
         env_file = ".env"
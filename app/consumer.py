@@ -0,0 +1,80 @@
+"""
+Long-running stream consumer: score transactions from a queue instead of HTTP
+
+    python -m app.consumer                       # JSONL file -> JSONL file (STREAM_* settings)
+    python -m app.consumer --follow              # keep tailing the input file
+    python -m app.consumer --source kafka        # KAFKA_* settings, needs aiokafka
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.config import get_settings
+from app.logging_config import configure_logging
+from app.services.agent_runtime import get_agent
+from app.services.audit_sink import get_audit_sink
+from app.services.profile_store import get_profile_store
+from app.services.streaming import FileSink, FileSource, KafkaSink, KafkaSource, StreamConsumer
+
+logger = logging.getLogger(__name__)
+
+def build_endpoints(source_kind: str, follow: bool):
+    settings = get_settings()
+    if source_kind == "kafka":
+        return (
+            KafkaSource(settings.KAFKA_BOOTSTRAP_SERVERS, settings.KAFKA_INPUT_TOPIC, settings.KAFKA_GROUP_ID),
+            KafkaSink(settings.KAFKA_BOOTSTRAP_SERVERS, settings.KAFKA_OUTPUT_TOPIC),
+        )
+    return FileSource(settings.STREAM_INPUT_PATH, follow=follow), FileSink(settings.STREAM_OUTPUT_PATH)
+
+async def run(source_kind: str, follow: bool):
+    settings = get_settings()
+    agent = get_agent()
+    agent.warm_up()
+
+    source, sink = build_endpoints(source_kind, follow)
+    consumer = StreamConsumer(
+        agent, source, sink,
+        batch_size=settings.STREAM_BATCH_SIZE,
+        max_in_flight=settings.STREAM_MAX_IN_FLIGHT,
+        poll_timeout_ms=settings.STREAM_POLL_TIMEOUT_MS,
+    )
+
+    # Finish the current batch (and its commit) before exiting
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    snapshots = getattr(agent, "snapshots", None)
+    snapshot_task = asyncio.create_task(snapshots.run_forever()) if snapshots is not None else None
+
+    try:
+        await consumer.run_forever(stop)
+    finally:
+        if snapshot_task is not None:
+            snapshot_task.cancel()
+            snapshots.close()
+        await source.close()
+        await sink.close()
+        close_agent = getattr(agent, "close", None)
+        if close_agent is not None:
+            close_agent()
+        get_audit_sink().close()
+        if get_profile_store.cache_info().currsize:
+            get_profile_store().close()
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Score transactions from a stream")
+    parser.add_argument("--source", choices=["file", "kafka"], default=settings.STREAM_SOURCE)
+    parser.add_argument("--follow", action="store_true", help="Keep tailing the input file")
+    args = parser.parse_args()
+
+    configure_logging()
+    asyncio.run(run(args.source, args.follow))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+
+from app.config import get_settings
+
+_listener = None
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+def configure_logging():
+    """
+    Configure root logging once per process
+
+    Records go through a QueueHandler so the request path only enqueues;
+    a QueueListener thread formats and writes them. LOG_FORMAT=json emits
+    one JSON object per line, including any `extra=` fields.
+    """
+
+    global _listener
+    if _listener is not None:
+        return
+
+    settings = get_settings()
+
+    if settings.LOG_FORMAT == "json":
+        from pythonjsonlogger import jsonlogger
+        formatter = jsonlogger.JsonFormatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if settings.LOG_ASYNC:
+        log_queue = queue.SimpleQueue()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener, _listener)
+    else:
+        root.addHandler(stream_handler)
+        _listener = stream_handler
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    """Flush and stop a listener at exit, unless it was already stopped"""
+    if listener._thread is not None:
+        listener.stop()
+
+def reset_after_fork():
+    """
+    Rebuild logging in a forked child (gunicorn preload, shard workers)
+
+    The child inherits the root QueueHandler but not the listener thread,
+    so without this every record would sit in a queue nobody drains.
+    """
+
+    global _listener
+    if _listener is None:
+        return
+    _listener = None
+    configure_logging()
+
+class DecisionLogSampler:
+    """Decides which scored transactions get a log line, by decision"""
+
+    def __init__(self, rates: dict = None):
+        if rates is None:
+            settings = get_settings()
+            rates = {
+                "APPROVED": settings.LOG_SAMPLE_RATE_APPROVED,
+                "HOLD": settings.LOG_SAMPLE_RATE_HOLD,
+                "BLOCKED": settings.LOG_SAMPLE_RATE_BLOCKED,
+            }
+        self.rates = rates
+
+    def should_log(self, decision: str) -> bool:
+        rate = self.rates.get(decision, 1.0)
+        return rate >= 1.0 or random.random() < rate
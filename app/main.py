@@ -1,13 +1,64 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+import asyncio
 import logging
+from app.config import get_settings
+from app.logging_config import configure_logging
 
 # Import routers
-from app.api import transactions, users, auth, demo
+from app.api import transactions, users, auth, demo, admin, analytics, feed
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Lifespan: heavy ML imports and model loading happen here, not at import
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("✅ VerifAI starting up...")
+    logger.info("📚 API Docs: http://localhost:8000/docs")
+    logger.info("🔍 ReDoc: http://localhost:8000/redoc")
+    
+    from app.services.agent_runtime import get_agent
+    loop = asyncio.get_running_loop()
+    agent = await loop.run_in_executor(None, get_agent)
+    await loop.run_in_executor(None, agent.warm_up)
+    
+    background_tasks = []
+    if settings.MAINTENANCE_ENABLED:
+        from app.services.maintenance import MaintenanceService
+        background_tasks.append(asyncio.create_task(MaintenanceService().run_forever()))
+        logger.info("🧹 Maintenance job scheduled")
+    
+    snapshots = getattr(agent, "snapshots", None)
+    if snapshots is not None:
+        background_tasks.append(asyncio.create_task(snapshots.run_forever()))
+    
+    yield
+    
+    logger.info("👋 VerifAI shutting down...")
+    
+    for task in background_tasks:
+        task.cancel()
+    
+    if snapshots is not None:
+        snapshots.close()
+    
+    # Sharded scoring: let worker processes finish queued work
+    close_agent = getattr(agent, "close", None)
+    if close_agent is not None:
+        await loop.run_in_executor(None, close_agent)
+    
+    from app.services.audit_sink import get_audit_sink
+    if get_audit_sink.cache_info().currsize:
+        get_audit_sink().close()
+    
+    from app.services.profile_store import get_profile_store
+    if get_profile_store.cache_info().currsize:
+        get_profile_store().close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -15,7 +66,8 @@ app = FastAPI(
     description="Real-time autonomous fraud detection and prevention",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -32,6 +84,15 @@ app.include_router(transactions.router)
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(demo.router)
+app.include_router(admin.router)
+app.include_router(analytics.router)
+app.include_router(feed.router)
+
+# Per-request deterministic profiling (opt-in, header driven, admin token required)
+if settings.PROFILING_ENABLED:
+    if not settings.PROFILING_ADMIN_TOKEN:
+        logger.warning("PROFILING_ENABLED without PROFILING_ADMIN_TOKEN: profiling endpoints will refuse every request")
+    app.middleware("http")(admin.profile_request)
 
 # Root endpoint
 @app.get("/")
@@ -52,17 +113,11 @@ async def health_check():
         "message": "VerifAI is running"
     }
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("✅ VerifAI starting up...")
-    logger.info("📚 API Docs: http://localhost:8000/docs")
-    logger.info("🔍 ReDoc: http://localhost:8000/redoc")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("👋 VerifAI shutting down...")
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    from app.services.metrics import REGISTRY
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
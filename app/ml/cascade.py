@@ -0,0 +1,64 @@
+"""
+Cost-aware scoring cascade: a linear pre-screen in front of the booster
+
+Stage 1 is a logistic regression over FEATURE_COLUMNS with the scaler
+folded into its weights, so scoring is one dot product on raw features.
+Transactions it scores below `approve_below` are approved without calling
+the scaler or XGBoost; the rest go on to the full model.
+
+`approve_below` is calibrated at training time so that at least
+`target_recall` of known frauds score above it, i.e. the pre-screen
+alone may let through at most (1 - target_recall) of them. It is capped
+at FRAUD_LOW_RISK_THRESHOLD so a short-circuited score always reads as
+MINIMAL risk and can never reach the HOLD/BLOCK thresholds.
+"""
+
+import numpy as np
+
+from app.config import get_settings
+from app.ml.feature_engineering import FEATURE_COLUMNS
+
+class PreScreen:
+    def __init__(self, weights: np.ndarray, bias: float, approve_below: float):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.approve_below = float(approve_below)
+        self.feature_columns = list(FEATURE_COLUMNS)
+
+    @classmethod
+    def fit(cls, X_scaled: np.ndarray, y: np.ndarray, scaler, target_recall: float = 0.995, max_approve_below: float = None) -> "PreScreen":
+        """Fit on scaled features (as the booster is) and fold the scaler into raw-feature weights"""
+
+        from sklearn.linear_model import LogisticRegression
+
+        model = LogisticRegression(max_iter=1000)
+        model.fit(X_scaled, y)
+
+        coef = model.coef_[0]
+        scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_)
+        weights = coef / scale
+        bias = model.intercept_[0] - float(np.sum(coef * scaler.mean_ / scale))
+
+        if max_approve_below is None:
+            max_approve_below = get_settings().FRAUD_LOW_RISK_THRESHOLD
+        screen = cls(weights, bias, approve_below=0.0)
+        calibrated = screen.calibrate(X_scaled * scale + scaler.mean_, y, target_recall)
+        screen.approve_below = min(calibrated, max_approve_below)
+        return screen
+
+    def calibrate(self, X_raw: np.ndarray, y: np.ndarray, target_recall: float) -> float:
+        """Highest threshold that still passes `target_recall` of the positives to stage 2"""
+        fraud_scores = np.sort(self.score(X_raw[np.asarray(y) == 1]))
+        if len(fraud_scores) == 0:
+            return 0.0
+        allowed_misses = int(np.floor(len(fraud_scores) * (1 - target_recall)))
+        return float(fraud_scores[allowed_misses])
+
+    def score(self, X_raw: np.ndarray) -> np.ndarray:
+        """Stage-1 fraud probability for each row of raw FEATURE_COLUMNS values"""
+        logits = np.asarray(X_raw, dtype=np.float64) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -500, 500)))
+
+    def short_circuit(self, X_raw: np.ndarray) -> np.ndarray:
+        """Mask of rows that are approved at stage 1"""
+        return self.score(X_raw) < self.approve_below
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import List, Optional
+import pandas as pd
+from app.ml.feature_engineering import FEATURE_COLUMNS
+
+class Explainer:
+    """
+    Per-transaction feature contributions (TreeSHAP)
+
+    Uses the booster's native pred_contribs, which returns exact TreeSHAP
+    values in log-odds space. A call scores a whole batch in one predict,
+    and results are cached by transaction ID for later lookups; rows
+    without an ID (None) are computed every time and never cached.
+    """
+
+    def __init__(self, model, scaler, top_k: int = 5, cache_size: int = 10000):
+        self.booster = model.get_booster()
+        self.scaler = scaler
+        self.top_k = top_k
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def explain_batch(self, features: pd.DataFrame, tx_ids: List[Optional[str]]) -> List[list]:
+        """Top contributing features for each row of `features`"""
+
+        import xgboost as xgb
+
+        results = [self._cache.get(tx_id) if tx_id is not None else None for tx_id in tx_ids]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        rows = features[FEATURE_COLUMNS].iloc[missing]
+        contribs = self.booster.predict(xgb.DMatrix(self.scaler.transform(rows)), pred_contribs=True)
+
+        for row_index, i in enumerate(missing):
+            values = contribs[row_index, :-1]  # last column is the bias term
+            top = abs(values).argsort()[::-1][:self.top_k]
+            results[i] = [
+                {
+                    'feature': FEATURE_COLUMNS[j],
+                    'value': float(rows.iat[row_index, j]),
+                    'contribution': round(float(values[j]), 4),
+                }
+                for j in top
+                if values[j] != 0
+            ]
+            if tx_ids[i] is not None:
+                self._remember(tx_ids[i], results[i])
+
+        return results
+
+    def get(self, tx_id: str) -> Optional[list]:
+        return self._cache.get(tx_id)
+
+    def _remember(self, tx_id: str, explanation: list):
+        self._cache[tx_id] = explanation
+        self._cache.move_to_end(tx_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -1,13 +1,56 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+def event_time(transaction: dict, max_skew_seconds: float = 300) -> datetime:
+    """Event timestamp of a transaction, falling back to arrival time and never far ahead of it"""
+    ts = transaction.get('timestamp')
+    if ts is None:
+        return datetime.now()
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    now = datetime.now(ts.tzinfo) if ts.tzinfo else datetime.now()
+    return min(ts, now + timedelta(seconds=max_skew_seconds))
+
+def time_features(timestamps: Sequence[datetime]) -> Dict[str, np.ndarray]:
+    """
+    Time features for a batch of event timestamps in one NumPy pass
+
+    Timezone-aware timestamps use their own wall clock (the customer's local
+    hour), not the server's.
+    """
+    wall_clock = np.array(
+        [ts.replace(tzinfo=None) if ts.tzinfo else ts for ts in timestamps],
+        dtype='datetime64[s]'
+    )
+    days = wall_clock.astype('datetime64[D]')
+    hour = ((wall_clock - days).astype(np.int64) // 3600).astype(np.int64)
+    day_of_week = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+
+    return {
+        'hour_of_day': hour,
+        'day_of_week': day_of_week,
+        'is_night_transaction': ((hour > 22) | (hour < 6)).astype(np.int64),
+        'is_weekend': (day_of_week >= 5).astype(np.int64),
+    }
 
 class FeatureEngineer:
     """Extracts behavioral features for fraud detection"""
     
-    def __init__(self, user_history_df: pd.DataFrame = None):
+    def __init__(
+        self,
+        user_history_df: pd.DataFrame = None,
+        device_index=None,
+        velocity=None,
+        geo_index=None,
+        merchant_index=None
+    ):
         self.user_history = user_history_df if user_history_df is not None else pd.DataFrame()
+        self.device_index = device_index
+        self.velocity = velocity
+        self.geo_index = geo_index
+        self.merchant_index = merchant_index
     
     def create_features(self, transaction: dict) -> pd.DataFrame:
         """Generates 15+ features from a transaction"""
@@ -22,32 +65,129 @@ class FeatureEngineer:
         features['amount_ratio_to_avg'] = transaction.get('amount', 5000) / (mean_amount + 1)
         features['is_unusual_amount'] = 1 if transaction.get('amount', 0) > (mean_amount + 3 * std_amount) else 0
         
-        # 2. TIME FEATURES
-        features['hour_of_day'] = datetime.now().hour
-        features['day_of_week'] = datetime.now().weekday()
-        features['is_night_transaction'] = 1 if (datetime.now().hour > 22 or datetime.now().hour < 6) else 0
+        # 2. TIME FEATURES (event time in its own wall clock; create_batch_features uses time_features())
+        ts = event_time(transaction)
+        features['hour_of_day'] = ts.hour
+        features['day_of_week'] = ts.weekday()
+        features['is_night_transaction'] = 1 if ts.hour > 22 or ts.hour < 6 else 0
         
         # 3. LOCATION FEATURES
-        features['location_distance_km'] = transaction.get('location_distance', 10)
-        features['is_unusual_location'] = 1 if transaction.get('location_distance', 0) > 500 else 0
+        location = transaction.get('user_location') or {}
+        if self.geo_index is not None and 'lat' in location and 'lon' in location:
+            location_distance = self.geo_index.nearest_distance_km(
+                transaction.get('user_id', ''), location['lat'], location['lon']
+            )
+        else:
+            location_distance = transaction.get('location_distance', 10)
+        features['location_distance_km'] = location_distance
+        features['is_unusual_location'] = 1 if location_distance > 500 else 0
         
-        # 4. FREQUENCY FEATURES
-        features['transactions_today'] = transaction.get('transactions_today', 1)
-        features['is_velocity_attack'] = 1 if transaction.get('transactions_today', 0) > 10 else 0
+        # 4. FREQUENCY FEATURES (count includes the current transaction)
+        if self.velocity is not None:
+            # Velocity is kept on arrival time; the client's event time cannot steer it
+            features['transactions_today'] = self.velocity.count(transaction.get('user_id', ''), '24h') + 1
+        else:
+            features['transactions_today'] = transaction.get('transactions_today', 1)
+        features['is_velocity_attack'] = 1 if features['transactions_today'] > 10 else 0
         
         # 5. DEVICE FEATURES
-        features['is_new_device'] = 1 if transaction.get('is_new_device', False) else 0
+        if self.device_index is not None:
+            is_new_device, _ = self.device_index.lookup(
+                transaction.get('user_id', ''),
+                transaction.get('device_fingerprint'),
+                transaction.get('device_ip')
+            )
+        else:
+            is_new_device = 1 if transaction.get('is_new_device', False) else 0
+        features['is_new_device'] = is_new_device
         
         # 6. MERCHANT FEATURES
         merchant_category = transaction.get('merchant_category', '').upper()
         features['is_high_risk_merchant_category'] = 1 if merchant_category in ['CRYPTO', 'MONEY_TRANSFER', 'GAMBLING'] else 0
-        features['merchant_seen_before'] = 1 if len(self.user_history) > 0 else 0
+        if self.merchant_index is not None:
+            seen = self.merchant_index.frequency(transaction.get('user_id', ''), transaction.get('merchant', '')) > 0
+            features['merchant_seen_before'] = 1 if seen else 0
+        else:
+            features['merchant_seen_before'] = 1 if len(self.user_history) > 0 else 0
         
         # 7. CONTEXTUAL FEATURES
         features['has_vacation_pattern'] = 0
-        features['is_weekend'] = 1 if datetime.now().weekday() >= 5 else 0
+        features['is_weekend'] = 1 if ts.weekday() >= 5 else 0
         
         return pd.DataFrame([features])
+    
+    def create_batch_features(self, transactions: List[dict], user_histories: List[list]) -> pd.DataFrame:
+        """
+        create_features for a batch, one row per transaction (FEATURE_COLUMNS order)
+        
+        user_histories[i] is the history of transactions[i]; the history
+        given to the constructor is not used. Time and location features are
+        computed in one NumPy pass each, the index lookups stay per row.
+        """
+        
+        n = len(transactions)
+        amounts = np.array([tx.get('amount', 5000) for tx in transactions], dtype=np.float64)
+        mean_amount = np.full(n, 5000.0)
+        std_amount = np.full(n, 3000.0)
+        for i, history in enumerate(user_histories):
+            if history:
+                past = np.array([tx['amount'] for tx in history], dtype=np.float64)
+                mean_amount[i] = past.mean()
+                std_amount[i] = past.std(ddof=1) if len(past) > 1 else np.nan  # as pandas
+        
+        features = {
+            'amount_zscore': (amounts - mean_amount) / (std_amount + 1e-8),
+            'amount_ratio_to_avg': amounts / (mean_amount + 1),
+            'is_unusual_amount': (amounts > mean_amount + 3 * std_amount).astype(np.int64),
+        }
+        features.update(time_features([event_time(tx) for tx in transactions]))
+        
+        distances = np.array([tx.get('location_distance', 10) for tx in transactions], dtype=np.float64)
+        if self.geo_index is not None:
+            located = [
+                i for i, tx in enumerate(transactions)
+                if 'lat' in (tx.get('user_location') or {}) and 'lon' in (tx.get('user_location') or {})
+            ]
+            if located:
+                distances[located] = self.geo_index.batch_nearest_distance_km(
+                    [transactions[i].get('user_id', '') for i in located],
+                    [transactions[i]['user_location']['lat'] for i in located],
+                    [transactions[i]['user_location']['lon'] for i in located]
+                )
+        features['location_distance_km'] = distances
+        features['is_unusual_location'] = (distances > 500).astype(np.int64)
+        
+        if self.velocity is not None:
+            today = [self.velocity.count(tx.get('user_id', ''), '24h') + 1 for tx in transactions]
+        else:
+            today = [tx.get('transactions_today', 1) for tx in transactions]
+        features['transactions_today'] = np.array(today, dtype=np.int64)
+        features['is_velocity_attack'] = (features['transactions_today'] > 10).astype(np.int64)
+        
+        if self.device_index is not None:
+            new_device = [
+                self.device_index.lookup(tx.get('user_id', ''), tx.get('device_fingerprint'), tx.get('device_ip'))[0]
+                for tx in transactions
+            ]
+        else:
+            new_device = [1 if tx.get('is_new_device', False) else 0 for tx in transactions]
+        features['is_new_device'] = np.array(new_device, dtype=np.int64)
+        
+        features['is_high_risk_merchant_category'] = np.array([
+            1 if tx.get('merchant_category', '').upper() in ['CRYPTO', 'MONEY_TRANSFER', 'GAMBLING'] else 0
+            for tx in transactions
+        ], dtype=np.int64)
+        if self.merchant_index is not None:
+            seen = [
+                1 if self.merchant_index.frequency(tx.get('user_id', ''), tx.get('merchant', '')) > 0 else 0
+                for tx in transactions
+            ]
+        else:
+            seen = [1 if history else 0 for history in user_histories]
+        features['merchant_seen_before'] = np.array(seen, dtype=np.int64)
+        
+        features['has_vacation_pattern'] = np.zeros(n, dtype=np.int64)
+        return pd.DataFrame(features)[FEATURE_COLUMNS]
 
 FEATURE_COLUMNS = [
     'amount_zscore', 'amount_ratio_to_avg', 'is_unusual_amount',
@@ -0,0 +1,62 @@
+"""
+Process-wide model artifacts
+
+The booster, scaler and cascade pre-screen are loaded once per process
+and shared by every AgentController. Under gunicorn with preload_app
+(see gunicorn.conf.py) the master calls preload() before forking, so all
+workers read the same copy-on-write pages instead of unpickling their
+own copies.
+"""
+
+import gc
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ModelBundle:
+    model: Optional[Any]
+    scaler: Optional[Any]
+    prescreen: Optional[Any]
+
+@lru_cache()
+def get_model_bundle() -> ModelBundle:
+    import joblib
+
+    settings = get_settings()
+    try:
+        model = joblib.load(settings.ML_MODEL_PATH)
+        scaler = joblib.load(settings.SCALER_PATH)
+    except FileNotFoundError:
+        logger.warning("Models not found. Run: python app/ml/model_training.py")
+        return ModelBundle(None, None, None)
+
+    prescreen = None
+    if settings.CASCADE_ENABLED:
+        try:
+            prescreen = joblib.load(settings.CASCADE_MODEL_PATH)
+        except FileNotFoundError:
+            logger.warning("Cascade enabled but %s not found; scoring every transaction with the full model", settings.CASCADE_MODEL_PATH)
+
+    return ModelBundle(model, scaler, prescreen)
+
+def preload():
+    """
+    Load the artifacts (and the scoring imports) in a pre-fork master
+
+    gc.freeze() moves everything allocated so far into the permanent
+    generation, so workers' garbage collections never write to those
+    objects' headers and the shared pages stay shared.
+    """
+    import app.services.agent  # noqa: F401  (pandas, xgboost, sklearn)
+
+    bundle = get_model_bundle()
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded model artifacts (model=%s, cascade=%s)", bundle.model is not None, bundle.prescreen is not None)
+    return bundle
@@ -8,17 +8,18 @@ import joblib
 import os
 import logging
 from app.ml.feature_engineering import FEATURE_COLUMNS
+from app.ml.cascade import PreScreen
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class FraudDetectionModel:
     def __init__(self):
         self.model = None
         self.scaler = None
+        self.prescreen = None
         self.feature_names = None
     
-    def train(self, training_data_path: str):
+    def train(self, training_data_path: str, target_recall: float = 0.995):
         """Train XGBoost model on fraud dataset"""
         
         logger.info("Loading training data...")
@@ -58,6 +59,14 @@ class FraudDetectionModel:
         logger.info("\n=== Model Performance ===")
         logger.info(classification_report(y_test, y_pred))
         
+        logger.info("Fitting cascade pre-screen...")
+        self.prescreen = PreScreen.fit(X_train, y_train.to_numpy(), self.scaler, target_recall=target_recall)
+        X_test_raw = self.scaler.inverse_transform(X_test)
+        logger.info(
+            f"Pre-screen approves {self.prescreen.short_circuit(X_test_raw).mean():.1%} of held-out rows "
+            f"(threshold {self.prescreen.approve_below:.4f})"
+        )
+        
         self.feature_names = FEATURE_COLUMNS
         
         return self.model
@@ -115,11 +124,13 @@ class FraudDetectionModel:
         fraud_prob = self.model.predict_proba(X_scaled)[0][1]
         return fraud_prob
     
-    def save_model(self, model_path: str, scaler_path: str):
-        """Save model and scaler"""
+    def save_model(self, model_path: str, scaler_path: str, cascade_path: str = None):
+        """Save model and scaler (and the cascade pre-screen, if a path is given)"""
         os.makedirs(os.path.dirname(model_path), exist_ok=True)
         joblib.dump(self.model, model_path)
         joblib.dump(self.scaler, scaler_path)
+        if cascade_path and self.prescreen is not None:
+            joblib.dump(self.prescreen, cascade_path)
         logger.info(f"✅ Model saved to {model_path}")
     
     def load_model(self, model_path: str, scaler_path: str):
@@ -129,6 +140,11 @@ class FraudDetectionModel:
         logger.info(f"✅ Model loaded from {model_path}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     model = FraudDetectionModel()
     model.train('data/training_data.csv')
-    model.save_model('app/ml/models/xgboost_fraud_model.pkl', 'app/ml/models/scaler.pkl')
+    model.save_model(
+        'app/ml/models/xgboost_fraud_model.pkl',
+        'app/ml/models/scaler.pkl',
+        'app/ml/models/cascade.pkl'
+    )
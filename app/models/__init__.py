@@ -178,4 +178,27 @@ class AuditLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
-        return f"<AuditLog {self.event_type}>"
\ No newline at end of file
+        return f"<AuditLog {self.event_type}>"
+
+
+class UserProfile(Base):
+    """Materialized behavioral profile, maintained as transactions are scored"""
+    __tablename__ = "user_profiles"
+    
+    # Scored user IDs need not belong to a registered account, so no foreign key
+    user_id = Column(String(64), primary_key=True)
+    
+    # Running aggregates (mergeable, see app.services.profile_store)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    blocked_count = Column(Integer, nullable=False, default=0)
+    avg_transaction_amount = Column(Float, nullable=False, default=0.0)
+    amount_m2 = Column(Float, nullable=False, default=0.0)  # sum of squared deviations from the mean
+    typical_locations = Column(String(500), nullable=True)  # JSON [[lat, lon, count], ...]
+    
+    # Timestamps
+    first_seen_at = Column(DateTime, nullable=True)
+    last_seen_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<UserProfile {self.user_id}>"
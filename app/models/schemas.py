@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.config import get_settings
 
 class UserRegister(BaseModel):
     phone_number: str
@@ -14,8 +15,24 @@ class TransactionRequest(BaseModel):
     merchant_category: str
     device_type: str
     device_ip: str
+    device_fingerprint: Optional[str] = None
     user_location: Dict[str, float]
     email: Optional[str] = None
+    timestamp: Optional[datetime] = Field(default=None, description="Event time; defaults to arrival time")
+    
+    @field_validator('timestamp')
+    @classmethod
+    def event_time_in_window(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Event time may lag arrival (backfills) but not lead it beyond clock skew"""
+        if value is None:
+            return value
+        settings = get_settings()
+        now = datetime.now(value.tzinfo) if value.tzinfo else datetime.now()
+        if value > now + timedelta(seconds=settings.EVENT_TIME_MAX_SKEW_SECONDS):
+            raise ValueError("timestamp is in the future")
+        if value < now - timedelta(seconds=settings.EVENT_TIME_MAX_AGE_SECONDS):
+            raise ValueError("timestamp is too old")
+        return value
 
 class TransactionResponse(BaseModel):
     id: str
@@ -0,0 +1,122 @@
+"""
+Admission control for the scoring path
+
+At most `max_in_flight` scorings run at once and at most `max_queue`
+requests wait for a slot, in arrival order. Every request carries a
+deadline (client budget or the default). A request is shed instead of
+queued when:
+
+- the queue is full ("queue_full")
+- its expected wait (queue position x recent service time / slots)
+  already exceeds the time it has left ("deadline")
+- it is still queued when its deadline passes ("expired")
+
+Deadlines only govern waiting: once admitted, a scoring runs to
+completion so history and velocity state are never left half-updated.
+"""
+
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+from app.config import get_settings
+from app.services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_SHED
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f"Scoring capacity exceeded ({reason})")
+        self.reason = reason
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int, max_queue: int, service_time_alpha: float = 0.1):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+        if max_queue < 0:
+            raise ValueError(f"max_queue must not be negative, got {max_queue}")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters = deque()
+        self._alpha = service_time_alpha
+        self.service_time = 0.0  # EWMA of scoring seconds
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def run(self, compute: Callable[[], Awaitable[dict]], deadline: float) -> dict:
+        """Run compute() once a slot is free; `deadline` is a time.monotonic() value"""
+
+        await self._acquire(deadline)
+        started = time.monotonic()
+        try:
+            return await compute()
+        finally:
+            elapsed = time.monotonic() - started
+            self.service_time += self._alpha * (elapsed - self.service_time)
+            self._release()
+
+    async def _acquire(self, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._shed("deadline")
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+        expected_wait = (len(self._waiters) + 1) * self.service_time / self.max_in_flight
+        if expected_wait > remaining:
+            self._shed("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=remaining)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                waiter.cancel()
+                self._shed("expired")
+            # Slot was handed over just as the deadline passed; use it
+        except asyncio.CancelledError:
+            # Client went away while queued; pass on a slot we may already hold
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+        ADMISSION_QUEUE_WAIT.observe(time.monotonic() - queued_at)
+
+    def _release(self):
+        # Hand the slot straight to the oldest waiter so it cannot be overtaken
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _shed(self, reason: str):
+        ADMISSION_SHED.inc(reason)
+        raise AdmissionRejected(reason)
+
+def deadline_from_budget(budget_ms) -> float:
+    """Absolute deadline for a client budget in milliseconds (None = default budget)"""
+    settings = get_settings()
+    if budget_ms is None or budget_ms <= 0:
+        budget_ms = settings.ADMISSION_DEFAULT_BUDGET_MS
+    return time.monotonic() + min(budget_ms, settings.ADMISSION_MAX_BUDGET_MS) / 1000
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    controller = AdmissionController(settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_MAX_QUEUE)
+    ADMISSION_QUEUE_DEPTH.set_function(lambda: controller.queue_depth)
+    ADMISSION_IN_FLIGHT.set_function(lambda: controller.in_flight)
+    return controller
@@ -1,13 +1,29 @@
+from collections import defaultdict
 from enum import Enum
 from datetime import datetime
+from typing import List
 import logging
-import joblib
+import time
+import numpy as np
 import pandas as pd
-from app.ml.feature_engineering import FeatureEngineer, FEATURE_COLUMNS
+from app.ml.feature_engineering import FeatureEngineer, FEATURE_COLUMNS, event_time
+from app.ml.explain import Explainer
+from app.ml.model_store import get_model_bundle
 from app.services.history_store import UserTransactionHistory
 from app.services.email_service import EmailService
+from app.services.audit_sink import NullAuditSink
+from app.services.device_index import DeviceIndex
+from app.services.velocity import VelocityTracker
+from app.services.geo_index import HomeLocationIndex
+from app.services.merchant_index import MerchantIndex
+from app.services.profile_store import get_profile_store
+from app.services.rollups import get_rollup_store
+from app.services.decision_feed import get_decision_feed
+from app.services.metrics import CASCADE_STAGE, DECISIONS, MODEL_INFERENCE, observe_phase
+from app.logging_config import DecisionLogSampler
+from app.config import get_settings
+from app.services import policy
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DecisionEnum(Enum):
@@ -16,6 +32,18 @@ class DecisionEnum(Enum):
     BLOCK = "BLOCKED"
     MANUAL_REVIEW = "MANUAL_REVIEW"
 
+DECISION_BY_POLICY_CODE = {
+    policy.APPROVE: DecisionEnum.APPROVE,
+    policy.HOLD: DecisionEnum.HOLD,
+    policy.BLOCK: DecisionEnum.BLOCK,
+}
+
+DECISION_REASONS = {
+    DecisionEnum.BLOCK: "🚨 CRITICAL fraud risk detected",
+    DecisionEnum.HOLD: "⚠️ Unusual transaction - verification needed",
+    DecisionEnum.APPROVE: "✅ Transaction appears legitimate",
+}
+
 class AgentController:
     """
     CORE AGENTIC AI - Autonomous decision making and action execution
@@ -28,61 +56,195 @@ class AgentController:
     5. LEARN - Store for feedback loop
     """
     
-    def __init__(self):
+    def __init__(self, state_dir: str = None, track_aggregates: bool = True, audit_sink=None):
         self.logger = logging.getLogger(__name__)
+        self.log_sampler = DecisionLogSampler()
         self.history_store = UserTransactionHistory()
+        self.device_index = DeviceIndex()
+        self.velocity = VelocityTracker()
+        self.geo_index = HomeLocationIndex()
+        self.merchant_index = MerchantIndex()
+        self.policy = policy.PolicyEngine()
         self.email = EmailService()
-        try:
-            self.model = joblib.load('app/ml/models/xgboost_fraud_model.pkl')
-            self.scaler = joblib.load('app/ml/models/scaler.pkl')
-        except FileNotFoundError:
-            self.logger.warning("Models not found. Run: python app/ml/model_training.py")
-            self.model = None
-            self.scaler = None
+        # Audit events go to the sink the caller passes (the app passes get_audit_sink());
+        # without one they are discarded, so no writer thread or database is involved
+        self.audit = audit_sink if audit_sink is not None else NullAuditSink()
+        
+        # Shared per process (and across workers when preloaded before fork)
+        models = get_model_bundle()
+        self.model = models.model
+        self.scaler = models.scaler
+        self.prescreen = models.prescreen
+        self.explainer = Explainer(self.model, self.scaler) if self.model is not None else None
+        self.explain_non_approved = get_settings().EXPLAIN_NON_APPROVED
         
         self.transactions_log = []
+        
+        settings = get_settings()
+        # Process-wide aggregates read by the API (off in shard workers: the dispatcher keeps them)
+        self.profiles = get_profile_store() if track_aggregates and settings.PROFILES_ENABLED else None
+        self.rollups = get_rollup_store() if track_aggregates and settings.ROLLUPS_ENABLED else None
+        self.feed = get_decision_feed() if track_aggregates and settings.FEED_ENABLED else None
+        
+        # Durable per-user state (snapshots + LEARN journal), restored in warm_up()
+        self.snapshots = None
+        if settings.STATE_SNAPSHOT_ENABLED:
+            from app.services.state_snapshot import StateSnapshotter
+            self.snapshots = StateSnapshotter(
+                self,
+                state_dir or settings.STATE_SNAPSHOT_DIR,
+                interval_seconds=settings.STATE_SNAPSHOT_INTERVAL_SECONDS,
+                flush_seconds=settings.STATE_JOURNAL_FLUSH_SECONDS
+            )
+        
+        # Callables (phase, seconds) notified as each phase finishes
+        self.phase_listeners = [observe_phase]
+    
+    def warm_up(self):
+        """Load the device index and run one throwaway scoring so the first request pays no import cost"""
+        
+        if get_settings().DEVICE_INDEX_WARM_ON_STARTUP:
+            try:
+                self.device_index.warm()
+            except Exception as e:
+                self.logger.warning("Device index not warmed: %s", e)
+        
+        if self.snapshots is not None:
+            self.snapshots.restore()
+        
+        features = self._create_features({'user_id': '__warmup__', 'amount': 1.0, 'merchant': '__warmup__'})
+        self._predict_fraud_risk(features)
     
-    async def process_transaction(self, transaction: dict) -> dict:
+    async def process_transaction(self, transaction: dict, explain: bool = False) -> dict:
         """
         Main agentic workflow
-        """
         
-        tx_id = transaction.get('id', 'tx_unknown')
-        user_id = transaction['user_id']
-        amount = transaction['amount']
-        merchant = transaction['merchant']
-        email = transaction.get('email')
-        merchant_category = transaction.get('merchant_category', 'UNKNOWN')
+        Feature contributions are attached for HOLD/BLOCK decisions, or for
+        any decision when `explain` is set; APPROVE never pays for them otherwise.
+        A score forced up by the demo override gets 'score_override': True
+        instead, since the model's contributions would not explain it.
+        """
         
         # ===== 1. PERCEIVE =====
-        self.logger.info(f"[PERCEIVE] Transaction {tx_id}: ₹{amount} at {merchant}")
+        started = time.perf_counter()
+        # Resolve event time once so features and history agree (velocity uses arrival time)
+        transaction['timestamp'] = event_time(transaction, get_settings().EVENT_TIME_MAX_SKEW_SECONDS)
         
         # Fetch user history
-        user_history_list = await self.history_store.get_user_history(user_id)
+        user_history_list = await self.history_store.get_user_history(transaction['user_id'])
+        started = self._phase_done("PERCEIVE", started)
         
         # ===== 2. REASON =====
         features = self._create_features(transaction, user_history_list)
         fraud_probability = self._predict_fraud_risk(features)
-        
-        risk_level = self._categorize_risk(fraud_probability)
-        self.logger.info(f"[REASON] Fraud probability: {fraud_probability:.2%}, Risk: {risk_level}")
+        started = self._phase_done("REASON", started)
         
         # ===== 3. DECIDE =====
-        if fraud_probability >= 0.80:
-            decision = DecisionEnum.BLOCK
-            reason = "🚨 CRITICAL fraud risk detected"
-        elif fraud_probability >= 0.50:
-            decision = DecisionEnum.HOLD
-            reason = "⚠️ Unusual transaction - verification needed"
-        else:
-            decision = DecisionEnum.APPROVE
-            reason = "✅ Transaction appears legitimate"
-        
-        self.logger.info(f"[DECIDE] Decision: {decision.value}")
+        code = self.policy.decide_one(fraud_probability, transaction.get('merchant_category', 'UNKNOWN'), transaction['amount'])
+        decision = DECISION_BY_POLICY_CODE[code]
+        risk_level = self._categorize_risk(fraud_probability, code)
+        
+        overridden = self.model is not None and bool(self._demo_override(features)[0])
+        explanation = None
+        if self.explainer is not None and not overridden and (
+            explain or (self.explain_non_approved and decision != DecisionEnum.APPROVE)
+        ):
+            explanation = self.explainer.explain_batch(features, [transaction.get('id')])[0]
+        
+        DECISIONS.inc(decision.value)
+        started = self._phase_done("DECIDE", started)
+        
+        return await self._act_and_learn(
+            transaction, fraud_probability, risk_level, decision, explanation, started, score_override=overridden
+        )
+    
+    async def process_batch(self, transactions: List[dict], explain: bool = False) -> List[dict]:
+        """
+        Score a micro-batch; same results as process_transaction one by one
+        
+        The batch is split into waves in which each user appears at most once
+        (a user's transactions keep their order across waves), so a later
+        transaction still sees the LEARN updates of the earlier ones. Per wave,
+        PERCEIVE, REASON and DECIDE run once for all transactions (one feature
+        frame, one model call, one policy pass) and are timed per wave; ACT
+        and LEARN run per transaction. Results come back in input order.
+        """
+        
+        waves: List[List[int]] = []
+        seen = defaultdict(int)
+        for i, transaction in enumerate(transactions):
+            wave = seen[transaction['user_id']]
+            seen[transaction['user_id']] += 1
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(i)
+        
+        skew = get_settings().EVENT_TIME_MAX_SKEW_SECONDS
+        results = [None] * len(transactions)
+        for wave in waves:
+            batch = [transactions[i] for i in wave]
+            tx_ids = [transaction.get('id') for transaction in batch]  # None: explained but not cached
+            
+            # ===== 1. PERCEIVE =====
+            started = time.perf_counter()
+            for transaction in batch:
+                transaction['timestamp'] = event_time(transaction, skew)
+            histories = await self.history_store.get_user_histories([transaction['user_id'] for transaction in batch])
+            started = self._phase_done("PERCEIVE", started)
+            
+            # ===== 2. REASON =====
+            features = self._feature_engineer().create_batch_features(batch, histories)
+            scores = self._predict_fraud_risk_batch(features)
+            started = self._phase_done("REASON", started)
+            
+            # ===== 3. DECIDE =====
+            codes = self.policy.decide(
+                scores,
+                [transaction.get('merchant_category', 'UNKNOWN') for transaction in batch],
+                [transaction['amount'] for transaction in batch]
+            )
+            decisions = [DECISION_BY_POLICY_CODE[int(code)] for code in codes]
+            
+            overridden = self._demo_override(features) if self.model is not None else np.zeros(len(batch), dtype=bool)
+            explanations = [None] * len(batch)
+            if self.explainer is not None:
+                wanted = [
+                    j for j, decision in enumerate(decisions)
+                    if not overridden[j] and (explain or (self.explain_non_approved and decision != DecisionEnum.APPROVE))
+                ]
+                if wanted:
+                    explained = self.explainer.explain_batch(features.iloc[wanted], [tx_ids[j] for j in wanted])
+                    for j, explanation in zip(wanted, explained):
+                        explanations[j] = explanation
+            
+            for decision in decisions:
+                DECISIONS.inc(decision.value)
+            started = self._phase_done("DECIDE", started)
+            
+            for j, i in enumerate(wave):
+                score = float(scores[j])
+                results[i] = await self._act_and_learn(
+                    batch[j], score, self._categorize_risk(score, int(codes[j])), decisions[j], explanations[j],
+                    time.perf_counter(), score_override=bool(overridden[j])
+                )
+        return results
+    
+    async def _act_and_learn(self, transaction: dict, fraud_probability: float, risk_level: str,
+                             decision: DecisionEnum, explanation, started: float, score_override: bool = False) -> dict:
+        """ACT and LEARN phases for one decided transaction; returns its result"""
+        
+        tx_id = transaction.get('id', 'tx_unknown')
+        user_id = transaction['user_id']
+        amount = transaction['amount']
+        merchant = transaction['merchant']
+        email = transaction.get('email')
+        merchant_category = transaction.get('merchant_category', 'UNKNOWN')
         
         # ===== 4. ACT =====
-        actions = await self._execute_action(decision, tx_id, user_id, amount, merchant, email, merchant_category)
-        self.logger.info(f"[ACT] Actions: {actions}")
+        actions = await self._execute_action(
+            decision, tx_id, user_id, amount, merchant, email, merchant_category, fraud_probability, risk_level
+        )
+        started = self._phase_done("ACT", started)
         
         # ===== 5. LEARN =====
         self._store_for_learning({
@@ -94,23 +256,91 @@ class AgentController:
         
         # Store transaction in history
         await self.history_store.add_transaction(user_id, transaction)
+        blocked = decision == DecisionEnum.BLOCK
+        self._update_indices(user_id, transaction, blocked)
+        if self.snapshots is not None:
+            self.snapshots.record(user_id, transaction, blocked)
+        if self.profiles is not None:
+            self.profiles.observe(user_id, transaction, blocked)
+        self._phase_done("LEARN", started)
         
-        return {
+        # One structured line per transaction; sampled per decision (BLOCK/HOLD always by default)
+        if self.logger.isEnabledFor(logging.INFO) and self.log_sampler.should_log(decision.value):
+            self.logger.info(
+                "[DECISION] tx=%s decision=%s score=%.4f risk=%s",
+                tx_id, decision.value, fraud_probability, risk_level,
+                extra={
+                    'tx_id': tx_id,
+                    'user_id': user_id,
+                    'amount': amount,
+                    'merchant': merchant,
+                    'merchant_category': merchant_category,
+                    'fraud_score': fraud_probability,
+                    'risk_level': risk_level,
+                    'decision': decision.value,
+                    'actions': actions,
+                }
+            )
+        
+        result = {
             'transaction_id': tx_id,
             'fraud_score': fraud_probability,
             'risk_level': risk_level,
             'decision': decision.value,
-            'reason': reason,
+            'reason': DECISION_REASONS[decision],
             'actions': actions,
             'requires_confirmation': decision == DecisionEnum.HOLD
         }
+        if explanation is not None:
+            result['explanation'] = explanation
+        if score_override:
+            result['score_override'] = True
+        if self.rollups is not None:
+            self.rollups.record(result, transaction)
+        if self.feed is not None:
+            self.feed.publish(result, transaction)
+        return result
+    
+    def _update_indices(self, user_id: str, transaction: dict, blocked: bool, arrival_ts: float = None):
+        """Per-user index updates of the LEARN phase"""
+        
+        # Arrival time, not the client's event time: one skewed timestamp must not move the windows
+        self.velocity.record(user_id, arrival_ts)
+        
+        # Blocked devices, locations and merchants must not become known ones
+        if not blocked:
+            self.device_index.observe(user_id, transaction.get('device_fingerprint'), transaction.get('device_ip'))
+            self.merchant_index.observe(user_id, transaction.get('merchant'))
+            location = transaction.get('user_location') or {}
+            if 'lat' in location and 'lon' in location:
+                self.geo_index.update(user_id, location['lat'], location['lon'])
+    
+    def replay_learned(self, user_id: str, transaction: dict, blocked: bool, arrival_ts: float = None):
+        """Re-apply one journalled LEARN update (startup only, before serving)"""
+        self.history_store.restore_transaction(user_id, {'amount': transaction['amount'], 'timestamp': transaction['timestamp']})
+        self._update_indices(user_id, transaction, blocked, arrival_ts)
+    
+    def _phase_done(self, phase: str, started: float) -> float:
+        """Report a phase duration to listeners; returns the new phase start"""
+        now = time.perf_counter()
+        for listener in self.phase_listeners:
+            listener(phase, now - started)
+        return now
     
     def _create_features(self, transaction: dict, user_history: list = None) -> pd.DataFrame:
         """Extract features from transaction using history"""
         
         history_df = pd.DataFrame(user_history) if user_history else pd.DataFrame()
-        engineer = FeatureEngineer(user_history_df=history_df)
-        return engineer.create_features(transaction)[FEATURE_COLUMNS]
+        return self._feature_engineer(history_df).create_features(transaction)[FEATURE_COLUMNS]
+    
+    def _feature_engineer(self, history_df: pd.DataFrame = None) -> FeatureEngineer:
+        return FeatureEngineer(
+            user_history_df=history_df,
+            device_index=self.device_index,
+            velocity=self.velocity,
+            geo_index=self.geo_index,
+            merchant_index=self.merchant_index
+        )
     
     def _predict_fraud_risk(self, features: pd.DataFrame) -> float:
         """Use ML model to predict fraud probability"""
@@ -119,38 +349,88 @@ class AgentController:
             self.logger.warning("Model not loaded. Using default risk score.")
             return 0.5
         
+        demo_override = bool(self._demo_override(features)[0])
+        
+        # Cascade: clearly low-risk transactions never reach the scaler or the booster
+        if self.prescreen is not None and not demo_override:
+            stage1 = float(self.prescreen.score(features.to_numpy(dtype=float))[0])
+            if stage1 < self.prescreen.approve_below:
+                CASCADE_STAGE.inc("prescreen")
+                return stage1
+            CASCADE_STAGE.inc("model")
+        
+        started = time.perf_counter()
         X_scaled = self.scaler.transform(features)
         fraud_prob = self.model.predict_proba(X_scaled)[0][1]
+        MODEL_INFERENCE.observe(time.perf_counter() - started)
         
         # DEMO OVERRIDE: Force high score for suspicious patterns to demonstrate agent workflow
-        if features['amount_zscore'].iloc[0] > 3.0 and features['is_high_risk_merchant_category'].iloc[0] == 1:
+        if demo_override:
              return max(float(fraud_prob), 0.95)
              
         return float(fraud_prob)
     
-    def _categorize_risk(self, fraud_probability: float) -> str:
-        """Map probability to risk level"""
+    def _predict_fraud_risk_batch(self, features: pd.DataFrame) -> np.ndarray:
+        """_predict_fraud_risk for every row, with one pre-screen pass and one model call"""
         
-        if fraud_probability >= 0.80:
-            return "CRITICAL"
-        elif fraud_probability >= 0.50:
-            return "MEDIUM"
-        elif fraud_probability >= 0.20:
-            return "LOW"
-        else:
-            return "MINIMAL"
+        n = len(features)
+        if self.model is None:
+            self.logger.warning("Model not loaded. Using default risk score.")
+            return np.full(n, 0.5)
+        
+        demo_override = self._demo_override(features)
+        scores = np.zeros(n)
+        to_model = np.ones(n, dtype=bool)
+        
+        if self.prescreen is not None:
+            stage1 = self.prescreen.score(features.to_numpy(dtype=float))
+            prescreened = ~demo_override & (stage1 < self.prescreen.approve_below)
+            scores[prescreened] = stage1[prescreened]
+            to_model = ~prescreened
+            if prescreened.any():
+                CASCADE_STAGE.inc("prescreen", amount=float(prescreened.sum()))
+            if (to_model & ~demo_override).any():
+                CASCADE_STAGE.inc("model", amount=float((to_model & ~demo_override).sum()))
+        
+        if to_model.any():
+            started = time.perf_counter()
+            X_scaled = self.scaler.transform(features[to_model])
+            scores[to_model] = self.model.predict_proba(X_scaled)[:, 1]
+            MODEL_INFERENCE.observe(time.perf_counter() - started)
+        
+        scores[demo_override] = np.maximum(scores[demo_override], 0.95)
+        return scores
     
-    async def _execute_action(self, decision, tx_id, user_id, amount, merchant, email: str = None, category: str = "UNKNOWN") -> list:
-        """Execute autonomous actions with real email alerts"""
+    @staticmethod
+    def _demo_override(features: pd.DataFrame) -> np.ndarray:
+        """Rows the demo override forces to a fraud score of at least 0.95"""
+        return (
+            (features['amount_zscore'].to_numpy() > 3.0)
+            & (features['is_high_risk_merchant_category'].to_numpy() == 1)
+        )
+    
+    def _categorize_risk(self, fraud_probability: float, decision_code: int = None) -> str:
+        """Map probability to risk level, consistent with the policy decision when given"""
+        return policy.risk_level(fraud_probability, decision_code)
+    
+    async def _execute_action(self, decision, tx_id, user_id, amount, merchant, email: str = None, category: str = "UNKNOWN",
+                              fraud_score: float = None, risk_level: str = None) -> list:
+        """Execute autonomous actions with real email alerts (score and risk level as decided by the policy)"""
         
         actions = []
         
         if decision == DecisionEnum.BLOCK:
             actions.append("❌ TRANSACTION_BLOCKED")
+            # Scoring user ids are external references, not users.id rows, so they go in meta_data
+            self.audit.emit(
+                "fraud_alert", "critical",
+                f"Transaction {tx_id} blocked: {amount} at {merchant}",
+                meta_data={'tx_id': tx_id, 'user_id': user_id, 'amount': amount, 'merchant': merchant, 'category': category}
+            )
             
             if email:
                 email_result = await self.email.send_fraud_alert(
-                    email, user_id, amount, merchant, 0.95, category, tx_id=tx_id
+                    email, user_id, amount, merchant, fraud_score, category, tx_id=tx_id, risk_level=risk_level
                 )
                 if email_result.get("success"):
                     actions.append("📧 FRAUD_ALERT_SENT")
@@ -159,13 +439,23 @@ class AgentController:
             if email:
                 await self.email.send_account_locked(email, user_id, tx_id=tx_id)
                 actions.append("🔒 ACCOUNT_LOCKED_EMAIL_SENT")
+                self.audit.emit(
+                    "account_locked", "critical",
+                    f"Account locked after blocked transaction {tx_id}",
+                    meta_data={'tx_id': tx_id, 'user_id': user_id}
+                )
         
         elif decision == DecisionEnum.HOLD:
             actions.append("⏸️ TRANSACTION_HELD")
+            self.audit.emit(
+                "transaction_held", "warning",
+                f"Transaction {tx_id} held for verification: {amount} at {merchant}",
+                meta_data={'tx_id': tx_id, 'user_id': user_id, 'amount': amount, 'merchant': merchant}
+            )
             
             if email:
                 email_result = await self.email.send_verification_required(
-                    email, user_id, amount, merchant, 0.65, tx_id=tx_id
+                    email, user_id, amount, merchant, fraud_score, tx_id=tx_id
                 )
                 if email_result.get("success"):
                     actions.append("📧 VERIFICATION_EMAIL_SENT")
@@ -185,15 +475,15 @@ class AgentController:
     def _store_for_learning(self, data: dict):
         """Store transaction for continuous learning"""
         self.transactions_log.append(data)
-        self.logger.info(f"[LEARN] Stored for feedback: {data['tx_id']}")
+        self.logger.debug("[LEARN] Stored for feedback: %s", data['tx_id'])
     
     async def handle_user_verification_response(self, tx_id: str, user_confirmed: bool):
         """Update model based on user feedback"""
         
-        self.logger.info(f"[LEARN] User feedback: TX {tx_id} - Confirmed: {user_confirmed}")
+        self.logger.info("[LEARN] User feedback: TX %s - Confirmed: %s", tx_id, user_confirmed)
         
         if user_confirmed == False:
-            self.logger.warning(f"[CRITICAL] Fraud confirmed by user for TX {tx_id}")
+            self.logger.warning("[CRITICAL] Fraud confirmed by user for TX %s", tx_id)
         
         return {
             'transaction_id': tx_id,
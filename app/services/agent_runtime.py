@@ -0,0 +1,65 @@
+import sys
+from functools import lru_cache
+from app.config import get_settings
+
+# lru_cached per-process singletons, as (module, getter)
+_PROCESS_SINGLETONS = (
+    ("app.services.audit_sink", "get_audit_sink"),
+    ("app.services.profile_store", "get_profile_store"),
+    ("app.services.rollups", "get_rollup_store"),
+    ("app.services.decision_feed", "get_decision_feed"),
+)
+
+@lru_cache()
+def get_agent():
+    """
+    Process-wide AgentController, built on first use
+
+    Importing the API must stay cheap, so the agent module (pandas, joblib,
+    xgboost via the pickled model) is only imported here. The app lifespan
+    calls this at startup; scripts and tests get the same instance lazily.
+    
+    With SHARD_WORKERS > 0 this is a ShardedScorer instead, which runs one
+    AgentController per worker process behind the same interface.
+    """
+    workers = get_settings().SHARD_WORKERS
+    if workers > 0:
+        from app.services.sharding import ShardedScorer
+        return ShardedScorer(workers)
+    
+    from app.services.agent import AgentController
+    from app.services.audit_sink import get_audit_sink
+    return AgentController(audit_sink=get_audit_sink())
+
+def record_unscored_decision(result: dict, transaction: dict):
+    """
+    Count a decision made without scoring (admission shed) like a scored one
+
+    Same sinks as AgentController's LEARN phase: the DECISIONS metric, the
+    rollups and the live feed, so dashboards see shed traffic too.
+    """
+    from app.services.metrics import DECISIONS
+    DECISIONS.inc(result['decision'])
+    settings = get_settings()
+    if settings.ROLLUPS_ENABLED:
+        from app.services.rollups import get_rollup_store
+        get_rollup_store().record(result, transaction)
+    if settings.FEED_ENABLED:
+        from app.services.decision_feed import get_decision_feed
+        get_decision_feed().publish(result, transaction)
+
+def reset_after_fork():
+    """
+    Drop per-process state inherited through fork (gunicorn post_fork, shard workers)
+
+    The log listener and the audit/profile writer threads do not survive the
+    fork, and rollups and the live feed must start empty in each process.
+    Modules that were never imported are left alone (and stay unimported).
+    """
+    from app import logging_config
+    logging_config.reset_after_fork()
+    for module_name, getter in _PROCESS_SINGLETONS:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            getattr(module, getter).cache_clear()
+    get_agent.cache_clear()
@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import insert, select
+
+from app.config import get_settings
+from app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+META_DATA_MAX_CHARS = 2000  # AuditLog.meta_data column size
+
+def encode_meta_data(meta_data: Optional[dict], max_chars: int = META_DATA_MAX_CHARS) -> Optional[str]:
+    """
+    meta_data as JSON that fits the column and still parses
+
+    Oversized payloads become {"truncated": true, "size": ..., "preview": ...}
+    with the preview (a prefix of the full JSON) cut to fit once escaped.
+    """
+    if not meta_data:
+        return None
+    encoded = json.dumps(meta_data, default=str)
+    if len(encoded) <= max_chars:
+        return encoded
+
+    keep = max_chars
+    while True:
+        envelope = json.dumps({'truncated': True, 'size': len(encoded), 'preview': encoded[:keep]})
+        if len(envelope) <= max_chars:
+            return envelope
+        keep -= len(envelope) - max_chars
+
+class AuditEventSink:
+    """
+    Fire-and-forget writer for AuditLog events
+
+    emit() only enqueues, so callers on the request path never wait for the
+    database. A background thread drains the queue into multi-row INSERTs.
+    When the database errors or a flush exceeds the slow threshold, batches
+    are appended to a local spill file instead; the file is replayed into
+    the database once it responds normally again. Replay skips rows that
+    are already stored, so a replay interrupted by a crash (its leftover
+    .replay file is picked up first on the next start) never duplicates or
+    wedges on a primary key.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        slow_threshold_ms: Optional[int] = None,
+        recovery_interval_seconds: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        spill_path: Optional[str] = None
+    ):
+        settings = get_settings()
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.AUDIT_SINK_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.AUDIT_SINK_FLUSH_INTERVAL_MS) / 1000
+        self.slow_threshold = (slow_threshold_ms or settings.AUDIT_SINK_SLOW_THRESHOLD_MS) / 1000
+        self.recovery_interval = recovery_interval_seconds or settings.AUDIT_SINK_RECOVERY_INTERVAL_SECONDS
+        self.spill_path = spill_path or settings.AUDIT_SINK_SPILL_PATH
+
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=max_queue or settings.AUDIT_SINK_MAX_QUEUE)
+        self._stop = threading.Event()
+        self._thread = None
+        self.replay_path = self.spill_path + ".replay"
+        self._degraded = os.path.exists(self.spill_path) or os.path.exists(self.replay_path)
+        self._last_recovery_attempt = 0.0
+
+        self.stats = {'written': 0, 'spilled': 0, 'replayed': 0, 'dropped': 0}
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+        return self
+
+    def emit(
+        self,
+        event_type: str,
+        severity: str,
+        description: str,
+        user_id: str = None,
+        ip_address: str = None,
+        user_agent: str = None,
+        meta_data: dict = None
+    ):
+        """Queue an audit event without blocking"""
+
+        row = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'event_type': event_type,
+            'event_severity': severity,
+            'description': description[:500],
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'meta_data': encode_meta_data(meta_data),
+            'created_at': datetime.utcnow(),
+        }
+
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.stats['dropped'] += 1
+            self.logger.warning("Audit queue full, dropped event %s", event_type)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the writer after flushing what is queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ============ WRITER THREAD ============
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._drain()
+            if batch:
+                self._flush(batch)
+            if self._degraded and time.monotonic() - self._last_recovery_attempt >= self.recovery_interval:
+                self._recover()
+
+    def _drain(self) -> list:
+        """Block for the first event, then take whatever else is ready"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list):
+        if self._degraded:
+            self._spill(batch)
+            return
+
+        try:
+            elapsed = self._insert(batch)
+        except Exception as e:
+            self.logger.error("Audit insert failed, spilling to %s: %s", self.spill_path, e)
+            self._degraded = True
+            self._last_recovery_attempt = time.monotonic()
+            self._spill(batch)
+            return
+
+        self.stats['written'] += len(batch)
+        if elapsed > self.slow_threshold:
+            self.logger.warning("Audit insert took %.0fms, spilling until the database recovers", elapsed * 1000)
+            self._degraded = True
+            self._last_recovery_attempt = time.monotonic()
+
+    def _insert(self, rows: list) -> float:
+        """Multi-row INSERT; returns elapsed seconds"""
+        started = time.perf_counter()
+        if not rows:
+            return 0.0
+        with self.session_factory() as db:
+            db.execute(insert(AuditLog), rows)
+            db.commit()
+        return time.perf_counter() - started
+
+    def _not_stored(self, rows: list) -> list:
+        """Rows whose ids are not in the database yet (a replay may have been cut short)"""
+        with self.session_factory() as db:
+            stored = set(db.execute(select(AuditLog.id).where(AuditLog.id.in_([row['id'] for row in rows]))).scalars())
+        return [row for row in rows if row['id'] not in stored]
+
+    def _spill(self, rows: list):
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        lines = []
+        for row in rows:
+            record = dict(row)
+            record['created_at'] = row['created_at'].isoformat()
+            lines.append(json.dumps(record))
+
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        self.stats['spilled'] += len(rows)
+
+    def _recover(self):
+        """Replay the spill file; leave degraded mode only if it fully drains"""
+
+        self._last_recovery_attempt = time.monotonic()
+        replay_path = self.replay_path
+
+        if os.path.exists(replay_path):
+            # Left behind by a crash mid-replay: its rows are older, so they go first
+            if os.path.exists(self.spill_path):
+                with open(self.spill_path, encoding='utf-8') as src, open(replay_path, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.spill_path)
+        elif os.path.exists(self.spill_path):
+            os.replace(self.spill_path, replay_path)
+        else:
+            self._degraded = False
+            return
+
+        with open(replay_path, encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+
+        replayed = 0
+        try:
+            for start in range(0, len(lines), self.batch_size):
+                rows = []
+                for line in lines[start:start + self.batch_size]:
+                    row = json.loads(line)
+                    row['created_at'] = datetime.fromisoformat(row['created_at'])
+                    rows.append(row)
+
+                elapsed = self._insert(self._not_stored(rows))
+                replayed += len(rows)
+                if elapsed > self.slow_threshold:
+                    raise TimeoutError(f"replay batch took {elapsed * 1000:.0f}ms")
+        except Exception as e:
+            self.logger.warning("Audit spill replay paused after %d rows: %s", replayed, e)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines[replayed:])
+        else:
+            self._degraded = False
+            self.logger.info("Replayed %d spilled audit events", replayed)
+        finally:
+            self.stats['replayed'] += replayed
+            os.remove(replay_path)
+
+class NullAuditSink:
+    """Discards events; the default for agents built outside the app (tests, benchmarks)"""
+
+    def __init__(self):
+        self.stats = {'written': 0, 'spilled': 0, 'replayed': 0, 'dropped': 0}
+
+    def emit(self, event_type: str, severity: str, description: str, **fields):
+        self.stats['dropped'] += 1
+
+    def close(self, timeout: float = 5.0):
+        pass
+
+@lru_cache()
+def get_audit_sink() -> AuditEventSink:
+    return AuditEventSink().start()
@@ -0,0 +1,194 @@
+"""
+Live fan-out of scoring decisions to dashboard subscribers
+
+One producer (the scoring path) appends to a fixed-size ring; every
+subscriber keeps its own cursor into it. publish() is O(1) whatever the
+number of subscribers: it stores the event and, at most once per tick,
+schedules a single wake-up that releases all waiting subscribers. Each
+subscriber then reads everything new since its cursor in one batch, so
+updates are coalesced per tick rather than pushed per event.
+
+A subscriber that falls more than the ring size behind has lost events:
+with FEED_SLOW_CONSUMER=skip it jumps to the oldest retained event and is
+told how many it missed, with drop it is disconnected.
+"""
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+class SlowConsumer(Exception):
+    """The subscriber fell behind the ring and the policy is to drop it"""
+
+class FeedEvent:
+    __slots__ = ("seq", "decision", "fraud_score", "risk_level", "data", "encoded")
+
+    def __init__(self, seq: int, decision: str, fraud_score: float, risk_level: str, data: dict):
+        self.seq = seq
+        self.decision = decision
+        self.fraud_score = fraud_score
+        self.risk_level = risk_level
+        self.data = data
+        self.encoded: Optional[bytes] = None  # filled once by the first reader that sends it
+
+class Subscription:
+    __slots__ = ("cursor", "decisions", "risk_levels", "min_score", "missed")
+
+    def __init__(
+        self,
+        cursor: int,
+        decisions: Optional[FrozenSet[str]] = None,
+        risk_levels: Optional[FrozenSet[str]] = None,
+        min_score: float = 0.0
+    ):
+        self.cursor = cursor
+        self.decisions = decisions
+        self.risk_levels = risk_levels
+        self.min_score = min_score
+        self.missed = 0
+
+    def matches(self, event: FeedEvent) -> bool:
+        return (
+            (self.decisions is None or event.decision in self.decisions)
+            and (self.risk_levels is None or event.risk_level in self.risk_levels)
+            and event.fraud_score >= self.min_score
+        )
+
+class DecisionFeed:
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        tick_ms: Optional[int] = None,
+        max_subscribers: Optional[int] = None,
+        slow_consumer: Optional[str] = None
+    ):
+        settings = get_settings()
+        self.capacity = capacity or settings.FEED_BUFFER_SIZE
+        self.tick = (tick_ms or settings.FEED_TICK_MS) / 1000
+        self.max_subscribers = max_subscribers or settings.FEED_MAX_SUBSCRIBERS
+        self.slow_consumer = slow_consumer or settings.FEED_SLOW_CONSUMER
+
+        self._ring: List[Optional[FeedEvent]] = [None] * self.capacity
+        self._seq = 0  # sequence number of the next event
+        self._subscribers = set()
+        self._waiter: Optional[asyncio.Future] = None
+        self._wake_loop = None  # loop a wake-up is scheduled on, if any
+
+        self.stats = {'published': 0, 'dropped_subscribers': 0, 'missed_events': 0}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    # ============ PRODUCER ============
+
+    def publish(self, result: dict, transaction: dict):
+        """Append one scoring result; nothing is kept while nobody is subscribed"""
+
+        if not self._subscribers:
+            return
+        seq = self._seq
+        self._ring[seq % self.capacity] = FeedEvent(
+            seq,
+            result['decision'],
+            float(result.get('fraud_score') or 0.0),
+            result.get('risk_level'),
+            {
+                'transaction_id': result.get('transaction_id'),
+                'user_id': transaction.get('user_id'),
+                'amount': transaction.get('amount'),
+                'merchant': transaction.get('merchant'),
+                'merchant_category': transaction.get('merchant_category'),
+                'decision': result['decision'],
+                'fraud_score': result.get('fraud_score'),
+                'risk_level': result.get('risk_level'),
+                'ts': time.time(),
+            },
+        )
+        self._seq = seq + 1
+        self.stats['published'] += 1
+
+        loop = asyncio.get_running_loop()
+        if self._wake_loop is not loop:
+            self._wake_loop = loop
+            loop.call_later(self.tick, self._wake)
+
+    def _wake(self):
+        self._wake_loop = None
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    # ============ SUBSCRIBERS ============
+
+    def subscribe(
+        self,
+        decisions: Optional[FrozenSet[str]] = None,
+        risk_levels: Optional[FrozenSet[str]] = None,
+        min_score: float = 0.0,
+        last_event_id: Optional[int] = None
+    ) -> Optional[Subscription]:
+        """New subscription from now (or after last_event_id if still retained); None when full"""
+
+        if self.full:
+            return None
+        cursor = self._seq
+        if last_event_id is not None and self._seq - self.capacity <= last_event_id < self._seq:
+            cursor = last_event_id + 1
+        subscription = Subscription(cursor, decisions, risk_levels, min_score)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def wait(self, subscription: Subscription, timeout: float) -> bool:
+        """Wait for the next tick with new events; False on timeout"""
+        if subscription.cursor < self._seq and self._wake_loop is None:
+            return True  # the tick for these events has already fired
+        loop = asyncio.get_running_loop()
+        if self._waiter is None or self._waiter.get_loop() is not loop:
+            self._waiter = loop.create_future()
+        try:
+            # Shield: the future is shared, a timeout must not cancel it for everyone
+            await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def read(self, subscription: Subscription) -> List[FeedEvent]:
+        """Matching events since the subscription's cursor"""
+
+        oldest = max(0, self._seq - self.capacity)
+        if subscription.cursor < oldest:
+            lost = oldest - subscription.cursor
+            self.stats['missed_events'] += lost
+            if self.slow_consumer == "drop":
+                self.stats['dropped_subscribers'] += 1
+                self.unsubscribe(subscription)
+                raise SlowConsumer(f"{lost} events behind")
+            subscription.missed += lost
+            subscription.cursor = oldest
+
+        ring, capacity = self._ring, self.capacity
+        events = []
+        for seq in range(subscription.cursor, self._seq):
+            event = ring[seq % capacity]
+            if subscription.matches(event):
+                events.append(event)
+        subscription.cursor = self._seq
+        return events
+
+@lru_cache()
+def get_decision_feed() -> DecisionFeed:
+    return DecisionFeed()
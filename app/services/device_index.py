@@ -0,0 +1,111 @@
+import hashlib
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRUST_SCORE = 0.5
+
+def hash_key(*parts: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+class DeviceIndex:
+    """
+    In-memory (user, device) index for the is_new_device feature
+
+    Devices are keyed by fingerprint when the client sends one, otherwise by
+    IP. Keys are stored as 64-bit hashes in a dict of trust scores, so a
+    lookup is a single hash probe and never touches the database. The index
+    is warmed from the devices table at startup and kept current with
+    observe() as transactions are scored.
+    """
+
+    def __init__(self):
+        self._devices = {}     # hash(user_id, device key) -> trust score
+        self._users = set()    # hash(user_id) for users with a known device
+        self.logger = logging.getLogger(__name__)
+
+    def __len__(self):
+        return len(self._devices)
+
+    @staticmethod
+    def _device_hash(user_id: str, fingerprint: Optional[str], ip: Optional[str]) -> Optional[int]:
+        if fingerprint:
+            return hash_key(user_id, "fp", fingerprint)
+        if ip:
+            return hash_key(user_id, "ip", ip)
+        return None
+
+    def warm(self, session_factory=None, batch_size: int = 5000) -> int:
+        """Load every known device from the devices table"""
+
+        from app.models import Device
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+
+        loaded = 0
+        with session_factory() as db:
+            rows = db.execute(
+                select(Device.user_id, Device.device_fingerprint, Device.device_ip, Device.trust_score)
+                .execution_options(yield_per=batch_size)
+            )
+            for user_id, fingerprint, ip, trust_score in rows:
+                trust = trust_score if trust_score is not None else DEFAULT_TRUST_SCORE
+                # Register both keys so requests without a fingerprint still match by IP
+                if fingerprint:
+                    self._devices[hash_key(user_id, "fp", fingerprint)] = trust
+                if ip:
+                    self._devices[hash_key(user_id, "ip", ip)] = trust
+                self._users.add(hash_key(user_id))
+                loaded += 1
+
+        self.logger.info("Device index warmed with %d devices", loaded)
+        return loaded
+
+    def lookup(self, user_id: str, fingerprint: Optional[str] = None, ip: Optional[str] = None) -> Tuple[int, float]:
+        """
+        Returns (is_new_device, trust_score)
+
+        A device only counts as new for users that already have known
+        devices; a user's very first device is not treated as suspicious.
+        """
+
+        key = self._device_hash(user_id, fingerprint, ip)
+        if key is not None:
+            trust = self._devices.get(key)
+            if trust is not None:
+                return 0, trust
+
+        if hash_key(user_id) not in self._users:
+            return 0, DEFAULT_TRUST_SCORE
+        return 1, 0.0
+
+    def observe(self, user_id: str, fingerprint: Optional[str] = None, ip: Optional[str] = None,
+                trust_score: float = DEFAULT_TRUST_SCORE):
+        """Remember a device seen on a scored transaction"""
+
+        key = self._device_hash(user_id, fingerprint, ip)
+        if key is None:
+            return
+        self._devices[key] = max(self._devices.get(key, 0.0), trust_score)
+        if fingerprint and ip:
+            ip_key = hash_key(user_id, "ip", ip)
+            self._devices[ip_key] = max(self._devices.get(ip_key, 0.0), trust_score)
+        self._users.add(hash_key(user_id))
+
+    def export_arrays(self) -> dict:
+        return {
+            'keys': np.fromiter(self._devices.keys(), dtype=np.uint64, count=len(self._devices)),
+            'trust': np.fromiter(self._devices.values(), dtype=np.float32, count=len(self._devices)),
+            'users': np.fromiter(self._users, dtype=np.uint64, count=len(self._users)),
+        }
+
+    def import_arrays(self, arrays: dict):
+        self._devices.update(zip(arrays['keys'].tolist(), arrays['trust'].tolist()))
+        self._users.update(arrays['users'].tolist())
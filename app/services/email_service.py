@@ -4,11 +4,20 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from app.config import get_settings
+from app.services.metrics import EMAIL_QUEUE_DEPTH
 import asyncio
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Policy risk levels as shown to customers
+RISK_LABELS = {
+    "CRITICAL": "🔴 CRITICAL",
+    "MEDIUM": "🟠 HIGH",
+    "LOW": "🟡 MEDIUM",
+    "MINIMAL": "🟢 LOW",
+}
+
 class EmailService:
     """Enhanced email service with user personalization"""
     
@@ -296,14 +305,15 @@ class EmailService:
         fraud_score: float, 
         category: str = "UNKNOWN", 
         timestamp: Optional[str] = None, 
-        tx_id: str = "N/A"
+        tx_id: str = "N/A",
+        risk_level: Optional[str] = None
     ) -> dict:
         """Send professional fraud alert email (ENHANCED)"""
         
         if timestamp is None:
             timestamp = datetime.now().strftime("%d %b %Y, %I:%M %p")
         
-        risk_level = self._get_risk_level(fraud_score)
+        risk_level = self._get_risk_level(fraud_score, risk_level)
         fraud_percentage = int(fraud_score * 100)
         
         subject = f"Security Alert: Unusual Transaction Detected - Action Required"
@@ -719,6 +729,7 @@ class EmailService:
     
     async def _send_email(self, recipient: str, subject: str, html_body: str) -> dict:
         """Send email using async executor"""
+        EMAIL_QUEUE_DEPTH.inc()
         try:
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(
@@ -732,6 +743,8 @@ class EmailService:
         except Exception as e:
             self.logger.error(f"Error sending email: {e}")
             return {"success": False, "error": str(e)}
+        finally:
+            EMAIL_QUEUE_DEPTH.dec()
     
     def _send_smtp(self, recipient: str, subject: str, html_body: str) -> dict:
         """Synchronous SMTP send"""
@@ -768,13 +781,9 @@ class EmailService:
             self.logger.error(f"SMTP error: {e}")
             return {"success": False, "error": str(e)}
     
-    def _get_risk_level(self, fraud_score: float) -> str:
-        """Get risk level label from score"""
-        if fraud_score >= 0.80:
-            return "🔴 CRITICAL"
-        elif fraud_score >= 0.50:
-            return "🟠 HIGH"
-        elif fraud_score >= 0.20:
-            return "🟡 MEDIUM"
-        else:
-            return "🟢 LOW"
\ No newline at end of file
+    def _get_risk_level(self, fraud_score: float, risk_level: Optional[str] = None) -> str:
+        """Risk label for the email: the policy's risk level, or the default bands of the score"""
+        if risk_level is None:
+            from app.services.policy import risk_level as policy_risk_level
+            risk_level = policy_risk_level(fraud_score)
+        return RISK_LABELS.get(risk_level, "🟢 LOW")
\ No newline at end of file
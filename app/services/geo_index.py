@@ -0,0 +1,103 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from app.services.state_snapshot import group_offsets, pack_strings, unpack_strings
+
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized great-circle distance; inputs broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class HomeLocationIndex:
+    """
+    Each user's typical locations as a few weighted centroids
+
+    Per user we keep a small float32 array of rows (lat, lon, weight). An
+    observed location within `merge_radius_km` of the nearest centroid pulls
+    that centroid towards it (weighted running mean); otherwise it opens a
+    new centroid, replacing the lightest one once `max_centroids` is reached.
+    """
+
+    def __init__(self, max_centroids: int = 4, merge_radius_km: float = 25.0):
+        self.max_centroids = max_centroids
+        self.merge_radius_km = merge_radius_km
+        self._centroids: Dict[str, np.ndarray] = {}
+
+    def centroids(self, user_id: str) -> Optional[np.ndarray]:
+        return self._centroids.get(user_id)
+
+    def nearest_distance_km(self, user_id: str, lat: float, lon: float) -> float:
+        """Distance to the closest known location (0.0 for users with none)"""
+        centroids = self._centroids.get(user_id)
+        if centroids is None:
+            return 0.0
+        return float(haversine_km(lat, lon, centroids[:, 0], centroids[:, 1]).min())
+
+    def batch_nearest_distance_km(self, user_ids: Sequence[str], lats, lons) -> np.ndarray:
+        """
+        nearest_distance_km for a whole batch in one haversine pass
+
+        Centroids are gathered into a padded (batch, max_centroids) matrix;
+        padding is NaN and ignored by nanmin.
+        """
+        n = len(user_ids)
+        c_lat = np.full((n, self.max_centroids), np.nan)
+        c_lon = np.full((n, self.max_centroids), np.nan)
+        for i, user_id in enumerate(user_ids):
+            centroids = self._centroids.get(user_id)
+            if centroids is not None:
+                c_lat[i, :len(centroids)] = centroids[:, 0]
+                c_lon[i, :len(centroids)] = centroids[:, 1]
+
+        lats = np.asarray(lats, dtype=np.float64)[:, None]
+        lons = np.asarray(lons, dtype=np.float64)[:, None]
+        distances = haversine_km(lats, lons, c_lat, c_lon)
+
+        known = ~np.isnan(c_lat[:, 0])
+        result = np.zeros(n)
+        result[known] = np.nanmin(distances[known], axis=1)
+        return result
+
+    def update(self, user_id: str, lat: float, lon: float):
+        """Fold one observed location into the user's centroids"""
+        centroids = self._centroids.get(user_id)
+        if centroids is None:
+            self._centroids[user_id] = np.array([[lat, lon, 1.0]], dtype=np.float32)
+            return
+
+        distances = haversine_km(lat, lon, centroids[:, 0], centroids[:, 1])
+        nearest = int(distances.argmin())
+
+        if distances[nearest] <= self.merge_radius_km:
+            weight = centroids[nearest, 2] + 1.0
+            centroids[nearest, 0] += (lat - centroids[nearest, 0]) / weight
+            centroids[nearest, 1] += (lon - centroids[nearest, 1]) / weight
+            centroids[nearest, 2] = weight
+        elif len(centroids) < self.max_centroids:
+            self._centroids[user_id] = np.vstack([centroids, np.array([[lat, lon, 1.0]], dtype=np.float32)])
+        else:
+            centroids[int(centroids[:, 2].argmin())] = (lat, lon, 1.0)
+
+    def export_arrays(self) -> dict:
+        users = list(self._centroids)
+        blob, user_offsets = pack_strings(users)
+        rows = [self._centroids[user_id] for user_id in users]
+        return {
+            'user_blob': blob,
+            'user_offsets': user_offsets,
+            'offsets': group_offsets([len(centroids) for centroids in rows]),
+            'centroids': np.concatenate(rows) if rows else np.zeros((0, 3), dtype=np.float32),
+        }
+
+    def import_arrays(self, arrays: dict):
+        users = unpack_strings(arrays['user_blob'], arrays['user_offsets'])
+        offsets = arrays['offsets'].tolist()
+        centroids = arrays['centroids']
+        for i, user_id in enumerate(users):
+            # Copy out of the (read-only) mmap: centroids are updated in place
+            self._centroids[user_id] = np.array(centroids[offsets[i]:offsets[i + 1]])
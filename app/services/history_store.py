@@ -1,5 +1,10 @@
 from collections import defaultdict
+from datetime import datetime
 import asyncio
+import time
+import numpy as np
+from app.services.metrics import HISTORY_LOCK_WAIT
+from app.services.state_snapshot import group_offsets, pack_strings, unpack_strings
 
 class UserTransactionHistory:
     def __init__(self):
@@ -7,9 +12,57 @@ class UserTransactionHistory:
         self._lock = asyncio.Lock()
 
     async def add_transaction(self, user_id: str, transaction: dict):
+        started = time.perf_counter()
         async with self._lock:
+            HISTORY_LOCK_WAIT.observe(time.perf_counter() - started)
             self._history[user_id].append(transaction)
 
     async def get_user_history(self, user_id: str):
+        started = time.perf_counter()
         async with self._lock:
+            HISTORY_LOCK_WAIT.observe(time.perf_counter() - started)
             return self._history.get(user_id, [])
+
+    async def get_user_histories(self, user_ids: list) -> list:
+        """Histories of several users under one lock acquisition"""
+        started = time.perf_counter()
+        async with self._lock:
+            HISTORY_LOCK_WAIT.observe(time.perf_counter() - started)
+            return [self._history.get(user_id, []) for user_id in user_ids]
+
+    def restore_transaction(self, user_id: str, transaction: dict):
+        """Append without the lock; only for replay at startup, before serving"""
+        self._history[user_id].append(transaction)
+
+    def export_arrays(self) -> dict:
+        """Snapshot columns: the amount and event time of every stored transaction"""
+        users = list(self._history)
+        histories = [self._history[user_id] for user_id in users]
+        total = sum(len(history) for history in histories)
+        user_blob, user_offsets = pack_strings(users)
+        return {
+            'user_blob': user_blob,
+            'user_offsets': user_offsets,
+            'offsets': group_offsets([len(history) for history in histories]),
+            'amount': np.fromiter((tx.get('amount', 0.0) for history in histories for tx in history), dtype=np.float64, count=total),
+            'timestamp': np.fromiter((_epoch(tx.get('timestamp')) for history in histories for tx in history), dtype=np.float64, count=total),
+        }
+
+    def import_arrays(self, arrays: dict):
+        """Rebuild from a snapshot; restored entries carry only amount and timestamp"""
+        users = unpack_strings(arrays['user_blob'], arrays['user_offsets'])
+        offsets = arrays['offsets'].tolist()
+        amounts = arrays['amount'].tolist()
+        timestamps = arrays['timestamp'].tolist()
+        for i, user_id in enumerate(users):
+            self._history[user_id] = [
+                {'amount': amounts[j], 'timestamp': datetime.fromtimestamp(timestamps[j])}
+                for j in range(offsets[i], offsets[i + 1])
+            ]
+
+def _epoch(ts) -> float:
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts).timestamp()
+    return float(ts) if ts is not None else 0.0
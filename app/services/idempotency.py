@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.config import get_settings
+from app.services.metrics import IDEMPOTENT_REPLAYS
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request (body or response-shaping parameters)"""
+
+def request_fingerprint(payload: dict, params: Optional[dict] = None) -> str:
+    """Hash of the body plus any query parameters that change the stored response"""
+    if params:
+        payload = {'body': payload, 'params': params}
+    body = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+class RedisIdempotencyBackend:
+    """Shares stored results across workers; in-flight sharing stays per process"""
+
+    def __init__(self, url: str, prefix: str = "verifai:idem:"):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Tuple[str, dict]]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["fingerprint"], entry["result"]
+
+    async def set(self, key: str, fingerprint: str, result: dict, ttl_seconds: int):
+        entry = json.dumps({"fingerprint": fingerprint, "result": result}, default=str)
+        await self.client.set(self.prefix + key, entry, ex=ttl_seconds)
+
+class IdempotencyCache:
+    """
+    Stored results for Idempotency-Key retries
+
+    Completed results live in a bounded in-process LRU with a TTL (and in
+    Redis when a backend is configured). Requests that arrive while the
+    first one is still being scored await the same future instead of
+    scoring again, so a burst of retries costs a single computation.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: int = None, backend=None):
+        settings = get_settings()
+        self.max_entries = max_entries or settings.IDEMPOTENCY_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS
+        self.backend = backend
+        self._results = OrderedDict()  # key -> (expires_at, fingerprint, result)
+        self._in_flight = {}           # key -> (fingerprint, Future)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[dict]]
+    ) -> Tuple[dict, bool]:
+        """Returns (result, replayed)"""
+
+        stored = self._lookup_local(key)
+        if stored is not None:
+            self._check(fingerprint, stored[0])
+            IDEMPOTENT_REPLAYS.inc("stored")
+            return stored[1], True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._check(fingerprint, in_flight[0])
+            IDEMPOTENT_REPLAYS.inc("in_flight")
+            return await asyncio.shield(in_flight[1]), True
+
+        # Register before the first await so concurrent duplicates find us
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            stored = await self._lookup_backend(key)
+            if stored is not None:
+                self._check(fingerprint, stored[0])
+                IDEMPOTENT_REPLAYS.inc("stored")
+                result, replayed = stored[1], True
+            else:
+                result, replayed = await compute(), False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        future.set_result(result)
+        if not replayed:
+            await self._store(key, fingerprint, result)
+        return result, replayed
+
+    @staticmethod
+    def _check(fingerprint: str, stored_fingerprint: str):
+        if fingerprint != stored_fingerprint:
+            raise IdempotencyConflict("Idempotency-Key reused with a different request body")
+
+    def _lookup_local(self, key: str) -> Optional[Tuple[str, dict]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, fingerprint, result = entry
+        if expires_at <= time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return fingerprint, result
+
+    async def _lookup_backend(self, key: str) -> Optional[Tuple[str, dict]]:
+        if self.backend is None:
+            return None
+        try:
+            stored = await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Idempotency backend lookup failed: %s", e)
+            return None
+        if stored is not None:
+            self._remember(key, *stored)
+        return stored
+
+    async def _store(self, key: str, fingerprint: str, result: dict):
+        self._remember(key, fingerprint, result)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, fingerprint, result, self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Idempotency backend store failed: %s", e)
+
+    def _remember(self, key: str, fingerprint: str, result: dict):
+        self._results[key] = (time.monotonic() + self.ttl_seconds, fingerprint, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+@lru_cache()
+def get_idempotency_cache() -> IdempotencyCache:
+    settings = get_settings()
+    backend = RedisIdempotencyBackend(settings.REDIS_URL) if settings.IDEMPOTENCY_REDIS_ENABLED else None
+    return IdempotencyCache(backend=backend)
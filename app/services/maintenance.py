@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, or_, select
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import AuditLog, VerificationToken
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'event_type', 'event_severity', 'description',
+    'ip_address', 'user_agent', 'meta_data', 'created_at'
+]
+
+class MaintenanceService:
+    """
+    Background housekeeping for tables that otherwise grow forever
+
+    - verification_tokens: expired or used tokens are deleted
+    - audit_logs: rows older than the retention window are appended to
+      monthly archive files (audit_logs_YYYY_MM.jsonl) and then deleted
+
+    Every statement touches at most `batch_size` rows and commits on its own,
+    so no run holds row locks for longer than one small batch.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None,
+        audit_retention_days: Optional[int] = None,
+        archive_dir: Optional[str] = None
+    ):
+        settings = get_settings()
+        self.session_factory = session_factory or SessionLocal
+        self.batch_size = batch_size or settings.MAINTENANCE_BATCH_SIZE
+        self.max_batches = max_batches or settings.MAINTENANCE_MAX_BATCHES
+        self.audit_retention_days = audit_retention_days or settings.AUDIT_LOG_RETENTION_DAYS
+        self.archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+        self.logger = logging.getLogger(__name__)
+
+    def purge_verification_tokens(self, now: Optional[datetime] = None) -> int:
+        """Delete expired/used verification tokens in bounded batches"""
+
+        now = now or datetime.utcnow()
+        deleted = 0
+
+        for _ in range(self.max_batches):
+            with self.session_factory() as db:
+                ids = db.execute(
+                    select(VerificationToken.id)
+                    .where(or_(
+                        VerificationToken.expires_at < now,
+                        VerificationToken.is_used.is_(True)
+                    ))
+                    .limit(self.batch_size)
+                ).scalars().all()
+
+                if not ids:
+                    break
+
+                db.execute(
+                    delete(VerificationToken)
+                    .where(VerificationToken.id.in_(ids))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+
+            deleted += len(ids)
+            if len(ids) < self.batch_size:
+                break
+
+        return deleted
+
+    def archive_audit_logs(self, now: Optional[datetime] = None) -> int:
+        """
+        Move audit logs past retention into monthly archive files
+
+        Rows are written (and fsynced) before they are deleted, so a crash
+        between the two steps can only duplicate rows in the archive, never
+        lose them.
+        """
+
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.audit_retention_days)
+        archived = 0
+
+        for _ in range(self.max_batches):
+            with self.session_factory() as db:
+                rows = db.execute(
+                    select(AuditLog)
+                    .where(AuditLog.created_at < cutoff)
+                    .order_by(AuditLog.created_at)
+                    .limit(self.batch_size)
+                ).scalars().all()
+
+                if not rows:
+                    break
+
+                self._write_archive(rows)
+
+                db.execute(
+                    delete(AuditLog)
+                    .where(AuditLog.id.in_([row.id for row in rows]))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+
+            archived += len(rows)
+            if len(rows) < self.batch_size:
+                break
+
+        return archived
+
+    def run_once(self) -> dict:
+        """Run every maintenance task once and report rows reclaimed"""
+
+        started = time.perf_counter()
+        report = {
+            'verification_tokens_deleted': self.purge_verification_tokens(),
+            'audit_logs_archived': self.archive_audit_logs(),
+        }
+        report['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        self.logger.info(
+            "[MAINTENANCE] tokens_deleted=%d audit_logs_archived=%d duration_ms=%.2f",
+            report['verification_tokens_deleted'],
+            report['audit_logs_archived'],
+            report['duration_ms']
+        )
+        return report
+
+    async def run_forever(self, interval_seconds: Optional[int] = None):
+        """Run maintenance periodically off the event loop"""
+
+        interval = interval_seconds or get_settings().MAINTENANCE_INTERVAL_SECONDS
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                await loop.run_in_executor(None, self.run_once)
+            except Exception as e:
+                self.logger.error(f"Maintenance run failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _write_archive(self, rows: list):
+        """Append rows to their month partition"""
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        partitions = {}
+        for row in rows:
+            partition = row.created_at.strftime("%Y_%m")
+            record = {column: getattr(row, column) for column in AUDIT_ARCHIVE_COLUMNS}
+            record['created_at'] = row.created_at.isoformat()
+            partitions.setdefault(partition, []).append(json.dumps(record))
+
+        for partition, lines in partitions.items():
+            path = os.path.join(self.archive_dir, f"audit_logs_{partition}.jsonl")
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
@@ -0,0 +1,81 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.services.device_index import hash_key
+from app.services.state_snapshot import group_offsets, pack_strings, unpack_strings
+
+class MerchantIndex:
+    """
+    Per-user merchant familiarity
+
+    Each user maps to two parallel arrays: sorted 64-bit merchant-name
+    hashes (uint64) and visit counts (uint32), i.e. 12 bytes per merchant.
+    Lookups are a binary search (np.searchsorted); new merchants are
+    inserted in place, keeping the arrays sorted.
+    """
+
+    def __init__(self):
+        self._merchants: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @staticmethod
+    def _merchant_hash(merchant: str) -> np.uint64:
+        return np.uint64(hash_key(merchant.strip().lower()))
+
+    def frequency(self, user_id: str, merchant: str) -> int:
+        """How many earlier transactions the user made at this merchant"""
+        entry = self._merchants.get(user_id)
+        if entry is None or not merchant:
+            return 0
+
+        hashes, counts = entry
+        key = self._merchant_hash(merchant)
+        i = int(np.searchsorted(hashes, key))
+        if i < len(hashes) and hashes[i] == key:
+            return int(counts[i])
+        return 0
+
+    def observe(self, user_id: str, merchant: str):
+        """Count one transaction at the merchant"""
+        if not merchant:
+            return
+
+        key = self._merchant_hash(merchant)
+        entry = self._merchants.get(user_id)
+        if entry is None:
+            self._merchants[user_id] = (
+                np.array([key], dtype=np.uint64),
+                np.array([1], dtype=np.uint32)
+            )
+            return
+
+        hashes, counts = entry
+        i = int(np.searchsorted(hashes, key))
+        if i < len(hashes) and hashes[i] == key:
+            counts[i] += 1
+        else:
+            self._merchants[user_id] = (
+                np.insert(hashes, i, key),
+                np.insert(counts, i, np.uint32(1))
+            )
+
+    def export_arrays(self) -> dict:
+        users = list(self._merchants)
+        blob, user_offsets = pack_strings(users)
+        entries = [self._merchants[user_id] for user_id in users]
+        return {
+            'user_blob': blob,
+            'user_offsets': user_offsets,
+            'offsets': group_offsets([len(hashes) for hashes, _ in entries]),
+            'hashes': np.concatenate([hashes for hashes, _ in entries]) if entries else np.zeros(0, dtype=np.uint64),
+            'counts': np.concatenate([counts for _, counts in entries]) if entries else np.zeros(0, dtype=np.uint32),
+        }
+
+    def import_arrays(self, arrays: dict):
+        users = unpack_strings(arrays['user_blob'], arrays['user_offsets'])
+        offsets = arrays['offsets'].tolist()
+        hashes, counts = arrays['hashes'], arrays['counts']
+        for i, user_id in enumerate(users):
+            # Copy out of the (read-only) mmap: counts are incremented in place
+            start, end = offsets[i], offsets[i + 1]
+            self._merchants[user_id] = (np.array(hashes[start:end]), np.array(counts[start:end]))
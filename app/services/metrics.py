@@ -0,0 +1,181 @@
+"""
+Minimal in-process metrics with Prometheus text exposition
+
+Recording a sample is a dict lookup plus a bisect and a few list updates,
+cheap enough for the per-transaction path. Rendering happens only when
+/metrics is scraped.
+"""
+
+import bisect
+import math
+from typing import Callable, Dict, Sequence, Tuple
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> list:
+        lines = self.header()
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._functions: Dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, *labelvalues):
+        self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set_function(self, fn: Callable[[], float], *labelvalues):
+        """Evaluate fn at scrape time instead of tracking a value"""
+        self._functions[labelvalues] = fn
+
+    def value(self, *labelvalues) -> float:
+        fn = self._functions.get(labelvalues)
+        return fn() if fn else self._values.get(labelvalues, 0.0)
+
+    def render(self) -> list:
+        lines = self.header()
+        keys = sorted(set(self._values) | set(self._functions))
+        for labelvalues in keys:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(self.value(*labelvalues))}")
+        return lines
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labelvalues) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list:
+        lines = self.header()
+        for labelvalues, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+PHASE_DURATION = REGISTRY.register(Histogram(
+    "verifai_phase_duration_seconds", "Agent phase latency", ["phase"]
+))
+MODEL_INFERENCE = REGISTRY.register(Histogram(
+    "verifai_model_inference_seconds", "Scaler + predict_proba latency"
+))
+HISTORY_LOCK_WAIT = REGISTRY.register(Histogram(
+    "verifai_history_lock_wait_seconds", "Time waiting for the user history lock"
+))
+EMAIL_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "verifai_email_queue_depth", "Emails waiting on or running in the SMTP executor"
+))
+POLICY_EVALUATION = REGISTRY.register(Histogram(
+    "verifai_policy_evaluation_seconds", "Decision policy (threshold/rule table) evaluation latency"
+))
+DECISIONS = REGISTRY.register(Counter(
+    "verifai_decisions_total", "Agent decisions", ["decision"]
+))
+CASCADE_STAGE = REGISTRY.register(Counter(
+    "verifai_cascade_scored_total", "Transactions by the cascade stage that produced their score", ["stage"]
+))
+IDEMPOTENT_REPLAYS = REGISTRY.register(Counter(
+    "verifai_idempotent_replays_total", "Duplicate submissions answered without rescoring", ["source"]
+))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "verifai_admission_in_flight", "Scorings currently running"
+))
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "verifai_admission_queue_depth", "Requests waiting for a scoring slot"
+))
+ADMISSION_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "verifai_admission_queue_wait_seconds", "Time queued before a scoring slot was granted"
+))
+ADMISSION_SHED = REGISTRY.register(Counter(
+    "verifai_admission_shed_total", "Requests shed by admission control", ["reason"]
+))
+
+def observe_phase(phase: str, seconds: float):
+    """AgentController phase listener"""
+    PHASE_DURATION.observe(seconds, phase)
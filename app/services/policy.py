@@ -0,0 +1,160 @@
+"""
+Decision policy: fraud score -> APPROVE / HOLD / BLOCK
+
+Thresholds come from Settings (FRAUD_HIGH_RISK_THRESHOLD for block,
+FRAUD_MEDIUM_RISK_THRESHOLD for hold) and can be overridden per segment by
+an optional JSON rule table at POLICY_RULES_PATH, re-read when it changes:
+
+    {
+      "rules": [
+        {"name": "crypto", "merchant_category": ["CRYPTO", "GAMBLING"], "block": 0.70, "hold": 0.40},
+        {"name": "large", "min_amount": 100000, "hold": 0.35}
+      ]
+    }
+
+Rules are checked in order and the first match wins. A rule may omit
+"block" or "hold" to keep the default. "min_amount" is inclusive and
+"max_amount" is exclusive.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.metrics import POLICY_EVALUATION
+
+logger = logging.getLogger(__name__)
+
+APPROVE, HOLD, BLOCK = 0, 1, 2
+
+RISK_LEVEL_BY_DECISION = {BLOCK: "CRITICAL", HOLD: "MEDIUM"}
+
+def risk_level(score: float, decision: Optional[int] = None) -> str:
+    """
+    Risk band for a score
+
+    With the decision code the band follows the thresholds that decided it
+    (a rule may block below FRAUD_HIGH_RISK_THRESHOLD or approve above
+    FRAUD_MEDIUM_RISK_THRESHOLD): BLOCK is CRITICAL, HOLD is MEDIUM and an
+    approval is LOW or MINIMAL. Without it the default thresholds apply.
+    """
+    if decision in RISK_LEVEL_BY_DECISION:
+        return RISK_LEVEL_BY_DECISION[decision]
+    settings = get_settings()
+    if decision is None:
+        if score >= settings.FRAUD_HIGH_RISK_THRESHOLD:
+            return "CRITICAL"
+        elif score >= settings.FRAUD_MEDIUM_RISK_THRESHOLD:
+            return "MEDIUM"
+    if score >= settings.FRAUD_LOW_RISK_THRESHOLD:
+        return "LOW"
+    return "MINIMAL"
+
+@dataclass
+class PolicyRule:
+    name: str
+    merchant_category: Optional[List[str]] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    block: Optional[float] = None
+    hold: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PolicyRule":
+        categories = data.get("merchant_category")
+        if isinstance(categories, str):
+            categories = [categories]
+        return cls(
+            name=data.get("name", "unnamed"),
+            merchant_category=[c.upper() for c in categories] if categories else None,
+            min_amount=data.get("min_amount"),
+            max_amount=data.get("max_amount"),
+            block=data.get("block"),
+            hold=data.get("hold"),
+        )
+
+class PolicyEngine:
+    """Applies the threshold/rule table to a whole batch of scores at once"""
+
+    def __init__(self, rules_path: Optional[str] = None, reload_interval: Optional[float] = None):
+        settings = get_settings()
+        self.rules_path = rules_path if rules_path is not None else settings.POLICY_RULES_PATH
+        self.reload_interval = reload_interval if reload_interval is not None else settings.POLICY_RELOAD_INTERVAL_SECONDS
+        self.default_block = settings.FRAUD_HIGH_RISK_THRESHOLD
+        self.default_hold = settings.FRAUD_MEDIUM_RISK_THRESHOLD
+        self.rules: List[PolicyRule] = []
+        self._mtime = None
+        self._next_check = 0.0
+        self.maybe_reload(force=True)
+
+    def maybe_reload(self, force: bool = False):
+        """Re-read the rule file if it changed (checked at most every reload_interval)"""
+
+        if not self.rules_path:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+
+        try:
+            mtime = os.path.getmtime(self.rules_path)
+            if mtime == self._mtime:
+                return
+            with open(self.rules_path, encoding="utf-8") as f:
+                table = json.load(f)
+            rules = [PolicyRule.from_dict(rule) for rule in table.get("rules", [])]
+        except FileNotFoundError:
+            if self._mtime is not None or force:
+                logger.warning("Policy rules file %s not found; using default thresholds", self.rules_path)
+            self.rules, self._mtime = [], None
+            return
+        except Exception as e:
+            logger.error("Policy rules not reloaded, keeping previous table: %s", e)
+            return
+
+        self.rules, self._mtime = rules, mtime
+        logger.info("Loaded %d policy rules from %s", len(rules), self.rules_path)
+
+    def decide(self, scores: Sequence[float], categories: Sequence[str], amounts: Sequence[float]) -> np.ndarray:
+        """Decision codes (APPROVE/HOLD/BLOCK) for a batch in one NumPy pass"""
+
+        started = time.perf_counter()
+        self.maybe_reload()
+
+        scores = np.asarray(scores, dtype=np.float64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        n = scores.shape[0]
+
+        block = np.full(n, self.default_block)
+        hold = np.full(n, self.default_hold)
+
+        if self.rules:
+            categories = np.array([(c or "").upper() for c in categories], dtype=object)
+            unmatched = np.ones(n, dtype=bool)
+            for rule in self.rules:
+                mask = unmatched.copy()
+                if rule.merchant_category is not None:
+                    mask &= np.isin(categories, rule.merchant_category)
+                if rule.min_amount is not None:
+                    mask &= amounts >= rule.min_amount
+                if rule.max_amount is not None:
+                    mask &= amounts < rule.max_amount
+                if rule.block is not None:
+                    block[mask] = rule.block
+                if rule.hold is not None:
+                    hold[mask] = rule.hold
+                unmatched &= ~mask
+
+        codes = np.where(scores >= block, BLOCK, np.where(scores >= hold, HOLD, APPROVE))
+        POLICY_EVALUATION.observe(time.perf_counter() - started)
+        return codes
+
+    def decide_one(self, score: float, category: str, amount: float) -> int:
+        return int(self.decide([score], [category], [amount])[0])
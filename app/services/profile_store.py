@@ -0,0 +1,436 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Float, case, cast, or_, select
+
+from app.config import get_settings
+from app.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+class ProfileState:
+    """
+    Running aggregates for one user; every field merges exactly
+
+    Amount mean/variance use Welford's update (and Chan's merge), typical
+    locations are the top cells of a space-saving counter, so a profile
+    built from a partial stream folds into the stored one without a scan.
+    """
+
+    __slots__ = ("count", "blocked", "mean", "m2", "first_ts", "last_ts", "locations", "loaded")
+
+    def __init__(self):
+        self.count = 0
+        self.blocked = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.first_ts = None
+        self.last_ts = None
+        self.locations: List[list] = []  # [lat, lon, count], rounded to ~1 km cells
+        self.loaded = False  # stored row (if any) already merged in
+
+    def observe(self, amount: float, ts: float, lat: Optional[float], lon: Optional[float], blocked: bool, max_locations: int):
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        if blocked:
+            self.blocked += 1
+        elif lat is not None and lon is not None:
+            self._count_location(round(lat, 2), round(lon, 2), 1, max_locations)
+
+    def _count_location(self, lat: float, lon: float, weight: int, max_locations: int):
+        for cell in self.locations:
+            if cell[0] == lat and cell[1] == lon:
+                cell[2] += weight
+                return
+        if len(self.locations) < max_locations:
+            self.locations.append([lat, lon, weight])
+            return
+        # Space-saving: the new cell takes over the least frequent slot
+        smallest = min(self.locations, key=lambda cell: cell[2])
+        smallest[0], smallest[1], smallest[2] = lat, lon, smallest[2] + weight
+
+    def merge(self, other: "ProfileState", max_locations: int):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.blocked += other.blocked
+        self.first_ts = min(ts for ts in (self.first_ts, other.first_ts) if ts is not None)
+        self.last_ts = max(ts for ts in (self.last_ts, other.last_ts) if ts is not None)
+        for lat, lon, weight in sorted(other.locations, key=lambda cell: -cell[2]):
+            self._count_location(lat, lon, weight, max_locations)
+
+    @classmethod
+    def from_row(cls, row: UserProfile) -> "ProfileState":
+        state = cls()
+        state.count = row.transaction_count or 0
+        state.blocked = row.blocked_count or 0
+        state.mean = row.avg_transaction_amount or 0.0
+        state.m2 = row.amount_m2 or 0.0
+        state.first_ts = row.first_seen_at.timestamp() if row.first_seen_at else None
+        state.last_ts = row.last_seen_at.timestamp() if row.last_seen_at else None
+        state.locations = json.loads(row.typical_locations) if row.typical_locations else []
+        state.loaded = True
+        return state
+
+    def to_row(self, user_id: str, locations: Optional[List[list]] = None) -> dict:
+        return {
+            'user_id': user_id,
+            'transaction_count': self.count,
+            'blocked_count': self.blocked,
+            'avg_transaction_amount': self.mean,
+            'amount_m2': self.m2,
+            'first_seen_at': datetime.fromtimestamp(self.first_ts) if self.first_ts is not None else None,
+            'last_seen_at': datetime.fromtimestamp(self.last_ts) if self.last_ts is not None else None,
+            'typical_locations': json.dumps(self.locations if locations is None else locations, separators=(",", ":")),
+            'updated_at': datetime.utcnow(),
+        }
+
+    def to_profile(self, user_id: str) -> dict:
+        std = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+        days = max(1.0, (self.last_ts - self.first_ts) / 86400) if self.count else 1.0
+        return {
+            'user_id': user_id,
+            'transaction_count': self.count,
+            'blocked_count': self.blocked,
+            'avg_transaction_amount': round(self.mean, 2),
+            'std_transaction_amount': round(std, 2),
+            'typical_daily_frequency': round(self.count / days, 2),
+            'typical_locations': [
+                {'lat': lat, 'lon': lon, 'count': count}
+                for lat, lon, count in sorted(self.locations, key=lambda cell: -cell[2])
+            ],
+            'first_seen': datetime.fromtimestamp(self.first_ts).isoformat() if self.first_ts is not None else None,
+            'last_updated': datetime.fromtimestamp(self.last_ts).isoformat() if self.last_ts is not None else None,
+        }
+
+class ProfileStore:
+    """
+    Materialized user profiles: in-memory read cache, batched additive writes to user_profiles
+
+    observe() updates the cached profile in O(1) on the scoring path and
+    adds the observation to the user's pending delta. A background thread
+    writes the deltas every flush interval as one upsert that merges them
+    into the stored aggregates in SQL (count = count + excluded.count, Chan's
+    merge for mean and m2), so several workers writing the same user add up
+    instead of overwriting each other, and a row another worker created
+    first is simply merged into. This is write-behind rather than
+    write-through: a write per scored transaction would put a database round
+    trip back on the scoring path, so a busy user costs one row write per
+    interval and a crash loses at most one interval of profile updates.
+
+    If a batch fails, its rows are retried one at a time so one bad row does
+    not hold back the rest; rows that still fail are kept for the next
+    attempt after the retry interval, up to max_entries users. A user seen here before its stored row
+    is loaded gets a partial cached profile; the stored row is merged in
+    when it is first read or flushed. Typical locations are the exception to
+    additive merging: the stored list is replaced by this worker's merged
+    view, so across workers they are approximate.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        max_entries: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        retry_interval_seconds: Optional[int] = None,
+        max_locations: Optional[int] = None
+    ):
+        settings = get_settings()
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+
+        self.session_factory = session_factory
+        self.max_entries = max_entries or settings.PROFILE_CACHE_MAX_ENTRIES
+        self.flush_interval = (flush_interval_ms or settings.PROFILE_FLUSH_INTERVAL_MS) / 1000
+        self.retry_interval = retry_interval_seconds or settings.PROFILE_RETRY_INTERVAL_SECONDS
+        self.max_locations = max_locations or settings.PROFILE_MAX_LOCATIONS
+
+        self._cache: "OrderedDict[str, ProfileState]" = OrderedDict()
+        self._deltas: Dict[str, ProfileState] = {}  # observations not yet written, per user
+        self._flushing: Dict[str, ProfileState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._retry_at = 0.0
+
+        self.stats = {'written': 0, 'loaded': 0, 'write_errors': 0, 'dropped': 0}
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profile-store", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, timeout: float = 5.0):
+        """Stop the writer after a final flush"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ============ SCORING PATH ============
+
+    def observe(self, user_id: str, transaction: dict, blocked: bool):
+        location = transaction.get('user_location') or {}
+        ts = transaction.get('timestamp') or datetime.now()
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        with self._lock:
+            state = self._cache.get(user_id)
+            if state is None:
+                state = self._cache[user_id] = ProfileState()
+            else:
+                self._cache.move_to_end(user_id)
+            delta = self._deltas.get(user_id)
+            if delta is None:
+                delta = self._deltas[user_id] = ProfileState()
+            for target in (state, delta):
+                target.observe(
+                    float(transaction['amount']),
+                    ts.timestamp(),
+                    location.get('lat'),
+                    location.get('lon'),
+                    blocked,
+                    self.max_locations
+                )
+
+    # ============ READ PATH ============
+
+    def peek(self, user_id: str, partial: bool = False) -> Optional[dict]:
+        """
+        Cached, fully merged profile, or None if the database must be consulted
+
+        With partial=True a cached profile whose stored row has not been
+        merged yet is returned as well, flagged 'partial': True.
+        """
+        with self._lock:
+            state = self._cache.get(user_id)
+            if state is None or not (state.loaded or partial and state.count):
+                return None
+            self._cache.move_to_end(user_id)
+            profile = state.to_profile(user_id)
+            if not state.loaded:
+                profile['partial'] = True
+            return profile
+
+    def load(self, user_id: str) -> Optional[dict]:
+        """Profile from the cache, reading the stored row on a miss (blocking)"""
+        profile = self.peek(user_id)
+        if profile is not None:
+            return profile
+
+        self._merge_stored([user_id])
+        with self._lock:
+            state = self._cache.get(user_id)
+            return state.to_profile(user_id) if state is not None and state.count else None
+
+    # ============ WRITER THREAD ============
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            if time.monotonic() >= self._retry_at:
+                self.flush()
+            else:
+                # Still bound the cache while writes are backed off
+                with self._lock:
+                    self._trim()
+        self.flush()
+
+    def flush(self) -> int:
+        """Write all pending deltas; returns the number of users written"""
+
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            self._flushing = deltas
+        if not deltas:
+            return 0
+
+        failed: Dict[str, ProfileState] = {}
+        try:
+            with self._lock:
+                unloaded = {user_id: self._cache[user_id] for user_id in deltas if not self._cache[user_id].loaded}
+            # Cached views must hold the stored row before their locations overwrite it
+            self._merge_stored(list(unloaded), cache=unloaded)
+            with self._lock:
+                rows = [delta.to_row(user_id, self._cache[user_id].locations) for user_id, delta in deltas.items()]
+            try:
+                with self.session_factory() as db:
+                    self._upsert(db, rows)
+                    db.commit()
+            except Exception as e:
+                logger.warning("Profile batch write failed, retrying row by row: %s", e)
+                for row in rows:
+                    try:
+                        with self.session_factory() as db:
+                            self._upsert(db, [row])
+                            db.commit()
+                    except Exception as row_error:
+                        logger.error("Profile write failed for %s: %s", row['user_id'], row_error)
+                        failed[row['user_id']] = deltas[row['user_id']]
+        except Exception as e:
+            logger.error("Profile write failed, retrying in %ds: %s", self.retry_interval, e)
+            failed = deltas
+
+        if failed:
+            self.stats['write_errors'] += 1
+            self._retry_at = time.monotonic() + self.retry_interval
+        with self._lock:
+            for user_id, delta in failed.items():
+                # Keep the unwritten delta ahead of anything observed since
+                newer = self._deltas.get(user_id)
+                if newer is not None:
+                    delta.merge(newer, self.max_locations)
+                self._deltas[user_id] = delta
+            self._flushing = {}
+            self._trim()
+        written = len(deltas) - len(failed)
+        self.stats['written'] += written
+        return written
+
+    @staticmethod
+    def _upsert(db, rows: List[dict]):
+        """
+        INSERT the deltas, folding them into existing rows with the same merge as ProfileState.merge
+
+        PostgreSQL and SQLite do this in one ON CONFLICT statement; other
+        dialects fall back to locking, merging and rewriting the stored rows.
+        """
+
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            ProfileStore._merge_into_stored(db, rows)
+            return
+
+        statement = insert(UserProfile)
+        stored, delta = UserProfile.__table__.c, statement.excluded
+        shift = delta.avg_transaction_amount - stored.avg_transaction_amount
+        weight = cast(delta.transaction_count, Float) / (stored.transaction_count + delta.transaction_count)
+        statement = statement.on_conflict_do_update(
+            index_elements=[stored.user_id],
+            set_={
+                'transaction_count': stored.transaction_count + delta.transaction_count,
+                'blocked_count': stored.blocked_count + delta.blocked_count,
+                'avg_transaction_amount': stored.avg_transaction_amount + shift * weight,
+                'amount_m2': stored.amount_m2 + delta.amount_m2 + shift * shift * stored.transaction_count * weight,
+                'first_seen_at': case(
+                    (or_(stored.first_seen_at.is_(None), delta.first_seen_at < stored.first_seen_at), delta.first_seen_at),
+                    else_=stored.first_seen_at
+                ),
+                'last_seen_at': case(
+                    (or_(stored.last_seen_at.is_(None), delta.last_seen_at > stored.last_seen_at), delta.last_seen_at),
+                    else_=stored.last_seen_at
+                ),
+                'typical_locations': delta.typical_locations,
+                'updated_at': delta.updated_at,
+            }
+        )
+        db.execute(statement, rows)
+
+    @staticmethod
+    def _merge_into_stored(db, rows: List[dict]):
+        """Read-merge-write fallback for dialects without ON CONFLICT; stored rows are locked while merged"""
+
+        stored = {
+            row.user_id: row
+            for row in db.execute(
+                select(UserProfile).where(UserProfile.user_id.in_([fields['user_id'] for fields in rows])).with_for_update()
+            ).scalars()
+        }
+        for fields in rows:
+            row = stored.get(fields['user_id'])
+            if row is None:
+                db.add(UserProfile(**fields))
+                continue
+            merged, delta = ProfileState.from_row(row), ProfileState.from_row(UserProfile(**fields))
+            # Locations are replaced, not merged, as in the upsert
+            merged.locations, delta.locations = [], []
+            merged.merge(delta, 0)
+            for name, value in merged.to_row(row.user_id, json.loads(fields['typical_locations'])).items():
+                setattr(row, name, value)
+
+    def _merge_stored(self, user_ids: Iterable[str], cache: Optional[Dict[str, ProfileState]] = None):
+        """Fold stored rows into the (possibly partial) cached profiles of these users"""
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        rows = {}
+        with self.session_factory() as db:
+            for start in range(0, len(user_ids), 500):
+                chunk = user_ids[start:start + 500]
+                for row in db.execute(select(UserProfile).where(UserProfile.user_id.in_(chunk))).scalars():
+                    rows[row.user_id] = row
+        self.stats['loaded'] += len(rows)
+
+        with self._lock:
+            for user_id in user_ids:
+                state = (cache or self._cache).get(user_id)
+                row = rows.get(user_id)
+                if state is None:
+                    if row is not None:
+                        self._cache[user_id] = ProfileState.from_row(row)
+                    continue
+                if state.loaded:
+                    continue  # merged by a concurrent reader
+                if row is not None:
+                    stored = ProfileState.from_row(row)
+                    stored.merge(state, self.max_locations)
+                    state.count, state.blocked, state.mean, state.m2 = stored.count, stored.blocked, stored.mean, stored.m2
+                    state.first_ts, state.last_ts, state.locations = stored.first_ts, stored.last_ts, stored.locations
+                state.loaded = True
+            self._trim()
+
+    def _trim(self):
+        """
+        Evict least recently used profiles (caller holds the lock)
+
+        Clean profiles go first. While the database is unreachable pending
+        deltas pile up, so once they alone exceed max_entries the least
+        recently seen users are dropped along with their unwritten
+        observations and counted in stats['dropped'].
+        """
+        excess = len(self._cache) - self.max_entries
+        if excess <= 0:
+            return
+        victims, dirty = [], []
+        for user_id in self._cache:
+            if user_id in self._flushing:
+                continue
+            if user_id in self._deltas:
+                dirty.append(user_id)
+                continue
+            victims.append(user_id)
+            if len(victims) == excess:
+                break
+        dropped = dirty[:excess - len(victims)]
+        for user_id in victims + dropped:
+            del self._cache[user_id]
+        for user_id in dropped:
+            del self._deltas[user_id]
+        if dropped:
+            self.stats['dropped'] += len(dropped)
+            logger.warning("Profile cache full of unwritten deltas, dropped %d users", len(dropped))
+
+@lru_cache()
+def get_profile_store() -> ProfileStore:
+    return ProfileStore().start()
@@ -0,0 +1,137 @@
+"""
+Opt-in profiling for a running worker
+
+- sample_stacks(): statistical sampler over every thread's current frame,
+  producing flamegraph-compatible collapsed stacks ("a;b;c count")
+- RequestProfileStore: keeps recent deterministic cProfile results for
+  requests that asked to be profiled
+- RequestGate: lets a profiled request run alone on the event loop
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """Sample all other threads' stacks every `interval` seconds"""
+
+    own_thread = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, str(thread_id)))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+
+    return stacks
+
+def collapsed(stacks: Counter) -> str:
+    """Render samples in Brendan Gregg's collapsed-stack format"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+class RequestProfileStore:
+    """
+    Deterministic per-request profiles
+
+    cProfile hooks the whole event loop thread, so the report covers
+    whatever the loop ran meanwhile; RequestGate keeps other requests out
+    for the duration. Only one request is profiled at a time.
+    """
+
+    def __init__(self, max_profiles: int = 20):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._active = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile, header: str = "", sort_by: str = "cumulative", limit: int = 60) -> str:
+        """Stop profiling, store the report (after `header`) and return its id"""
+        profile.disable()
+        self._active.release()
+
+        out = io.StringIO()
+        out.write(header)
+        pstats.Stats(profile, stream=out).sort_stats(sort_by).print_stats(limit)
+
+        profile_id = uuid.uuid4().hex[:12]
+        self._profiles[profile_id] = out.getvalue()
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[str]:
+        return self._profiles.get(profile_id)
+
+class RequestGate:
+    """
+    Holds other requests while one is profiled
+
+    Every request passes enter()/leave(); outside a profile that is an
+    attribute check and a counter. close() stops new requests at enter()
+    and waits (up to a timeout) for those in flight to finish; open() lets
+    them through again. Background tasks on the loop are not gated.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self._reopened: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+
+    async def enter(self):
+        await self.wait_open()
+        self.in_flight += 1
+
+    def leave(self):
+        self.in_flight -= 1
+        if self.in_flight == 0 and self._drained is not None:
+            self._drained.set()
+
+    async def wait_open(self):
+        while self._reopened is not None:
+            await self._reopened.wait()
+
+    async def close(self, timeout: float) -> int:
+        """Hold new requests and drain the running ones; returns how many are still running"""
+        self._reopened, self._drained = asyncio.Event(), asyncio.Event()
+        if self.in_flight:
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.in_flight
+
+    def open(self):
+        reopened, self._reopened, self._drained = self._reopened, None, None
+        if reopened is not None:
+            reopened.set()
+
+request_profiles = RequestProfileStore()
+request_gate = RequestGate()
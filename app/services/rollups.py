@@ -0,0 +1,233 @@
+"""
+Time-bucketed rollups of scoring decisions for the dashboard analytics
+
+Every scored transaction is added to the current bucket of two rings:
+per-minute (ROLLUP_MINUTE_BUCKETS, default one day) and per-hour
+(ROLLUP_HOUR_BUCKETS, default 30 days). A bucket holds decision counts, a
+fraud score histogram, the amount total, per-category totals and per-merchant
+totals (capped per bucket); unscored MANUAL_REVIEW decisions only count
+towards decisions and amounts. A query reads only the buckets in its range, picks
+the finest tier that covers it and sums adjacent buckets down to
+max_points, so its cost does not depend on transaction volume.
+
+Buckets are keyed by scoring time (wall clock) and are per process: with
+several gunicorn workers each sees its share, with SHARD_WORKERS the
+dispatcher sees everything.
+"""
+
+import math
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+
+DECISIONS = ("APPROVED", "HOLD", "BLOCKED", "MANUAL_REVIEW")
+DECISION_INDEX = {decision: i for i, decision in enumerate(DECISIONS)}
+SCORE_BINS = 20
+OTHER_MERCHANTS = "(other)"
+
+class RollupTier:
+    """Ring of fixed-width time buckets; a slot is reset when the ring wraps onto it"""
+
+    def __init__(self, bucket_seconds: int, n_buckets: int, max_merchants: int):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = n_buckets
+        self.max_merchants = max_merchants
+        self.bucket_ids = np.full(n_buckets, -1, dtype=np.int64)
+        self.decisions = np.zeros((n_buckets, len(DECISIONS)), dtype=np.int64)
+        self.scores = np.zeros((n_buckets, SCORE_BINS), dtype=np.int64)
+        self.amounts = np.zeros(n_buckets, dtype=np.float64)
+        self.categories: List[Dict[str, list]] = [{} for _ in range(n_buckets)]  # [count, amount, blocked, score_sum]
+        self.merchants: List[Dict[str, list]] = [{} for _ in range(n_buckets)]  # [count, blocked, score_sum]
+
+    def _slot(self, bucket_id: int) -> Optional[int]:
+        slot = bucket_id % self.n_buckets
+        current = self.bucket_ids[slot]
+        if current == bucket_id:
+            return slot
+        if current > bucket_id:
+            return None  # older than the ring keeps
+        self.bucket_ids[slot] = bucket_id
+        self.decisions[slot] = 0
+        self.scores[slot] = 0
+        self.amounts[slot] = 0.0
+        self.categories[slot] = {}
+        self.merchants[slot] = {}
+        return slot
+
+    def record(self, ts: float, decision: int, score_bin: int, amount: float, score: float, blocked: int, category: str, merchant: str):
+        slot = self._slot(int(ts // self.bucket_seconds))
+        if slot is None:
+            return
+        self.decisions[slot, decision] += 1
+        self.scores[slot, score_bin] += 1
+        self.amounts[slot] += amount
+
+        totals = self.categories[slot].get(category)
+        if totals is None:
+            self.categories[slot][category] = [1, amount, blocked, score]
+        else:
+            totals[0] += 1
+            totals[1] += amount
+            totals[2] += blocked
+            totals[3] += score
+
+        merchants = self.merchants[slot]
+        if merchant not in merchants and len(merchants) >= self.max_merchants:
+            merchant = OTHER_MERCHANTS  # bounded per bucket; the rest share one row
+        totals = merchants.get(merchant)
+        if totals is None:
+            merchants[merchant] = [1, blocked, score]
+        else:
+            totals[0] += 1
+            totals[1] += blocked
+            totals[2] += score
+
+    def record_unscored(self, ts: float, decision: int, amount: float):
+        slot = self._slot(int(ts // self.bucket_seconds))
+        if slot is None:
+            return
+        self.decisions[slot, decision] += 1
+        self.amounts[slot] += amount
+
+    def slots(self, start_ts: float, end_ts: float):
+        """
+        Bucket IDs for the window ending at end_ts, their ring slots, and which slots hold them
+
+        The window is the bucket holding end_ts plus the ones before it, as
+        many buckets as it spans (rounded up): a window of N buckets returns
+        exactly N IDs, [last - N + 1, last + 1).
+        """
+        last = int(end_ts // self.bucket_seconds)
+        count = min(max(1, math.ceil((end_ts - start_ts) / self.bucket_seconds)), self.n_buckets)
+        ids = np.arange(last - count + 1, last + 1, dtype=np.int64)
+        slots = ids % self.n_buckets
+        return ids, slots, self.bucket_ids[slots] == ids
+
+class RollupStore:
+    def __init__(
+        self,
+        minute_buckets: Optional[int] = None,
+        hour_buckets: Optional[int] = None,
+        max_merchants: Optional[int] = None
+    ):
+        settings = get_settings()
+        max_merchants = max_merchants or settings.ROLLUP_MAX_MERCHANTS_PER_BUCKET
+        self.tiers = [
+            RollupTier(60, minute_buckets or settings.ROLLUP_MINUTE_BUCKETS, max_merchants),
+            RollupTier(3600, hour_buckets or settings.ROLLUP_HOUR_BUCKETS, max_merchants),
+        ]
+
+    def record(self, result: dict, transaction: dict, ts: Optional[float] = None):
+        """Add one scored transaction (process_transaction result) to the current buckets"""
+
+        ts = time.time() if ts is None else ts
+        decision = DECISION_INDEX.get(result['decision'])
+        if decision is None:
+            return
+        amount = float(transaction.get('amount') or 0.0)
+        if result.get('fraud_score') is None:
+            # Unscored (shed) decision: counted, but kept out of the score statistics
+            for tier in self.tiers:
+                tier.record_unscored(ts, decision, amount)
+            return
+        score = float(result['fraud_score'])
+        score_bin = min(int(score * SCORE_BINS), SCORE_BINS - 1)
+        blocked = int(result['decision'] == "BLOCKED")
+        category = transaction.get('merchant_category') or "UNKNOWN"
+        merchant = transaction.get('merchant') or "UNKNOWN"
+        for tier in self.tiers:
+            tier.record(ts, decision, score_bin, amount, score, blocked, category, merchant)
+
+    def _tier_for(self, window_seconds: float) -> RollupTier:
+        for tier in self.tiers:
+            if window_seconds <= tier.bucket_seconds * tier.n_buckets:
+                return tier
+        return self.tiers[-1]
+
+    def decision_series(self, window_seconds: float, max_points: int = 120, now: Optional[float] = None) -> dict:
+        """Decision counts over time, adjacent buckets summed so at most max_points come back"""
+
+        now = time.time() if now is None else now
+        tier = self._tier_for(window_seconds)
+        ids, slots, valid = tier.slots(now - window_seconds, now)
+        counts = tier.decisions[slots] * valid[:, None]
+        amounts = tier.amounts[slots] * valid
+
+        factor = max(1, math.ceil(len(ids) / max_points))
+        starts = np.arange(0, len(ids), factor)
+        counts = np.add.reduceat(counts, starts, axis=0)
+        amounts = np.add.reduceat(amounts, starts)
+        return {
+            'bucket_seconds': tier.bucket_seconds * factor,
+            'points': [
+                {
+                    'ts': int(ids[start]) * tier.bucket_seconds,
+                    'total': int(row.sum()),
+                    'amount': round(float(amount), 2),
+                    **{decision: int(row[i]) for i, decision in enumerate(DECISIONS)},
+                }
+                for start, row, amount in zip(starts.tolist(), counts, amounts)
+            ],
+        }
+
+    def score_histogram(self, window_seconds: float, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        tier = self._tier_for(window_seconds)
+        _, slots, valid = tier.slots(now - window_seconds, now)
+        counts = (tier.scores[slots] * valid[:, None]).sum(axis=0)
+        edges = np.linspace(0.0, 1.0, SCORE_BINS + 1)
+        return {
+            'bin_edges': [round(float(edge), 2) for edge in edges],
+            'counts': counts.tolist(),
+            'total': int(counts.sum()),
+        }
+
+    def _totals(self, table: str, window_seconds: float, now: Optional[float]) -> Dict[str, list]:
+        now = time.time() if now is None else now
+        tier = self._tier_for(window_seconds)
+        _, slots, valid = tier.slots(now - window_seconds, now)
+        merged: Dict[str, list] = {}
+        for slot in slots[valid].tolist():
+            for name, totals in getattr(tier, table)[slot].items():
+                current = merged.get(name)
+                if current is None:
+                    merged[name] = list(totals)
+                else:
+                    for i, value in enumerate(totals):
+                        current[i] += value
+        return merged
+
+    def category_totals(self, window_seconds: float, now: Optional[float] = None) -> List[dict]:
+        totals = self._totals('categories', window_seconds, now)
+        return sorted(
+            (
+                {
+                    'category': name,
+                    'count': count,
+                    'amount': round(amount, 2),
+                    'blocked': blocked,
+                    'avg_score': round(score_sum / count, 4),
+                }
+                for name, (count, amount, blocked, score_sum) in totals.items()
+            ),
+            key=lambda row: -row['count']
+        )
+
+    def top_merchants(self, window_seconds: float, limit: int = 10, now: Optional[float] = None) -> List[dict]:
+        """Merchants with the most blocked transactions, then the highest average score"""
+        totals = self._totals('merchants', window_seconds, now)
+        rows = [
+            {'merchant': name, 'count': count, 'blocked': blocked, 'avg_score': round(score_sum / count, 4)}
+            for name, (count, blocked, score_sum) in totals.items()
+            if name != OTHER_MERCHANTS
+        ]
+        rows.sort(key=lambda row: (-row['blocked'], -row['avg_score']))
+        return rows[:limit]
+
+@lru_cache()
+def get_rollup_store() -> RollupStore:
+    return RollupStore()
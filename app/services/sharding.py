@@ -0,0 +1,263 @@
+"""
+User-affinity sharding of scoring across worker processes
+
+A ShardedScorer owns a fixed pool of scoring processes. Each one runs its
+own AgentController, so the per-user state (history, velocity, device,
+geo and merchant indices) for the users hashed to it lives only there and
+stays consistent. A consistent-hash ring maps user_id to shard, so
+changing SHARD_WORKERS moves only about 1/N of users.
+
+The scorer exposes the AgentController surface the API and the stream
+consumer use (process_transaction, handle_user_verification_response,
+explainer.get, warm_up), so get_agent() can return either one.
+
+Workers are forked after the model is loaded (see app.ml.model_store),
+so they share its pages. Phase metrics are recorded inside the workers
+and are not merged into the dispatcher's /metrics.
+"""
+
+import asyncio
+import bisect
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.config import get_settings
+from app.services.device_index import hash_key
+
+logger = logging.getLogger(__name__)
+
+class ConsistentHashRing:
+    def __init__(self, nodes: int, vnodes: int = 64):
+        points = sorted(
+            (hash_key(f"shard-{node}", str(replica)), node)
+            for node in range(nodes)
+            for replica in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, hash_key(key)) % len(self._hashes)
+        return self._nodes[index]
+
+class ExplanationCache:
+    """Explanations returned by the shards, keyed by transaction ID (Explainer.get surface)"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, tx_id: str) -> Optional[list]:
+        return self._entries.get(tx_id)
+
+    def remember(self, tx_id: str, explanation: list):
+        self._entries[tx_id] = explanation
+        self._entries.move_to_end(tx_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+def _shard_main(shard_id: int, conn):
+    from app.services.agent_runtime import reset_after_fork
+    reset_after_fork()
+    asyncio.run(_serve(shard_id, conn))
+
+async def _serve(shard_id: int, conn):
+    import os
+    from app.services.agent import AgentController
+    from app.services.audit_sink import get_audit_sink
+
+    # Each shard owns a disjoint set of users, so each keeps its own state directory;
+    # profiles, rollups and the live feed are kept once, by the dispatcher, where the API reads them
+    agent = AgentController(
+        state_dir=os.path.join(get_settings().STATE_SNAPSHOT_DIR, f"shard-{shard_id}"),
+        track_aggregates=False,
+        audit_sink=get_audit_sink()
+    )
+    agent.warm_up()
+    loop = asyncio.get_running_loop()
+    snapshot_task = loop.create_task(agent.snapshots.run_forever()) if agent.snapshots else None
+    closed = loop.create_future()
+    tails = {}  # user_id -> that user's latest task, so one user's calls run in order
+
+    async def handle(request_id, method, args, previous):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            if method == "process":
+                result = await agent.process_transaction(*args)
+            else:
+                result = await agent.handle_user_verification_response(*args)
+            conn.send((request_id, result, None))
+        except Exception as e:
+            conn.send((request_id, None, f"{type(e).__name__}: {e}"))
+
+    def forget(user_id, task):
+        if tails.get(user_id) is task:
+            del tails[user_id]
+
+    def on_readable():
+        while conn.poll():
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = None
+            if message is None:
+                loop.remove_reader(conn.fileno())
+                if not closed.done():
+                    closed.set_result(None)
+                return
+            request_id, user_id, method, args = message
+            task = loop.create_task(handle(request_id, method, args, tails.get(user_id)))
+            tails[user_id] = task
+            task.add_done_callback(lambda t, u=user_id: forget(u, t))
+
+    loop.add_reader(conn.fileno(), on_readable)
+    conn.send(("ready", shard_id, None))
+    await closed
+
+    if tails:
+        await asyncio.wait(list(tails.values()))
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        agent.snapshots.close()
+    get_audit_sink().close()
+    conn.close()
+
+class _Shard:
+    """Dispatcher-side handle: process, pipe, pending futures and a writer thread"""
+
+    def __init__(self, shard_id: int, context):
+        self.shard_id = shard_id
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_shard_main, args=(shard_id, child_conn), name=f"verifai-shard-{shard_id}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.pending: Dict[int, asyncio.Future] = {}
+        # Sends happen off the event loop so a full pipe can never stall result reads
+        self.outbox = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self._write, name=f"verifai-shard-{shard_id}-writer", daemon=True)
+        self.writer.start()
+        self.alive = True
+
+    def _write(self):
+        while True:
+            message = self.outbox.get()
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                return
+            if message is None:
+                return
+
+class ShardedScorer:
+    def __init__(self, workers: int, vnodes: int = 64):
+        self.workers = workers
+        self.ring = ConsistentHashRing(workers, vnodes)
+        self.explainer = ExplanationCache()
+        self._shards: List[_Shard] = []
+        self._request_ids = itertools.count()
+        self._loop = None
+        settings = get_settings()
+        self.profiles_enabled = settings.PROFILES_ENABLED
+        self.rollups_enabled = settings.ROLLUPS_ENABLED
+        self.feed_enabled = settings.FEED_ENABLED
+
+    def warm_up(self):
+        """Start the shard processes and wait until each has built and warmed its agent"""
+
+        if self._shards:
+            return
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Load the model here once so every shard shares it copy-on-write
+            from app.ml.model_store import preload
+            preload()
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context("spawn")
+        self._shards = [_Shard(shard_id, context) for shard_id in range(self.workers)]
+        for shard in self._shards:
+            shard.conn.recv()  # ("ready", shard_id, None)
+            logger.info("Scoring shard %d ready (pid %d)", shard.shard_id, shard.process.pid)
+
+    async def process_transaction(self, transaction: dict, explain: bool = False) -> dict:
+        user_id = transaction['user_id']
+        result = await self._call(self.ring.node_for(user_id), user_id, "process", (transaction, explain))
+        self._aggregate(transaction, result)
+        if 'explanation' in result and transaction.get('id') is not None:
+            self.explainer.remember(transaction['id'], result['explanation'])
+        return result
+
+    def _aggregate(self, transaction: dict, result: dict):
+        if self.profiles_enabled:
+            from app.services.profile_store import get_profile_store
+            get_profile_store().observe(transaction['user_id'], transaction, result['decision'] == "BLOCKED")
+        if self.rollups_enabled:
+            from app.services.rollups import get_rollup_store
+            get_rollup_store().record(result, transaction)
+        if self.feed_enabled:
+            from app.services.decision_feed import get_decision_feed
+            get_decision_feed().publish(result, transaction)
+
+    async def handle_user_verification_response(self, tx_id: str, user_confirmed: bool):
+        return await self._call(self.ring.node_for(tx_id), tx_id, "verify", (tx_id, user_confirmed))
+
+    async def _call(self, shard_id: int, user_id: str, method: str, args: tuple):
+        if not self._shards:
+            self.warm_up()
+        self._attach_readers()
+
+        shard = self._shards[shard_id]
+        if not shard.alive:
+            raise RuntimeError(f"Scoring shard {shard_id} is not running")
+
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        shard.pending[request_id] = future
+        shard.outbox.put((request_id, user_id, method, args))
+        return await future
+
+    def _attach_readers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        for shard in self._shards:
+            loop.add_reader(shard.conn.fileno(), self._on_results, shard)
+
+    def _on_results(self, shard: _Shard):
+        try:
+            while shard.conn.poll():
+                request_id, result, error = shard.conn.recv()
+                future = shard.pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(RuntimeError(f"Shard {shard.shard_id}: {error}"))
+                else:
+                    future.set_result(result)
+        except (EOFError, OSError):
+            logger.error("Scoring shard %d exited; failing %d pending requests", shard.shard_id, len(shard.pending))
+            shard.alive = False
+            self._loop.remove_reader(shard.conn.fileno())
+            for future in shard.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Scoring shard {shard.shard_id} exited"))
+            shard.pending.clear()
+
+    def close(self, timeout: float = 10.0):
+        """Let every shard finish its queued work, then stop it"""
+        for shard in self._shards:
+            if self._loop is not None and shard.alive:
+                self._loop.remove_reader(shard.conn.fileno())
+            shard.outbox.put(None)
+        for shard in self._shards:
+            shard.writer.join(timeout)
+            shard.process.join(timeout)
+            if shard.process.is_alive():
+                shard.process.terminate()
+        self._shards = []
@@ -0,0 +1,272 @@
+"""
+Durable snapshots of the agent's in-memory per-user state
+
+Layout under the state directory:
+
+    snapshot-<seq>/<component>.<array>.npy   columnar arrays + manifest.json
+    journal-<seq>.jsonl                      LEARN updates since snapshot <seq>
+
+Each component (history, velocity, devices, geo, merchants) exports its
+state as flat NumPy arrays (export_arrays) and rebuilds itself from them
+(import_arrays). A snapshot exports every component's arrays on the
+calling (event loop) thread, a short pause in which no LEARN update can
+interleave, then hands them to a writer thread; meanwhile new updates go
+to the next journal. The exported arrays are fresh copies, so the writer
+never reads state the loop is changing. The process is not forked: the
+app runs other threads (audit, profile writers, the executor) whose
+locks a forked child could inherit held. On startup each component
+rebuilds its in-memory structures from the newest complete snapshot
+(import_arrays copies the data out; the files are read through a
+read-only mmap, which is released once restore returns), then the
+journals from its sequence on are replayed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def pack_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Strings as one UTF-8 byte blob plus int64 offsets (mmap-friendly, unlike object arrays)"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+def group_offsets(lengths: Sequence[int]) -> np.ndarray:
+    """Row offsets for variable-length per-user groups stored back to back"""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+class StateSnapshotter:
+    def __init__(self, agent, directory: str, interval_seconds: float = 300, flush_seconds: float = 1.0):
+        self.agent = agent
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.flush_seconds = flush_seconds
+        os.makedirs(directory, exist_ok=True)
+
+        self.snapshot_seq = max(self._complete_snapshots(), default=0)
+        self.journal_seq = max(self._journals() + [self.snapshot_seq])
+        self._journal = open(self._journal_path(self.journal_seq), "a", encoding="utf-8")
+        self._writer: Optional[Tuple[threading.Thread, int]] = None  # snapshot being written, and its sequence
+        self._writer_failed = False
+        self.last_export_seconds = 0.0  # how long the last snapshot paused the caller
+
+    @property
+    def components(self) -> Dict[str, object]:
+        return {
+            "history": self.agent.history_store,
+            "velocity": self.agent.velocity,
+            "devices": self.agent.device_index,
+            "geo": self.agent.geo_index,
+            "merchants": self.agent.merchant_index,
+        }
+
+    def _snapshot_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{seq}")
+
+    def _journal_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"journal-{seq}.jsonl")
+
+    def _complete_snapshots(self) -> List[int]:
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith("snapshot-") and not name.endswith(".tmp"):
+                if os.path.exists(os.path.join(self.directory, name, "manifest.json")):
+                    seqs.append(int(name[len("snapshot-"):]))
+        return seqs
+
+    def _journals(self) -> List[int]:
+        return [
+            int(name[len("journal-"):-len(".jsonl")])
+            for name in os.listdir(self.directory)
+            if name.startswith("journal-") and name.endswith(".jsonl")
+        ]
+
+    # ----- journal -----
+
+    def record(self, user_id: str, transaction: dict, blocked: bool):
+        """Journal one LEARN update (buffered; flushed every flush_seconds)"""
+        location = transaction.get('user_location') or {}
+        self._journal.write(json.dumps({
+            'u': user_id,
+            'a': transaction.get('amount'),
+            't': transaction['timestamp'].timestamp(),
+            'r': time.time(),  # arrival time, which velocity is kept on
+            'm': transaction.get('merchant'),
+            'fp': transaction.get('device_fingerprint'),
+            'ip': transaction.get('device_ip'),
+            'lat': location.get('lat'),
+            'lon': location.get('lon'),
+            'b': blocked,
+        }, separators=(",", ":")) + "\n")
+
+    def flush(self):
+        self._journal.flush()
+
+    # ----- snapshot -----
+
+    def snapshot(self) -> Optional[int]:
+        """Start writing a snapshot of the current state; returns its sequence, or None if one is running"""
+
+        self.poll()
+        if self._writer is not None:
+            return None
+
+        # Everything journalled from here on belongs after this snapshot
+        seq = self.journal_seq + 1
+        self._journal.close()
+        self.journal_seq = seq
+        self._journal = open(self._journal_path(seq), "a", encoding="utf-8")
+
+        started = time.perf_counter()
+        arrays = {component: state.export_arrays() for component, state in self.components.items()}
+        self.last_export_seconds = time.perf_counter() - started
+
+        self._writer_failed = False
+        thread = threading.Thread(target=self._write_in_background, args=(seq, arrays), name=f"state-snapshot-{seq}", daemon=True)
+        self._writer = (thread, seq)
+        thread.start()
+        return seq
+
+    def poll(self):
+        """Finish a snapshot whose writer thread is done"""
+        if self._writer is None:
+            return
+        thread, seq = self._writer
+        if thread.is_alive():
+            return
+        self._writer = None
+        if self._writer_failed:
+            logger.error("State snapshot %d failed; its journal is kept for replay", seq)
+        else:
+            self._completed(seq)
+
+    def wait(self, timeout: float = 60.0):
+        if self._writer is not None:
+            self._writer[0].join(timeout)
+        self.poll()
+
+    def _write_in_background(self, seq: int, arrays: Dict[str, Dict[str, np.ndarray]]):
+        try:
+            self._write_snapshot(seq, arrays)
+        except Exception:
+            logger.exception("Writing state snapshot %d failed", seq)
+            self._writer_failed = True
+
+    def _write_snapshot(self, seq: int, arrays: Dict[str, Dict[str, np.ndarray]]):
+        final_path = self._snapshot_path(seq)
+        tmp_path = final_path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        manifest = {"seq": seq, "created_at": time.time(), "arrays": {}}
+        for component, exported in arrays.items():
+            for name, array in exported.items():
+                filename = f"{component}.{name}.npy"
+                with open(os.path.join(tmp_path, filename), "wb") as f:
+                    np.save(f, array, allow_pickle=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                manifest["arrays"][f"{component}.{name}"] = filename
+
+        with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, final_path)
+
+    def _completed(self, seq: int):
+        self.snapshot_seq = seq
+        for old in self._complete_snapshots():
+            if old < seq:
+                shutil.rmtree(self._snapshot_path(old), ignore_errors=True)
+        for old in self._journals():
+            if old < seq:
+                os.remove(self._journal_path(old))
+        logger.info("State snapshot %d written (export paused the loop %.3fs)", seq, self.last_export_seconds)
+
+    # ----- restore -----
+
+    def restore(self) -> dict:
+        """Rebuild state from the newest complete snapshot and replay the journals after it"""
+
+        started = time.perf_counter()
+        report = {"snapshot": None, "journal_updates": 0}
+
+        if self.snapshot_seq:
+            path = self._snapshot_path(self.snapshot_seq)
+            with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            by_component: Dict[str, Dict[str, np.ndarray]] = {}
+            for key, filename in manifest["arrays"].items():
+                component, name = key.split(".", 1)
+                by_component.setdefault(component, {})[name] = np.load(os.path.join(path, filename), mmap_mode="r")
+            for component, state in self.components.items():
+                if component in by_component:
+                    state.import_arrays(by_component[component])
+            report["snapshot"] = self.snapshot_seq
+
+        self.flush()
+        for seq in sorted(s for s in self._journals() if s >= self.snapshot_seq):
+            report["journal_updates"] += self._replay(self._journal_path(seq))
+
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Restored state: %s", report)
+        return report
+
+    def _replay(self, path: str) -> int:
+        applied = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    update = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line from a crash
+                self.agent.replay_learned(
+                    update['u'],
+                    {
+                        'amount': update['a'],
+                        'timestamp': datetime.fromtimestamp(update['t']),
+                        'merchant': update['m'],
+                        'device_fingerprint': update['fp'],
+                        'device_ip': update['ip'],
+                        'user_location': {'lat': update['lat'], 'lon': update['lon']} if update['lat'] is not None else None,
+                    },
+                    blocked=update['b'],
+                    arrival_ts=update.get('r', update['t']),
+                )
+                applied += 1
+        return applied
+
+    async def run_forever(self):
+        """Flush the journal every flush_seconds and snapshot every interval_seconds"""
+        next_snapshot = time.monotonic() + self.interval_seconds
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            self.flush()
+            self.poll()
+            if time.monotonic() >= next_snapshot:
+                self.snapshot()
+                next_snapshot = time.monotonic() + self.interval_seconds
+
+    def close(self):
+        self.flush()
+        self.wait()
+        self._journal.close()
@@ -0,0 +1,432 @@
+"""
+Queue-driven scoring: sources, sinks and the micro-batch consumer
+
+A source hands out records with (partition, offset) positions and accepts
+commits of the next offset to read, the same contract as a Kafka consumer
+group. Three implementations share it:
+
+- InMemoryBroker: topics held in lists, for tests and local experiments
+- FileSource / FileSink: JSONL files, with the committed offset kept in a
+  sidecar "<input>.offset" file
+- KafkaSource / KafkaSink: aiokafka (optional; imported only when used)
+
+Delivery is at-least-once: decisions are flushed to the sink before the
+batch's offsets are committed, so a crash replays at most one batch.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.models.schemas import TransactionRequest
+from app.services.device_index import hash_key
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Record:
+    topic: str
+    partition: int
+    offset: int
+    key: Optional[str]
+    value: dict
+
+def _decode(raw) -> dict:
+    """Parse a JSON message; undecodable ones become an error marker the consumer rejects"""
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        return {"_error": f"invalid JSON: {e}"}
+    if not isinstance(value, dict):
+        return {"_error": "message is not a JSON object"}
+    return value
+
+class InMemoryBroker:
+    """Single-process stand-in for a log broker"""
+
+    def __init__(self, partitions: int = 1):
+        self.partitions = partitions
+        self._topics: Dict[str, List[List[Record]]] = {}
+        self._committed: Dict[tuple, int] = {}  # (group, topic, partition) -> next offset
+
+    def _partitions(self, topic: str) -> List[List[Record]]:
+        if topic not in self._topics:
+            self._topics[topic] = [[] for _ in range(self.partitions)]
+        return self._topics[topic]
+
+    def produce(self, topic: str, value: dict, key: Optional[str] = None) -> Record:
+        partitions = self._partitions(topic)
+        partition = hash_key(key) % len(partitions) if key is not None else 0
+        log = partitions[partition]
+        record = Record(topic, partition, len(log), key, value)
+        log.append(record)
+        return record
+
+    def messages(self, topic: str) -> List[dict]:
+        return [record.value for log in self._partitions(topic) for record in log]
+
+    def committed(self, group: str, topic: str, partition: int = 0) -> int:
+        return self._committed.get((group, topic, partition), 0)
+
+    def source(self, topic: str, group: str) -> "InMemorySource":
+        return InMemorySource(self, topic, group)
+
+    def sink(self, topic: str) -> "InMemorySink":
+        return InMemorySink(self, topic)
+
+class InMemorySource:
+    def __init__(self, broker: InMemoryBroker, topic: str, group: str):
+        self.broker = broker
+        self.topic = topic
+        self.group = group
+        self._positions = {}
+
+    async def poll(self, max_records: int, timeout_ms: int) -> List[Record]:
+        records = []
+        for partition, log in enumerate(self.broker._partitions(self.topic)):
+            position = self._positions.get(partition, self.broker.committed(self.group, self.topic, partition))
+            batch = log[position:position + max_records - len(records)]
+            records.extend(batch)
+            self._positions[partition] = position + len(batch)
+        if not records:
+            await asyncio.sleep(timeout_ms / 1000)
+        return records
+
+    async def commit(self, offsets: Dict[int, int]):
+        for partition, offset in offsets.items():
+            self.broker._committed[(self.group, self.topic, partition)] = offset
+
+    async def rewind(self):
+        """Go back to the committed offsets (after a failed batch)"""
+        self._positions = {}
+
+    async def close(self):
+        pass
+
+class InMemorySink:
+    def __init__(self, broker: InMemoryBroker, topic: str):
+        self.broker = broker
+        self.topic = topic
+
+    async def send(self, key: Optional[str], value: dict):
+        self.broker.produce(self.topic, value, key)
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        pass
+
+class FileSource:
+    """
+    JSONL input, one transaction per line; the offset is the line number
+
+    With follow=True the file is tailed like a topic; otherwise poll()
+    returns an empty batch once the end is reached.
+    """
+
+    def __init__(self, path: str, follow: bool = False):
+        self.path = path
+        self.topic = os.path.splitext(os.path.basename(path))[0]
+        self.follow = follow
+        self.offset_path = path + ".offset"
+        self._file = None
+        self._open_at_committed()
+
+    def _open_at_committed(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, encoding="utf-8")
+        self._next_offset = 0
+        self._partial = ""
+        self.exhausted = False
+
+        committed = self._read_committed()
+        while self._next_offset < committed and self._file.readline():
+            self._next_offset += 1
+
+    def _read_committed(self) -> int:
+        try:
+            with open(self.offset_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    async def poll(self, max_records: int, timeout_ms: int) -> List[Record]:
+        records = []
+        while len(records) < max_records:
+            line = self._file.readline()
+            if not line:
+                break
+            if not line.endswith("\n") and self.follow:
+                # Writer is mid-line; keep the fragment until the rest arrives
+                self._partial += line
+                continue
+            line, self._partial = self._partial + line, ""
+            offset = self._next_offset
+            self._next_offset += 1
+            if not line.strip():
+                continue
+            value = _decode(line)
+            records.append(Record(self.topic, 0, offset, value.get("user_id"), value))
+
+        if not records:
+            if self.follow:
+                await asyncio.sleep(timeout_ms / 1000)
+            else:
+                self.exhausted = True
+        return records
+
+    async def commit(self, offsets: Dict[int, int]):
+        offset = offsets.get(0)
+        if offset is None:
+            return
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    async def rewind(self):
+        self._open_at_committed()
+
+    async def close(self):
+        self._file.close()
+
+class FileSink:
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    async def send(self, key: Optional[str], value: dict):
+        self._file.write(json.dumps(value, default=str) + "\n")
+
+    async def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def close(self):
+        self._file.close()
+
+class KafkaSource:
+    """Kafka consumer group member with manual commits (requires aiokafka)"""
+
+    def __init__(self, bootstrap_servers: str, topic: str, group_id: str):
+        from aiokafka import AIOKafkaConsumer
+        self.topic = topic
+        self.consumer = AIOKafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+        )
+        self._started = False
+
+    async def poll(self, max_records: int, timeout_ms: int) -> List[Record]:
+        if not self._started:
+            await self.consumer.start()
+            self._started = True
+        batches = await self.consumer.getmany(timeout_ms=timeout_ms, max_records=max_records)
+        records = []
+        for partition, messages in batches.items():
+            for message in messages:
+                value = _decode(message.value)
+                key = message.key.decode("utf-8") if message.key else None
+                records.append(Record(self.topic, partition.partition, message.offset, key, value))
+        return records
+
+    async def commit(self, offsets: Dict[int, int]):
+        from aiokafka import TopicPartition
+        await self.consumer.commit({
+            TopicPartition(self.topic, partition): offset for partition, offset in offsets.items()
+        })
+
+    async def rewind(self):
+        for partition in self.consumer.assignment():
+            committed = await self.consumer.committed(partition)
+            if committed is None:
+                await self.consumer.seek_to_beginning(partition)
+            else:
+                self.consumer.seek(partition, committed)
+
+    async def close(self):
+        if self._started:
+            await self.consumer.stop()
+
+class KafkaSink:
+    def __init__(self, bootstrap_servers: str, topic: str):
+        from aiokafka import AIOKafkaProducer
+        self.topic = topic
+        self.producer = AIOKafkaProducer(bootstrap_servers=bootstrap_servers)
+        self._started = False
+
+    async def send(self, key: Optional[str], value: dict):
+        if not self._started:
+            await self.producer.start()
+            self._started = True
+        await self.producer.send(
+            self.topic,
+            json.dumps(value, default=str).encode("utf-8"),
+            key=key.encode("utf-8") if key else None,
+        )
+
+    async def flush(self):
+        if self._started:
+            await self.producer.flush()
+
+    async def close(self):
+        if self._started:
+            await self.producer.stop()
+
+class StreamConsumer:
+    """
+    Scores records from a source in micro-batches and writes decisions to a sink
+
+    Each poll returns at most `batch_size` records, and the next poll waits
+    until the whole batch has gone through LEARN, so in-flight work is
+    bounded by the batch. An agent with process_batch (AgentController)
+    scores the whole batch with one feature pass and one model call per
+    wave. Otherwise (ShardedScorer) one user's transactions run in order
+    (history and velocity depend on it) while different users run
+    concurrently, at most `max_in_flight` at a time.
+
+    Records that fail validation are answered with an error decision and
+    committed like any other (a poison record must not stall the
+    partition). Any other failure is treated as transient: the batch is
+    not committed, the source rewinds to the committed offsets and the
+    batch is retried after `retry_backoff_seconds` (at-least-once).
+    """
+
+    def __init__(
+        self,
+        agent,
+        source,
+        sink,
+        batch_size: int = 256,
+        max_in_flight: int = 64,
+        poll_timeout_ms: int = 500,
+        retry_backoff_seconds: float = 1.0
+    ):
+        self.agent = agent
+        self.source = source
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.processed = 0
+        self.failed = 0
+        self.retried_batches = 0
+
+    async def run_once(self) -> int:
+        """Poll, score and commit one batch; returns the number of records handled
+
+        Raises the first transient error after rewinding the source; nothing
+        of the batch is committed then.
+        """
+
+        records = await self.source.poll(self.batch_size, self.poll_timeout_ms)
+        if not records:
+            return 0
+
+        try:
+            if hasattr(self.agent, "process_batch"):
+                await self._score_batch(records)
+            else:
+                await self._score_by_user(records)
+        except Exception:
+            await self.source.rewind()
+            raise
+
+        # Decisions must be durable before the input position moves past them
+        await self.sink.flush()
+        offsets = {}
+        for record in records:
+            offsets[record.partition] = max(offsets.get(record.partition, 0), record.offset + 1)
+        await self.source.commit(offsets)
+        return len(records)
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None):
+        stop = stop or asyncio.Event()
+        logger.info("Stream consumer started (batch=%d)", self.batch_size)
+        while not stop.is_set():
+            try:
+                handled = await self.run_once()
+            except Exception as e:
+                self.retried_batches += 1
+                logger.error("Scoring batch failed, retrying from the committed offset: %s", e)
+                await asyncio.sleep(self.retry_backoff_seconds)
+                continue
+            if not handled and getattr(self.source, "exhausted", False):
+                break
+        logger.info("Stream consumer stopped: %d scored, %d failed", self.processed, self.failed)
+
+    async def _score_batch(self, records: List[Record]):
+        """Score the whole poll with one agent.process_batch call"""
+        results = [None] * len(records)
+        valid, positions = [], []
+        for i, record in enumerate(records):
+            tx_dict, rejected = self._validate(record)
+            if rejected is not None:
+                results[i] = rejected
+            else:
+                valid.append(tx_dict)
+                positions.append(i)
+        if valid:
+            for i, result in zip(positions, await self.agent.process_batch(valid)):
+                results[i] = result
+            self.processed += len(valid)
+        for record, result in zip(records, results):
+            await self.sink.send(record.key, result)
+
+    async def _score_by_user(self, records: List[Record]):
+        """Agents without process_batch: one chain per user, users concurrently"""
+        by_user = defaultdict(list)
+        for record in records:
+            by_user[record.value.get("user_id")].append(record)
+        outcomes = await asyncio.gather(
+            *(self._score_in_order(user_records) for user_records in by_user.values()),
+            return_exceptions=True
+        )
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            raise errors[0]
+
+    async def _score_in_order(self, records: List[Record]):
+        for record in records:
+            async with self._slots:
+                result = await self._score(record)
+            await self.sink.send(record.key, result)
+
+    async def _score(self, record: Record) -> dict:
+        tx_dict, rejected = self._validate(record)
+        if rejected is not None:
+            return rejected
+        result = await self.agent.process_transaction(tx_dict)
+        self.processed += 1
+        return result
+
+    def _validate(self, record: Record):
+        """(transaction, None), or (None, error decision) for a poison record"""
+        # Stable id so a replayed record can be matched to its earlier decision
+        tx_id = record.value.get("id") or f"{record.topic}:{record.partition}:{record.offset}"
+        try:
+            if "_error" in record.value:
+                raise ValueError(record.value["_error"])
+            tx_dict = TransactionRequest.model_validate(record.value).model_dump()
+        except ValueError as e:
+            # A poison record (pydantic's ValidationError is a ValueError) must not
+            # stall the partition; report it and move on. Scoring errors propagate.
+            self.failed += 1
+            logger.warning("Rejected stream record %s: %s", tx_id, e)
+            return None, {"transaction_id": tx_id, "error": str(e)}
+        tx_dict["id"] = tx_id
+        return tx_dict, None
@@ -0,0 +1,133 @@
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.device_index import hash_key
+
+# window name -> (window length in seconds, number of ring buckets)
+VELOCITY_WINDOWS = {
+    '1m': (60, 6),
+    '1h': (3600, 12),
+    '24h': (86400, 24),
+}
+
+# Timestamps further ahead of the process clock than this count as "now"
+MAX_CLOCK_SKEW_SECONDS = 5.0
+
+class SlidingWindow:
+    """
+    Per-user event counts over one sliding window
+
+    The window is a ring of buckets; each bucket is a sparse Counter of
+    user hashes, and `totals` keeps the running sum over live buckets. A
+    read is one dict probe, and memory is bounded by the users active in
+    the window rather than by every user ever seen, because expired
+    buckets are subtracted from the totals and dropped wholesale.
+
+    The ring's head only moves with time, so a timestamp from the future
+    would expire everyone's counts; such timestamps are treated as now.
+    """
+
+    def __init__(self, length_seconds: int, n_buckets: int):
+        self.bucket_seconds = length_seconds / n_buckets
+        self.n_buckets = n_buckets
+        self.buckets = [Counter() for _ in range(n_buckets)]
+        self.bucket_ids = [-1] * n_buckets
+        self.head = -1
+        self.totals = Counter()
+
+    def _advance(self, bucket_id: int):
+        if bucket_id <= self.head:
+            return
+        # Expire at most one full ring, however long we were idle
+        for expired in range(max(self.head + 1, bucket_id - self.n_buckets + 1), bucket_id + 1):
+            slot = expired % self.n_buckets
+            bucket = self.buckets[slot]
+            if bucket:
+                self.totals.subtract(bucket)
+                for key, count in bucket.items():
+                    if self.totals[key] <= 0:
+                        del self.totals[key]
+                self.buckets[slot] = Counter()
+            self.bucket_ids[slot] = expired
+        self.head = bucket_id
+
+    def _bucket_id(self, ts: float) -> int:
+        now = time.time()
+        if ts > now + MAX_CLOCK_SKEW_SECONDS:
+            ts = now
+        return int(ts // self.bucket_seconds)
+
+    def add(self, key: int, ts: float):
+        bucket_id = self._bucket_id(ts)
+        self._advance(bucket_id)
+        if bucket_id <= self.head - self.n_buckets:
+            return  # Older than the window
+        slot = bucket_id % self.n_buckets
+        self.buckets[slot][key] += 1
+        self.totals[key] += 1
+
+    def count(self, key: int, ts: float) -> int:
+        self._advance(self._bucket_id(ts))
+        return self.totals.get(key, 0)
+
+    def export_arrays(self, prefix: str) -> dict:
+        return {
+            f'{prefix}.head': np.array([self.head], dtype=np.int64),
+            f'{prefix}.bucket_ids': np.array(self.bucket_ids, dtype=np.int64),
+            f'{prefix}.offsets': np.cumsum([0] + [len(bucket) for bucket in self.buckets], dtype=np.int64),
+            f'{prefix}.keys': np.fromiter((key for bucket in self.buckets for key in bucket), dtype=np.uint64),
+            f'{prefix}.counts': np.fromiter((count for bucket in self.buckets for count in bucket.values()), dtype=np.int64),
+        }
+
+    def import_arrays(self, arrays: dict, prefix: str):
+        self.head = int(arrays[f'{prefix}.head'][0])
+        self.bucket_ids = arrays[f'{prefix}.bucket_ids'].tolist()
+        offsets = arrays[f'{prefix}.offsets'].tolist()
+        keys = arrays[f'{prefix}.keys'].tolist()
+        counts = arrays[f'{prefix}.counts'].tolist()
+        self.buckets = [
+            Counter(dict(zip(keys[offsets[i]:offsets[i + 1]], counts[offsets[i]:offsets[i + 1]])))
+            for i in range(self.n_buckets)
+        ]
+        self.totals = Counter()
+        for bucket in self.buckets:
+            self.totals.update(bucket)
+
+class VelocityTracker:
+    """Sliding-window transaction counts per user (1m / 1h / 24h)"""
+
+    def __init__(self, windows: Dict[str, tuple] = None):
+        windows = windows or VELOCITY_WINDOWS
+        self.windows = {name: SlidingWindow(*spec) for name, spec in windows.items()}
+
+    def record(self, user_id: str, ts: Optional[float] = None):
+        """Count one scored transaction for the user"""
+        ts = time.time() if ts is None else ts
+        key = hash_key(user_id)
+        for window in self.windows.values():
+            window.add(key, ts)
+
+    def counts(self, user_id: str, ts: Optional[float] = None) -> Dict[str, int]:
+        """Transactions already recorded for the user in each window"""
+        ts = time.time() if ts is None else ts
+        key = hash_key(user_id)
+        return {name: window.count(key, ts) for name, window in self.windows.items()}
+
+    def count(self, user_id: str, window: str, ts: Optional[float] = None) -> int:
+        """Transactions already recorded for the user in one window"""
+        ts = time.time() if ts is None else ts
+        return self.windows[window].count(hash_key(user_id), ts)
+
+    def export_arrays(self) -> dict:
+        arrays = {}
+        for name, window in self.windows.items():
+            arrays.update(window.export_arrays(name))
+        return arrays
+
+    def import_arrays(self, arrays: dict):
+        for name, window in self.windows.items():
+            if f'{name}.head' in arrays:
+                window.import_arrays(arrays, name)
@@ -0,0 +1,92 @@
+"""
+Held-out evaluation of the scoring cascade
+
+Re-creates the training split (same seed and stratification as
+app/ml/model_training.py), then compares the full model against the
+cascade on the 20% test rows: fraction short-circuited by the pre-screen,
+recall at the HOLD and BLOCK thresholds, and per-transaction cost of each
+stage.
+
+    python -m benchmarks.cascade_eval
+    python -m benchmarks.cascade_eval --data data/training_data.csv --target-recall 0.99
+"""
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from app.config import get_settings
+from app.ml.cascade import PreScreen
+from app.ml.feature_engineering import FEATURE_COLUMNS
+from app.ml.model_training import FraudDetectionModel
+
+def _single_row_us(fn, rows: np.ndarray, iterations: int = 500) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(rows[i % len(rows)][None, :])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def evaluate(data_path: str, target_recall: float = None) -> dict:
+    settings = get_settings()
+    if not os.path.exists(data_path):
+        FraudDetectionModel()._generate_sample_data(data_path)
+
+    df = pd.read_csv(data_path)
+    X = df[FEATURE_COLUMNS].fillna(0).to_numpy(dtype=np.float64)
+    y = df['is_fraud'].to_numpy()
+
+    model = joblib.load(settings.ML_MODEL_PATH)
+    scaler = joblib.load(settings.SCALER_PATH)
+    X_train, X_test, y_train, y_test = train_test_split(
+        scaler.transform(X), y, test_size=0.2, random_state=42, stratify=y
+    )
+    X_test_raw = scaler.inverse_transform(X_test)
+
+    if target_recall is not None or not os.path.exists(settings.CASCADE_MODEL_PATH):
+        prescreen = PreScreen.fit(X_train, y_train, scaler, target_recall=target_recall or 0.995)
+    else:
+        prescreen = joblib.load(settings.CASCADE_MODEL_PATH)
+
+    full_scores = model.predict_proba(X_test)[:, 1]
+    short_circuit = prescreen.short_circuit(X_test_raw)
+
+    frauds = y_test == 1
+    report = {
+        "rows": int(len(y_test)),
+        "frauds": int(frauds.sum()),
+        "approve_below": round(prescreen.approve_below, 6),
+        "short_circuit_fraction": round(float(short_circuit.mean()), 4),
+        "frauds_short_circuited": int((short_circuit & frauds).sum()),
+    }
+    for name, threshold in (("hold", settings.FRAUD_MEDIUM_RISK_THRESHOLD), ("block", settings.FRAUD_HIGH_RISK_THRESHOLD)):
+        full_recall = float((full_scores[frauds] >= threshold).mean())
+        # Short-circuited rows are approvals regardless of what the booster would say
+        cascade_recall = float(((full_scores >= threshold) & ~short_circuit)[frauds].mean())
+        report[f"recall_at_{name}"] = {
+            "full_model": round(full_recall, 4),
+            "cascade": round(cascade_recall, 4),
+            "delta": round(cascade_recall - full_recall, 4),
+        }
+
+    report["cost_us_per_transaction"] = {
+        "prescreen": round(_single_row_us(prescreen.score, X_test_raw), 2),
+        "scaler_plus_model": round(_single_row_us(lambda row: model.predict_proba(scaler.transform(row)), X_test_raw), 2),
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Short-circuit rate and recall impact of the scoring cascade")
+    parser.add_argument("--data", default="data/training_data.csv")
+    parser.add_argument("--target-recall", type=float, help="Refit the pre-screen at this recall instead of loading CASCADE_MODEL_PATH")
+    args = parser.parse_args()
+
+    print(json.dumps(evaluate(args.data, args.target_recall), indent=2))
+
+if __name__ == "__main__":
+    main()
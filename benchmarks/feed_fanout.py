@@ -0,0 +1,76 @@
+"""
+Scoring throughput with live-feed subscribers attached
+
+Scores transactions through one AgentController while N in-process
+subscribers do what the SSE endpoint does per tick (wait, read, encode,
+join), and reports scoring throughput and latency per subscriber count.
+
+    python -m benchmarks.feed_fanout --transactions 3000 --subscribers 0 100 1000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from app.api.feed import _sse
+from app.services.agent import AgentController
+from app.services.decision_feed import DecisionFeed
+from benchmarks.replay import generate_transactions
+
+async def _subscriber(feed: DecisionFeed, subscription, delivered: list, stop: asyncio.Event):
+    while not stop.is_set():
+        if await feed.wait(subscription, 0.5):
+            chunk = b"".join(_sse(event) for event in feed.read(subscription))
+            delivered[0] += chunk.count(b"\n\n")
+
+async def run(transactions: int, subscribers: int) -> dict:
+    agent = AgentController()
+    agent.rollups = agent.profiles = None
+    agent.feed = feed = DecisionFeed(max_subscribers=max(subscribers, 1))
+    batch = generate_transactions(transactions, 500)
+
+    delivered, stop = [0], asyncio.Event()
+    tasks = [
+        asyncio.ensure_future(_subscriber(feed, feed.subscribe(), delivered, stop))
+        for _ in range(subscribers)
+    ]
+
+    latencies = []
+    started = time.perf_counter()
+    for i, tx in enumerate(batch):
+        tx['id'] = f"feed_{i}"
+        t0 = time.perf_counter()
+        await agent.process_transaction(tx)
+        latencies.append(time.perf_counter() - t0)
+        if i % 50 == 0:
+            await asyncio.sleep(0)  # let the subscribers run, as a server's loop would
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(feed.tick * 2)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+    return {
+        'subscribers': subscribers,
+        'tps': transactions / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+        'delivered': delivered[0],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring throughput with live-feed subscribers")
+    parser.add_argument("--transactions", type=int, default=3000)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[0, 100, 1000])
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(f"{'subscribers':>11} {'tps':>8} {'p50 ms':>8} {'p99 ms':>8} {'events delivered':>17}")
+    for subscribers in args.subscribers:
+        r = asyncio.run(run(args.transactions, subscribers))
+        print(f"{r['subscribers']:>11} {r['tps']:>8.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['delivered']:>17}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Import-time profile of the API process (python -X importtime)
+
+    python -m benchmarks.import_time                # app.main, top 25 modules
+    python -m benchmarks.import_time app.api.transactions --top 40
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Scoring-only dependencies that must not load when the API is imported
+HEAVY_MODULES = ("pandas", "xgboost", "sklearn", "joblib")
+
+def measure(module: str) -> dict:
+    """Import `module` in a fresh interpreter and parse -X importtime output"""
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return {
+        "module": module,
+        "total_ms": modules[module][1] / 1000,
+        "modules": modules,
+        "heavy_loaded": sorted(
+            name for name in modules if name.split(".")[0] in HEAVY_MODULES and "." not in name
+        ),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of a module")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    result = measure(args.module)
+    print(f"{args.module}: {result['total_ms']:.1f} ms cumulative")
+    print(f"heavy ML modules loaded: {result['heavy_loaded'] or 'none'}")
+    ranked = sorted(result["modules"].items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:9.1f} ms cum  {name}")
+
+if __name__ == "__main__":
+    main()
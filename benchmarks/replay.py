@@ -0,0 +1,248 @@
+"""
+Transaction replay harness
+
+Drives a stream of transactions through AgentController in-process and/or
+through the FastAPI app over HTTP, and reports throughput plus p50/p95/p99
+latency overall and per agent phase.
+
+    python -m benchmarks.replay --count 5000 --concurrency 32 --output bench.json
+    python -m benchmarks.replay --input replay.jsonl --mode http --url http://localhost:8000
+    python -m benchmarks.replay --baseline bench.json   # compare against an earlier run
+
+Failed submissions are counted, the first few are logged with their
+exception, and the run exits non-zero when more than --max-error-rate of
+them failed: latencies of a mostly failing run are not a benchmark.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PHASES = ["PERCEIVE", "REASON", "DECIDE", "ACT", "LEARN"]
+ERROR_SAMPLES = 5  # failures logged (and kept in the result) per run
+
+MERCHANTS = [
+    ("Amazon", "ECOMMERCE"), ("Flipkart", "ECOMMERCE"), ("Swiggy", "FOOD"),
+    ("Zomato", "FOOD"), ("BigBasket", "GROCERY"), ("Uber", "TRAVEL"),
+    ("IRCTC", "TRAVEL"), ("BookMyShow", "ENTERTAINMENT"),
+    ("CoinDCX", "CRYPTO"), ("WazirX", "CRYPTO"), ("Dream11", "GAMBLING"),
+    ("Western Union", "MONEY_TRANSFER"),
+]
+HOME_CITIES = [(19.0760, 72.8777), (28.6139, 77.2090), (12.9716, 77.5946), (13.0827, 80.2707)]
+
+def generate_transactions(count: int, users: int, seed: int = 42) -> list:
+    """Synthetic stream matching the TransactionRequest schema"""
+
+    rng = random.Random(seed)
+    homes = {f"user_{i:06d}": rng.choice(HOME_CITIES) for i in range(users)}
+    user_ids = list(homes)
+    # Yesterday 08:00: recent enough for the event-time window, same hours on every run
+    clock = (datetime.now() - timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+
+    transactions = []
+    for i in range(count):
+        user_id = rng.choice(user_ids)
+        merchant, category = rng.choice(MERCHANTS[:8]) if rng.random() < 0.95 else rng.choice(MERCHANTS[8:])
+        lat, lon = homes[user_id]
+        if rng.random() < 0.03:
+            lat, lon = rng.choice(HOME_CITIES)
+        clock += timedelta(milliseconds=rng.randint(1, 500))
+
+        transactions.append({
+            "user_id": user_id,
+            "amount": round(min(rng.lognormvariate(7.5, 1.1), 500000), 2),
+            "merchant": merchant,
+            "merchant_category": category,
+            "device_type": rng.choice(["web", "mobile", "api"]),
+            "device_ip": f"10.{int(user_id[5:]) % 250}.{rng.randint(0, 3)}.{rng.randint(1, 254)}",
+            "user_location": {"lat": lat + rng.uniform(-0.05, 0.05), "lon": lon + rng.uniform(-0.05, 0.05)},
+            "timestamp": clock.isoformat(),
+        })
+    return transactions
+
+def load_transactions(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(latencies_s: list) -> dict:
+    if not latencies_s:
+        return {"count": 0}
+    ms = np.asarray(latencies_s) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+class PhaseRecorder:
+    """AgentController phase listener collecting durations"""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+
+    def __call__(self, phase: str, seconds: float):
+        self.durations[phase].append(seconds)
+
+    def summary(self) -> dict:
+        return {phase: summarize(self.durations.get(phase, [])) for phase in PHASES}
+
+async def _drive(transactions: list, concurrency: int, submit) -> dict:
+    """Run submit(tx) for every transaction with bounded concurrency"""
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors, error_samples = [], 0, []
+
+    async def one(tx):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await submit(tx)
+            except Exception as e:
+                errors += 1
+                if len(error_samples) < ERROR_SAMPLES:
+                    error_samples.append(f"{type(e).__name__}: {e}")
+                    logger.warning("Replay submission failed: %s: %s", type(e).__name__, e)
+                return
+            latencies.append(time.perf_counter() - started)
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(tx) for tx in transactions))
+    wall = time.perf_counter() - wall_started
+
+    return {
+        "throughput_tps": round(len(latencies) / wall, 2) if wall else None,
+        "wall_seconds": round(wall, 3),
+        "errors": errors,
+        "error_rate": round(errors / len(transactions), 4) if transactions else 0.0,
+        "error_samples": error_samples,
+        "latency": summarize(latencies),
+    }
+
+async def run_inproc(transactions: list, concurrency: int) -> dict:
+    from app.services.agent import AgentController
+
+    agent = AgentController()
+    recorder = PhaseRecorder()
+    agent.phase_listeners.append(recorder)
+
+    def to_agent_dict(i, tx):
+        tx = dict(tx, id=f"bench_{i}")
+        if isinstance(tx.get("timestamp"), str):
+            tx["timestamp"] = datetime.fromisoformat(tx["timestamp"])
+        return tx
+
+    prepared = [to_agent_dict(i, tx) for i, tx in enumerate(transactions)]
+    result = await _drive(prepared, concurrency, agent.process_transaction)
+    result["phases"] = recorder.summary()
+    return result
+
+async def run_http(transactions: list, concurrency: int, url: str = None) -> dict:
+    import httpx
+
+    recorder = None
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=30)
+    else:
+        from app.main import app
+        from app.services.agent_runtime import get_agent
+        recorder = PhaseRecorder()
+        get_agent().phase_listeners.append(recorder)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+
+    async def submit(tx):
+        response = await client.post("/api/v1/transactions/process", json=tx)
+        response.raise_for_status()
+
+    async with client:
+        result = await _drive(transactions, concurrency, submit)
+
+    if recorder is not None:
+        result["phases"] = recorder.summary()
+    return result
+
+def compare(current: dict, baseline: dict):
+    """Print p50/p99 and throughput deltas against a previous result file"""
+
+    for mode in ("inproc", "http"):
+        if mode not in current or mode not in baseline:
+            continue
+        now, before = current[mode], baseline[mode]
+        print(f"[{mode}]")
+        rows = [("throughput_tps", now.get("throughput_tps"), before.get("throughput_tps"))]
+        for key in ("p50_ms", "p99_ms"):
+            rows.append((f"latency.{key}", now["latency"].get(key), before["latency"].get(key)))
+        for phase in PHASES:
+            if "phases" in now and "phases" in before:
+                rows.append((f"{phase}.p99_ms", now["phases"][phase].get("p99_ms"), before["phases"][phase].get("p99_ms")))
+        for name, a, b in rows:
+            if a is None or not b:
+                continue
+            print(f"  {name:<22} {b:>10} -> {a:>10}  ({(a - b) / b:+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay transactions through VerifAI and report latency")
+    parser.add_argument("--input", help="JSONL file of TransactionRequest payloads (default: synthetic)")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=["inproc", "http", "both"], default="inproc")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Exit non-zero above this fraction of failed submissions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    transactions = load_transactions(args.input) if args.input else generate_transactions(args.count, args.users, args.seed)
+
+    results = {
+        "meta": {
+            "transactions": len(transactions),
+            "concurrency": args.concurrency,
+            "source": args.input or f"synthetic(users={args.users}, seed={args.seed})",
+            "python": platform.python_version(),
+            "started_at": datetime.now().isoformat(),
+        }
+    }
+    if args.mode in ("inproc", "both"):
+        results["inproc"] = asyncio.run(run_inproc(transactions, args.concurrency))
+    if args.mode in ("http", "both"):
+        results["http"] = asyncio.run(run_http(transactions, args.concurrency, args.url))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+    failing = [mode for mode in ("inproc", "http") if mode in results and results[mode]["error_rate"] > args.max_error_rate]
+    if failing:
+        for mode in failing:
+            print(
+                f"ERROR: {mode} run failed {results[mode]['errors']}/{len(transactions)} submissions "
+                f"(first: {results[mode]['error_samples'][0]}); its latencies are not comparable",
+                file=sys.stderr
+            )
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
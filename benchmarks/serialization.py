@@ -0,0 +1,110 @@
+"""
+Per-request serialization cost of /transactions/process
+
+Compares the codec path (app.api.codec) against what FastAPI does for a
+model parameter and an untyped dict return:
+
+    decode: json.loads -> TransactionRequest(**data) -> .dict()
+    encode: response_model=dict validation -> jsonable_encoder -> JSONResponse.render
+
+    python -m benchmarks.serialization --iterations 20000
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.api.codec import MSGPACK_MEDIA_TYPE, _msgpack, decode_body, encode_response
+from app.models.schemas import TransactionRequest
+from benchmarks.replay import generate_transactions
+
+RESULT = {
+    "transaction_id": "5f0c6d3e-3a55-4b43-9d0c-6a3f1f3b8d21",
+    "fraud_score": 0.8731,
+    "risk_level": "CRITICAL",
+    "decision": "BLOCKED",
+    "reason": "🚨 CRITICAL fraud risk detected",
+    "actions": ["❌ TRANSACTION_BLOCKED", "📧 FRAUD_ALERT_SENT"],
+    "requires_confirmation": False,
+    "explanation": [
+        {"feature": "amount_zscore", "value": 4.12, "contribution": 2.3141},
+        {"feature": "is_high_risk_merchant_category", "value": 1.0, "contribution": 1.0521},
+        {"feature": "is_new_device", "value": 1.0, "contribution": 0.4410},
+        {"feature": "location_distance_km", "value": 1180.5, "contribution": 0.3012},
+        {"feature": "hour_of_day", "value": 3.0, "contribution": 0.1204},
+    ],
+}
+
+_DICT_ADAPTER = TypeAdapter(dict)
+
+def fastapi_decode(body: bytes) -> dict:
+    return TransactionRequest(**json.loads(body)).dict()
+
+def fastapi_encode(result: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(_DICT_ADAPTER.validate_python(result))).body
+
+def codec_decode(body: bytes, content_type: str = "application/json") -> dict:
+    return decode_body(TransactionRequest, body, content_type).model_dump()
+
+def codec_encode(result: dict, accept: str = "application/json") -> bytes:
+    return encode_response(result, accept).body
+
+def _per_call_us(fn, inputs, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(inputs[i % len(inputs)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def run(iterations: int) -> dict:
+    transactions = generate_transactions(256, 64)
+    json_bodies = [json.dumps(tx, default=str).encode("utf-8") for tx in transactions]
+    results = [RESULT]
+
+    paths = {
+        "fastapi": (fastapi_decode, fastapi_encode, json_bodies),
+        "codec_json": (codec_decode, codec_encode, json_bodies),
+    }
+    msgpack = _msgpack()
+    if msgpack is not None:
+        msgpack_bodies = [msgpack.packb(json.loads(body)) for body in json_bodies]
+        paths["codec_msgpack"] = (
+            lambda b: codec_decode(b, MSGPACK_MEDIA_TYPE),
+            lambda r: codec_encode(r, MSGPACK_MEDIA_TYPE),
+            msgpack_bodies,
+        )
+
+    report = {}
+    for name, (decode, encode, bodies) in paths.items():
+        # Warm caches and lazy imports before timing
+        _per_call_us(decode, bodies, 200)
+        _per_call_us(encode, results, 200)
+        decode_us = _per_call_us(decode, bodies, iterations)
+        encode_us = _per_call_us(encode, results, iterations)
+        report[name] = {
+            "decode_us": round(decode_us, 2),
+            "encode_us": round(encode_us, 2),
+            "total_us": round(decode_us + encode_us, 2),
+            "response_bytes": len(encode(RESULT)),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization cost per transaction request")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    report = run(args.iterations)
+    baseline = report["fastapi"]["total_us"]
+    print(f"{'path':<15} {'decode us':>10} {'encode us':>10} {'total us':>10} {'bytes':>7} {'speedup':>8}")
+    for name, row in report.items():
+        print(
+            f"{name:<15} {row['decode_us']:>10.2f} {row['encode_us']:>10.2f} {row['total_us']:>10.2f} "
+            f"{row['response_bytes']:>7} {baseline / row['total_us']:>7.2f}x"
+        )
+
+if __name__ == "__main__":
+    main()
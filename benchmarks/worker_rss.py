@@ -0,0 +1,114 @@
+"""
+Per-worker memory with and without a pre-fork model preload (Linux only)
+
+Mimics gunicorn's process model with os.fork(): N children each build an
+AgentController and score a few transactions, then report their memory
+from /proc/<pid>/smaps_rollup.
+
+- per-worker: children import the scoring stack and load the model themselves
+- preload:    the parent calls app.ml.model_store.preload() before forking
+
+Private (USS) is what each extra worker really costs; PSS splits shared
+pages between the processes that map them.
+
+    python -m benchmarks.worker_rss --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(fields["Rss"] / 1024, 1),
+        "pss_mb": round(fields["Pss"] / 1024, 1),
+        "private_mb": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1),
+    }
+
+def run_mode(mode: str, workers: int) -> dict:
+    """Fork `workers` children in a fresh interpreter so modes don't share state"""
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.worker_rss", "--child-mode", mode, "--workers", str(workers)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def _child_main(ready_fd: int, release_fd: int):
+    """Build an agent, score a few transactions, then hold still until the parent has measured us"""
+    from app.services.agent import AgentController
+    from benchmarks.replay import generate_transactions
+
+    agent = AgentController()
+
+    async def score():
+        for i, tx in enumerate(generate_transactions(50, 10)):
+            tx['id'] = f"rss_{i}"
+            await agent.process_transaction(tx)
+
+    asyncio.run(score())
+    os.write(ready_fd, b"x")
+    os.read(release_fd, 1)
+
+def _fork_workers(mode: str, workers: int) -> dict:
+    import logging
+    logging.disable(logging.WARNING)
+
+    if mode == "preload":
+        from app.ml.model_store import preload
+        preload()
+
+    children = []
+    for _ in range(workers):
+        parent_end, child_end = os.pipe(), os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(parent_end[0])
+            os.close(child_end[1])
+            _child_main(ready_fd=parent_end[1], release_fd=child_end[0])
+            os._exit(0)
+        os.close(parent_end[1])
+        os.close(child_end[0])
+        children.append((pid, parent_end[0], child_end[1]))
+
+    for _, ready_fd, _ in children:
+        os.read(ready_fd, 1)
+    per_worker = [memory_kb(pid) for pid, _, _ in children]
+    for pid, _, release_fd in children:
+        os.write(release_fd, b"x")
+        os.waitpid(pid, 0)
+
+    totals = {key: round(sum(w[key] for w in per_worker), 1) for key in per_worker[0]}
+    return {"mode": mode, "workers": workers, "per_worker": per_worker, "total": totals, "master": memory_kb(os.getpid())}
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker RSS/PSS/USS with and without model preload")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child-mode", choices=["per-worker", "preload"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_mode:
+        print(json.dumps(_fork_workers(args.child_mode, args.workers)))
+        return
+
+    results = [run_mode(mode, args.workers) for mode in ("per-worker", "preload")]
+    print(f"{'mode':<12} {'workers':>7} {'private MB/worker':>18} {'PSS MB total':>13} {'RSS MB/worker':>14}")
+    for result in results:
+        n = result["workers"]
+        print(
+            f"{result['mode']:<12} {n:>7} {result['total']['private_mb'] / n:>18.1f} "
+            f"{result['total']['pss_mb'] + result['master']['pss_mb']:>13.1f} {result['total']['rss_mb'] / n:>14.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
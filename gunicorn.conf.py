@@ -0,0 +1,30 @@
+"""
+Multi-worker serving with the model shared copy-on-write
+
+    gunicorn app.main:app -c gunicorn.conf.py
+    WEB_CONCURRENCY=8 gunicorn app.main:app -c gunicorn.conf.py
+
+The master loads the model artifacts once before forking; each worker
+still builds its own AgentController (per-user state) in the app lifespan.
+post_fork drops what the worker must not share with the master: the log
+listener thread and the lazily built singletons (audit sink, profile
+store, rollups, live feed).
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+
+def on_starting(server):
+    from app.ml.model_store import preload
+    preload()
+
+def post_fork(server, worker):
+    from app.services.agent_runtime import reset_after_fork
+    reset_after_fork()
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import admin
+from app.config import get_settings
+
+TOKEN = "s3cret-token"
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", TOKEN)
+    return settings
+
+@pytest.fixture
+def client(settings):
+    app = FastAPI()
+    app.include_router(admin.router)
+    app.middleware("http")(admin.profile_request)
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(range(1000))}
+
+    return TestClient(app)
+
+def test_token_check_refuses_empty_and_wrong_tokens(settings, monkeypatch):
+    assert admin.admin_token_ok(TOKEN)
+    assert not admin.admin_token_ok("")
+    assert not admin.admin_token_ok(TOKEN + "x")
+
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "")
+    assert not admin.admin_token_ok("")
+
+def test_sample_endpoint_requires_token(client, settings, monkeypatch):
+    url = "/admin/profile/sample?seconds=0.05&interval_ms=5"
+    assert client.get(url).status_code == 403
+    assert client.get(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.get(url, headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    # Profiling on but no token configured: refused, not open
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "")
+    assert client.get(url).status_code == 403
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+    assert client.get(url, headers={"X-Admin-Token": TOKEN}).status_code == 404
+
+def test_request_profile_round_trip(client, settings, monkeypatch):
+    response = client.get("/work", headers={"X-VerifAI-Profile": "1"})
+    assert "X-VerifAI-Profile-Id" not in response.headers
+
+    response = client.get("/work", headers={"X-VerifAI-Profile": "1", "X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers["X-VerifAI-Profile-Id"]
+
+    report = client.get(f"/admin/profile/requests/{profile_id}", headers={"X-Admin-Token": TOKEN})
+    assert report.status_code == 200
+    assert "function calls" in report.text
+    assert client.get(f"/admin/profile/requests/{profile_id}").status_code == 403
+    assert client.get("/admin/profile/requests/missing", headers={"X-Admin-Token": TOKEN}).status_code == 404
+
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "")
+    response = client.get("/work", headers={"X-VerifAI-Profile": "1", "X-Admin-Token": ""})
+    assert "X-VerifAI-Profile-Id" not in response.headers
+
+def test_profiled_request_runs_alone(settings):
+    from starlette.responses import Response
+    from app.services.profiler import request_gate, request_profiles
+    events = []
+
+    class FakeRequest:
+        method, url = "GET", type("Url", (), {"path": "/work"})()
+
+        def __init__(self, name, profiled=False):
+            self.name = name
+            self.headers = {"x-verifai-profile": "1", "x-admin-token": TOKEN} if profiled else {}
+
+    async def call_next(request):
+        events.append(f"{request.name} start")
+        await asyncio.sleep(0.02)
+        events.append(f"{request.name} end")
+        return Response("ok")
+
+    async def later(request):
+        await asyncio.sleep(0.005)
+        return await admin.profile_request(request, call_next)
+
+    async def run():
+        return await asyncio.gather(
+            admin.profile_request(FakeRequest("before"), call_next),
+            later(FakeRequest("profiled", profiled=True)),
+            later(FakeRequest("after")),
+        )
+
+    responses = asyncio.run(run())
+    assert events == ["before start", "before end", "profiled start", "profiled end", "after start", "after end"]
+    assert request_gate.in_flight == 0
+    report = request_profiles.get(responses[1].headers["X-VerifAI-Profile-Id"])
+    assert report.startswith("# GET /work: other requests held while profiled")
+    assert "WARNING" not in report
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import pytest
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.metrics import ADMISSION_SHED
+
+def test_bounded_in_flight_and_fifo_handoff():
+    controller = AdmissionController(max_in_flight=2, max_queue=10)
+    running, peak, order = [0], [0], []
+
+    async def job(i):
+        async def compute():
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            order.append(i)
+            return i
+        return await controller.run(compute, time.monotonic() + 5)
+
+    async def run():
+        return await asyncio.gather(*(job(i) for i in range(6)))
+
+    assert asyncio.run(run()) == list(range(6))
+    assert peak[0] == 2
+    assert order[2:] == [2, 3, 4, 5]
+    assert controller.in_flight == 0 and controller.queue_depth == 0
+
+def test_sheds_when_queue_full_or_deadline_passes():
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    full_before = ADMISSION_SHED.value("queue_full")
+    expired_before = ADMISSION_SHED.value("expired")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(controller.run(slow, time.monotonic() + 5))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(controller.run(slow, time.monotonic() + 0.01))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await controller.run(slow, time.monotonic() + 5)
+        with pytest.raises(AdmissionRejected) as expired:
+            await queued
+        assert expired.value.reason == "expired"
+        assert await first == "done"
+
+    asyncio.run(run())
+    assert ADMISSION_SHED.value("queue_full") == full_before + 1
+    assert ADMISSION_SHED.value("expired") == expired_before + 1
+    assert controller.in_flight == 0 and controller.queue_depth == 0
+
+def test_shed_request_is_recorded_like_a_scored_one(monkeypatch):
+    """The degraded MANUAL_REVIEW answer reaches the decision metric, rollups and live feed"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import transactions
+    from app.services import decision_feed, rollups
+    from app.services.agent_runtime import get_agent
+    from app.services.metrics import DECISIONS
+
+    store, feed = rollups.RollupStore(), decision_feed.DecisionFeed(capacity=8)
+    monkeypatch.setattr(rollups, "get_rollup_store", lambda: store)
+    monkeypatch.setattr(decision_feed, "get_decision_feed", lambda: feed)
+    saturated = AdmissionController(max_in_flight=1, max_queue=0)
+    saturated.in_flight = 1  # the only slot is busy and nothing may queue
+    monkeypatch.setattr(transactions, "get_admission_controller", lambda: saturated)
+
+    app = FastAPI()
+    app.include_router(transactions.router)
+    app.dependency_overrides[get_agent] = lambda: None
+    before = DECISIONS.value("MANUAL_REVIEW")
+
+    subscription = feed.subscribe()
+    response = TestClient(app).post("/api/v1/transactions/process", json={
+        "user_id": "user_001", "amount": 5000, "merchant": "Amazon", "merchant_category": "ECOMMERCE",
+        "device_type": "web", "device_ip": "192.168.1.1", "user_location": {"lat": 19.07, "lon": 72.87},
+    })
+    assert response.json()["decision"] == "MANUAL_REVIEW"
+
+    assert DECISIONS.value("MANUAL_REVIEW") == before + 1
+    series = store.decision_series(3600)['points']
+    assert sum(point['MANUAL_REVIEW'] for point in series) == 1
+    assert store.score_histogram(3600)['total'] == 0  # unscored: no score to bin
+    assert [event.decision for event in feed.read(subscription)] == ["MANUAL_REVIEW"]
+
+def test_rejects_invalid_limits_and_requests_already_past_their_deadline():
+    with pytest.raises(ValueError):
+        AdmissionController(max_in_flight=0, max_queue=10)
+
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    deadline_before = ADMISSION_SHED.value("deadline")
+
+    async def compute():
+        return "done"
+
+    async def run():
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.run(compute, time.monotonic() - 0.001)
+        assert rejected.value.reason == "deadline"
+        return await controller.run(compute, time.monotonic() + 5)
+
+    # A free slot does not admit a request whose deadline is already gone
+    assert asyncio.run(run()) == "done"
+    assert ADMISSION_SHED.value("deadline") == deadline_before + 1
+    assert controller.in_flight == 0
@@ -0,0 +1,112 @@
+import json
+import os
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, AuditLog
+from app.services.audit_sink import META_DATA_MAX_CHARS, AuditEventSink, encode_meta_data
+
+class FlakySessionFactory:
+    """Session factory whose database can be switched off"""
+
+    def __init__(self):
+        engine = create_engine("sqlite://", future=True)
+        Base.metadata.create_all(bind=engine)
+        self.factory = sessionmaker(bind=engine)
+        self.available = True
+
+    def __call__(self):
+        if not self.available:
+            raise ConnectionError("database unavailable")
+        return self.factory()
+
+def test_spill_and_replay(tmp_path):
+    """Events spill to disk while the DB is down and are replayed afterwards"""
+    sessions = FlakySessionFactory()
+    sink = AuditEventSink(
+        session_factory=sessions, batch_size=2,
+        spill_path=str(tmp_path / "spill.jsonl"), recovery_interval_seconds=1
+    )
+
+    for i in range(3):
+        sink.emit("fraud_alert", "critical", f"event {i}")
+    sink._flush(sink._drain())
+    assert sink.stats['written'] == 2
+
+    sessions.available = False
+    sink._flush(sink._drain())
+    sink.emit("account_locked", "critical", "event 3")
+    sink._flush(sink._drain())
+    assert sink.stats['spilled'] == 2
+    assert (tmp_path / "spill.jsonl").exists()
+
+    sessions.available = True
+    sink._recover()
+    assert not sink._degraded
+    assert not (tmp_path / "spill.jsonl").exists()
+
+    with sessions() as db:
+        assert db.query(AuditLog).count() == 4
+
+def test_oversized_meta_data_stays_valid_json():
+    meta = {'tx_id': "tx_1", 'notes': 'say "hi" ' * 400}
+    encoded = encode_meta_data(meta)
+    assert len(encoded) <= META_DATA_MAX_CHARS
+    envelope = json.loads(encoded)
+    assert envelope['truncated'] is True
+    assert envelope['size'] == len(json.dumps(meta))
+    assert json.dumps(meta).startswith(envelope['preview'])
+
+    assert json.loads(encode_meta_data({'tx_id': "tx_1"})) == {'tx_id': "tx_1"}
+    assert encode_meta_data(None) is None
+
+def test_leftover_replay_file_is_replayed_first(tmp_path):
+    """A crash mid-replay leaves .replay behind, partly inserted; the next start finishes it"""
+    sessions = FlakySessionFactory()
+    spill = tmp_path / "spill.jsonl"
+    sink = AuditEventSink(session_factory=sessions, batch_size=10, spill_path=str(spill), recovery_interval_seconds=1)
+
+    sessions.available = False
+    for i in range(3):
+        sink.emit("fraud_alert", "critical", f"event {i}")
+    sink._flush(sink._drain())
+    # Simulate the crash: the spill was renamed and its first row inserted, then the process died
+    os.replace(spill, str(spill) + ".replay")
+    sessions.available = True
+    first = json.loads(open(str(spill) + ".replay").readline())
+    first['created_at'] = datetime.fromisoformat(first['created_at'])
+    sink._insert([first])
+
+    sessions.available = False
+    sink.emit("account_locked", "critical", "event 3")
+    sink._flush(sink._drain())  # newer rows spill next to the leftover
+
+    restarted = AuditEventSink(session_factory=sessions, batch_size=10, spill_path=str(spill), recovery_interval_seconds=1)
+    assert restarted._degraded
+    sessions.available = True
+    restarted._recover()
+
+    assert not restarted._degraded
+    assert not spill.exists() and not os.path.exists(str(spill) + ".replay")
+    with sessions() as db:
+        assert sorted(row.description for row in db.query(AuditLog)) == [f"event {i}" for i in range(4)]
+
+def test_agent_uses_the_sink_it_is_given():
+    """Agents built outside the app discard audit events instead of starting the global writer"""
+    import asyncio
+    from app.services.agent import AgentController, DecisionEnum
+    from app.services.audit_sink import NullAuditSink
+
+    class ListSink:
+        def __init__(self):
+            self.events = []
+
+        def emit(self, event_type, severity, description, **fields):
+            self.events.append((event_type, severity))
+
+    assert isinstance(AgentController(track_aggregates=False).audit, NullAuditSink)
+
+    sink = ListSink()
+    agent = AgentController(track_aggregates=False, audit_sink=sink)
+    asyncio.run(agent._execute_action(DecisionEnum.BLOCK, "tx_1", "user_1", 90000.0, "Shop", None, "CRYPTO", 0.97, "CRITICAL"))
+    assert sink.events == [("fraud_alert", "critical")]
@@ -0,0 +1,30 @@
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from app.ml.cascade import PreScreen
+from app.ml.feature_engineering import FEATURE_COLUMNS
+
+def _data(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.05).astype(int)
+    X = rng.normal(size=(n, len(FEATURE_COLUMNS))) * 10 + 50
+    X[:, 0] += y * rng.normal(3, 1.5, n) * 10  # amount_zscore carries most of the signal
+    return X, y
+
+def test_folded_weights_score_raw_features_like_the_scaled_model():
+    X, y = _data()
+    scaler = StandardScaler().fit(X)
+    screen = PreScreen.fit(scaler.transform(X), y, scaler, target_recall=0.99, max_approve_below=1.0)
+
+    from sklearn.linear_model import LogisticRegression
+    reference = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+    np.testing.assert_allclose(screen.score(X), reference.predict_proba(scaler.transform(X))[:, 1], rtol=1e-6)
+
+    frauds_passed = (~screen.short_circuit(X))[y == 1].mean()
+    assert frauds_passed >= 0.99
+
+def test_threshold_is_capped_at_low_risk_band():
+    X, y = _data(seed=1)
+    scaler = StandardScaler().fit(X)
+    screen = PreScreen.fit(scaler.transform(X), y, scaler, target_recall=0.5, max_approve_below=0.2)
+    assert screen.approve_below <= 0.2
+    assert (screen.score(X[screen.short_circuit(X)]) < 0.2).all()
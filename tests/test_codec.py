@@ -0,0 +1,46 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import transactions
+from app.api.codec import MSGPACK_MEDIA_TYPE
+from app.services.agent_runtime import get_agent
+
+class EchoAgent:
+    async def process_transaction(self, transaction, explain=False):
+        return {'transaction_id': transaction['id'], 'fraud_score': 0.01, 'decision': 'APPROVED', 'amount': transaction['amount']}
+
+PAYLOAD = {
+    "user_id": "user_001", "amount": 5000, "merchant": "Amazon", "merchant_category": "ECOMMERCE",
+    "device_type": "web", "device_ip": "192.168.1.1", "user_location": {"lat": 19.07, "lon": 72.87},
+}
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(transactions.router)
+    app.dependency_overrides[get_agent] = EchoAgent
+    return TestClient(app)
+
+def test_json_round_trip(client):
+    response = client.post("/api/v1/transactions/process", json=PAYLOAD)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["amount"] == 5000.0
+
+def test_invalid_body_keeps_fastapi_validation_shape(client):
+    response = client.post("/api/v1/transactions/process", json={**PAYLOAD, "amount": -1})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "amount"]
+
+    response = client.post("/api/v1/transactions/process", content=b"{not json", headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+def test_msgpack_round_trip(client):
+    msgpack = pytest.importorskip("msgpack")
+    response = client.post(
+        "/api/v1/transactions/process",
+        content=msgpack.packb(PAYLOAD),
+        headers={"content-type": MSGPACK_MEDIA_TYPE, "accept": MSGPACK_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content)["decision"] == "APPROVED"
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from app.services.decision_feed import DecisionFeed, SlowConsumer
+
+def _result(i, decision="APPROVED", score=0.1, risk="LOW"):
+    return {'transaction_id': f"tx_{i}", 'decision': decision, 'fraud_score': score, 'risk_level': risk}
+
+def test_subscribers_get_coalesced_filtered_batches():
+    feed = DecisionFeed(capacity=64, tick_ms=10, max_subscribers=2)
+
+    async def run():
+        everything = feed.subscribe()
+        blocked = feed.subscribe(decisions=frozenset({"BLOCKED"}), min_score=0.9)
+        assert feed.subscribe() is None  # at capacity
+
+        waiting = asyncio.ensure_future(feed.wait(everything, timeout=1.0))
+        for i in range(10):
+            feed.publish(_result(i), {'user_id': "u1"})
+        feed.publish(_result(10, "BLOCKED", 0.95, "CRITICAL"), {'user_id': "u2"})
+        feed.publish(_result(11, "BLOCKED", 0.5, "MEDIUM"), {'user_id': "u3"})
+        assert not waiting.done()  # woken once per tick, not per event
+        assert await waiting
+
+        assert [e.seq for e in feed.read(everything)] == list(range(12))
+        assert [e.data['transaction_id'] for e in feed.read(blocked)] == ["tx_10"]
+        assert feed.read(everything) == []
+
+        feed.unsubscribe(blocked)
+        resumed = feed.subscribe(last_event_id=9)
+        assert [e.seq for e in feed.read(resumed)] == [10, 11]
+
+    asyncio.run(run())
+
+def test_slow_consumers_skip_ahead_or_are_dropped():
+    async def run(policy):
+        feed = DecisionFeed(capacity=8, tick_ms=10, slow_consumer=policy)
+        subscription = feed.subscribe()
+        for i in range(20):
+            feed.publish(_result(i), {})
+        return feed, subscription
+
+    feed, subscription = asyncio.run(run("skip"))
+    assert [e.seq for e in feed.read(subscription)] == list(range(12, 20))
+    assert subscription.missed == 12
+
+    feed, subscription = asyncio.run(run("drop"))
+    with pytest.raises(SlowConsumer):
+        feed.read(subscription)
+    assert feed.subscriber_count == 0
+
+def test_sse_endpoint_subscribes_only_while_streaming(monkeypatch):
+    """A client that disconnects before the first chunk must not leave a subscription behind"""
+    from app.api import feed as feed_api
+
+    feed = DecisionFeed(capacity=16, tick_ms=10, max_subscribers=1)
+    monkeypatch.setattr(feed_api, "get_decision_feed", lambda: feed)
+
+    async def run():
+        abandoned = await feed_api.decision_feed(None, None, 0.0, None)
+        del abandoned  # never iterated
+        assert feed.subscriber_count == 0
+
+        response = await feed_api.decision_feed("BLOCKED", "CRITICAL,MEDIUM", 0.0, None)
+        body = response.body_iterator
+        assert await body.__anext__() == b"retry: 3000\n\n"
+        assert feed.subscriber_count == 1
+
+        with pytest.raises(feed_api.HTTPException) as full:
+            await feed_api.decision_feed(None, None, 0.0, None)
+        assert full.value.status_code == 503
+
+        feed.publish(_result(1, "BLOCKED", 0.72, "MEDIUM"), {'user_id': "u1"})
+        assert b"tx_1" in await body.__anext__()
+        await body.aclose()
+        assert feed.subscriber_count == 0
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from app.ml.feature_engineering import FEATURE_COLUMNS
+
+xgb = pytest.importorskip("xgboost")
+
+def _model():
+    from sklearn.preprocessing import StandardScaler
+    rng = np.random.default_rng(7)
+    X = pd.DataFrame(rng.normal(size=(400, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    y = (X['amount_zscore'] + X['location_distance_km'] > 0.5).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=3).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+def test_transactions_without_an_id_are_not_served_from_the_cache():
+    from app.ml.explain import Explainer
+    model, scaler, X = _model()
+    explainer = Explainer(model, scaler)
+
+    first = explainer.explain_batch(X.iloc[[0]], [None])[0]
+    second = explainer.explain_batch(X.iloc[[1]], [None])[0]
+    assert first != second
+    assert len(explainer._cache) == 0
+
+    explainer.explain_batch(X.iloc[[0, 1]], ["tx_a", None])
+    assert explainer.get("tx_a") == first
+    assert list(explainer._cache) == ["tx_a"]
+
+def test_demo_override_carries_no_model_explanation(monkeypatch):
+    from app.services.agent import AgentController
+    from app.ml.explain import Explainer
+    model, scaler, _ = _model()
+    agent = AgentController(track_aggregates=False)
+    agent.model, agent.scaler, agent.prescreen = model, scaler, None
+    agent.explainer = Explainer(model, scaler)
+
+    def tx(i):
+        return {'id': f"tx_{i}", 'user_id': f"user_{i}", 'amount': 5000.0, 'merchant': "Shop",
+                'merchant_category': "ECOMMERCE", 'user_location': {'lat': 19.07, 'lon': 72.87}}
+
+    plain = asyncio.run(agent.process_transaction(tx(1), explain=True))
+    assert plain['explanation'] and 'score_override' not in plain
+
+    monkeypatch.setattr(AgentController, "_demo_override", staticmethod(lambda features: np.ones(len(features), dtype=bool)))
+    forced = asyncio.run(agent.process_transaction(tx(2), explain=True))
+    assert forced['fraud_score'] >= 0.95 and forced['score_override'] is True
+    assert 'explanation' not in forced
+    batch = asyncio.run(agent.process_batch([tx(3), tx(4)], explain=True))
+    assert all(result['score_override'] and 'explanation' not in result for result in batch)
+    assert agent.explainer.get("tx_2") is None
@@ -0,0 +1,150 @@
+from datetime import datetime, timezone, timedelta
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, User, Device
+import pytest
+from pydantic import ValidationError
+from app.ml.feature_engineering import FEATURE_COLUMNS, FeatureEngineer, event_time, time_features
+from app.models.schemas import TransactionRequest
+from app.services.device_index import DeviceIndex
+from app.services.velocity import VelocityTracker
+from app.services.geo_index import HomeLocationIndex, haversine_km
+from app.services.merchant_index import MerchantIndex
+
+def test_device_index_warm_and_lookup():
+    """Known devices come from the devices table; unknown ones are new"""
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(bind=engine)
+
+    with SessionFactory() as db:
+        db.add(User(id="u1", email="a@example.com", password_hash="x", name="A"))
+        db.add(Device(user_id="u1", device_ip="10.0.0.1", device_fingerprint="fp-1",
+                      device_type="web", trust_score=0.9))
+        db.commit()
+
+    index = DeviceIndex()
+    assert index.warm(SessionFactory) == 1
+
+    assert index.lookup("u1", "fp-1", "1.2.3.4") == (0, 0.9)
+    assert index.lookup("u1", None, "10.0.0.1") == (0, 0.9)
+    assert index.lookup("u1", "fp-2", "10.0.0.2") == (1, 0.0)
+    # First device of an unknown user is not flagged
+    assert index.lookup("u2", None, "10.0.0.3")[0] == 0
+
+    index.observe("u2", None, "10.0.0.3")
+    assert index.lookup("u2", None, "10.0.0.9")[0] == 1
+
+def test_feature_engineer_uses_device_index():
+    index = DeviceIndex()
+    index.observe("u1", "fp-1", "10.0.0.1")
+
+    engineer = FeatureEngineer(device_index=index)
+    features = engineer.create_features({
+        'user_id': 'u1', 'amount': 100, 'device_ip': '10.9.9.9', 'device_fingerprint': 'fp-9'
+    })
+    assert features['is_new_device'].iloc[0] == 1
+
+def test_velocity_windows_slide():
+    """Counts expire bucket by bucket as time moves on"""
+    tracker = VelocityTracker()
+    start = 1_700_000_000.0
+
+    for i in range(5):
+        tracker.record("u1", start + i)
+    tracker.record("u2", start)
+
+    assert tracker.counts("u1", start + 5) == {'1m': 5, '1h': 5, '24h': 5}
+    assert tracker.counts("u2", start + 5)['1m'] == 1
+    assert tracker.counts("u1", start + 120) == {'1m': 0, '1h': 5, '24h': 5}
+    assert tracker.counts("u1", start + 2 * 3600) == {'1m': 0, '1h': 0, '24h': 5}
+    assert tracker.counts("u1", start + 2 * 86400) == {'1m': 0, '1h': 0, '24h': 0}
+
+def test_future_timestamp_does_not_wipe_velocity():
+    """A far-future timestamp counts as now instead of moving the window past everyone"""
+    tracker = VelocityTracker()
+    now = time.time()
+    tracker.record("u1", now)
+    tracker.record("u2", now + 10 * 86400)
+    tracker.record("u1", now)
+
+    assert tracker.counts("u1", now) == {'1m': 2, '1h': 2, '24h': 2}
+    assert tracker.counts("u2", now) == {'1m': 1, '1h': 1, '24h': 1}
+
+def test_feature_engineer_uses_velocity():
+    tracker = VelocityTracker()
+    for _ in range(11):
+        tracker.record("u1")
+
+    features = FeatureEngineer(velocity=tracker).create_features({'user_id': 'u1', 'amount': 100})
+    assert features['transactions_today'].iloc[0] == 12
+    assert features['is_velocity_attack'].iloc[0] == 1
+    assert sorted(features.columns) == sorted(FEATURE_COLUMNS)
+
+def test_home_location_centroids():
+    """Nearby points merge into one centroid, distant ones open a new one"""
+    index = HomeLocationIndex(max_centroids=2)
+    mumbai, delhi = (19.0760, 72.8777), (28.6139, 77.2090)
+
+    assert index.nearest_distance_km("u1", *mumbai) == 0.0
+    index.update("u1", *mumbai)
+    index.update("u1", 19.0800, 72.8800)
+    assert len(index.centroids("u1")) == 1
+
+    mumbai_delhi = float(haversine_km(*mumbai, *delhi))
+    assert 1100 < mumbai_delhi < 1200
+    assert abs(index.nearest_distance_km("u1", *delhi) - mumbai_delhi) < 5
+
+    index.update("u1", *delhi)
+    assert len(index.centroids("u1")) == 2
+    assert index.nearest_distance_km("u1", *delhi) < 1
+
+    batch = index.batch_nearest_distance_km(["u1", "u2"], [delhi[0], 0.0], [delhi[1], 0.0])
+    assert batch[0] < 1 and batch[1] == 0.0
+
+def test_merchant_index_frequency():
+    index = MerchantIndex()
+    for merchant in ["Amazon", "Flipkart", "amazon ", "Swiggy"]:
+        index.observe("u1", merchant)
+
+    assert index.frequency("u1", "AMAZON") == 2
+    assert index.frequency("u1", "Swiggy") == 1
+    assert index.frequency("u1", "Unknown_Store") == 0
+    assert index.frequency("u2", "Amazon") == 0
+
+    features = FeatureEngineer(merchant_index=index).create_features(
+        {'user_id': 'u1', 'amount': 100, 'merchant': 'Flipkart'}
+    )
+    assert features['merchant_seen_before'].iloc[0] == 1
+
+def test_time_features_use_event_time():
+    """Time features come from the event timestamp, in its own wall clock"""
+    ist = timezone(timedelta(hours=5, minutes=30))
+    cols = time_features([
+        datetime(2025, 12, 6, 23, 30),             # Saturday night
+        datetime(2025, 12, 8, 14, 0, tzinfo=ist),  # Monday afternoon, IST
+    ])
+    assert list(cols['hour_of_day']) == [23, 14]
+    assert list(cols['day_of_week']) == [5, 0]
+    assert list(cols['is_night_transaction']) == [1, 0]
+    assert list(cols['is_weekend']) == [1, 0]
+
+    features = FeatureEngineer().create_features({'amount': 100, 'timestamp': '2025-12-06T03:15:00'})
+    assert features['hour_of_day'].iloc[0] == 3
+    assert features['is_night_transaction'].iloc[0] == 1
+
+def test_event_time_is_bounded():
+    """Far-future event times are rejected at the API and clamped if they reach the agent"""
+    future = datetime.now() + timedelta(days=10)
+    assert event_time({'timestamp': future}) <= datetime.now() + timedelta(seconds=301)
+
+    body = {
+        'user_id': 'u1', 'amount': 100, 'merchant': 'Flipkart', 'merchant_category': 'retail',
+        'device_type': 'web', 'device_ip': '10.0.0.1', 'user_location': {'lat': 19.0, 'lon': 72.8},
+    }
+    assert TransactionRequest(**body, timestamp=datetime.now()).timestamp is not None
+    with pytest.raises(ValidationError):
+        TransactionRequest(**body, timestamp=future)
+    with pytest.raises(ValidationError):
+        TransactionRequest(**body, timestamp=datetime.now() - timedelta(days=365))
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.services.idempotency import IdempotencyCache, IdempotencyConflict
+
+def test_concurrent_duplicates_share_one_computation():
+    cache = IdempotencyCache(max_entries=10, ttl_seconds=60)
+    calls = []
+
+    async def score():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"decision": "APPROVED", "transaction_id": f"tx_{len(calls)}"}
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_compute("u1:key", "fp", score) for _ in range(5)))
+        retry = await cache.get_or_compute("u1:key", "fp", score)
+        return first, retry
+
+    first, retry = asyncio.run(run())
+    assert len(calls) == 1
+    assert [replayed for _, replayed in first].count(False) == 1
+    assert {result["transaction_id"] for result, _ in first} == {"tx_1"}
+    assert retry == ({"decision": "APPROVED", "transaction_id": "tx_1"}, True)
+
+def test_key_reuse_with_different_body_conflicts():
+    cache = IdempotencyCache(max_entries=10, ttl_seconds=60)
+
+    async def score():
+        return {"decision": "APPROVED"}
+
+    async def run():
+        await cache.get_or_compute("u1:key", "fp-a", score)
+        await cache.get_or_compute("u1:key", "fp-b", score)
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(run())
+
+def test_key_reuse_with_different_explain_flag_is_rejected():
+    """?explain changes the response, so it is part of the fingerprint"""
+    import uuid
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import transactions
+    from app.services.agent_runtime import get_agent
+
+    class EchoAgent:
+        async def process_transaction(self, transaction, explain=False):
+            return {'transaction_id': transaction['id'], 'decision': 'APPROVED', 'explained': explain}
+
+    app = FastAPI()
+    app.include_router(transactions.router)
+    app.dependency_overrides[get_agent] = EchoAgent
+    client = TestClient(app)
+    payload = {
+        "user_id": "user_001", "amount": 5000, "merchant": "Amazon", "merchant_category": "ECOMMERCE",
+        "device_type": "web", "device_ip": "192.168.1.1", "user_location": {"lat": 19.07, "lon": 72.87},
+    }
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+
+    first = client.post("/api/v1/transactions/process", json=payload, headers=headers)
+    assert first.status_code == 200 and first.json()["explained"] is False
+    retry = client.post("/api/v1/transactions/process", json=payload, headers=headers)
+    assert retry.headers.get("Idempotent-Replayed") == "true"
+
+    explained = client.post("/api/v1/transactions/process?explain=true", json=payload, headers=headers)
+    assert explained.status_code == 422
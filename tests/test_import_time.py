@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import pytest
+from benchmarks.import_time import measure
+
+# Generous default so slow CI machines pass; tighten locally via the env var
+IMPORT_BUDGET_MS = float(os.environ.get("VERIFAI_IMPORT_BUDGET_MS", 2500))
+
+# app.main mounts the auth router, whose AuthService module is not part of this tree
+AUTH_SERVICE_MISSING = importlib.util.find_spec("app.services.auth_service") is None
+
+@pytest.mark.parametrize("module", [
+    "app.api.transactions",
+    pytest.param("app.main", marks=pytest.mark.skipif(
+        AUTH_SERVICE_MISSING, reason="app.main imports app.services.auth_service, which is not in this checkout"
+    )),
+])
+def test_api_import_is_light(module):
+    """Importing the API must not load the ML stack or exceed the budget"""
+    result = measure(module)
+    assert result["heavy_loaded"] == []
+    assert result["total_ms"] < IMPORT_BUDGET_MS
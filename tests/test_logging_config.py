@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import pytest
+from app import logging_config
+from app.config import get_settings
+from app.logging_config import DecisionLogSampler, configure_logging
+
+@pytest.fixture
+def clean_logging(monkeypatch):
+    """Let configure_logging() own the root logger for one test, then put pytest's handlers back"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    monkeypatch.setattr(get_settings(), "LOG_ASYNC", True)
+    monkeypatch.setattr(get_settings(), "LOG_FORMAT", "text")
+    monkeypatch.setattr(logging_config, "_listener", None)
+    yield
+    listener = logging_config._listener
+    if listener is not None and hasattr(listener, "stop"):
+        listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def test_sampler_rates():
+    random.seed(7)
+    sampler = DecisionLogSampler({"APPROVED": 0.1, "HOLD": 1.0, "BLOCKED": 0.0})
+
+    logged = sum(sampler.should_log("APPROVED") for _ in range(10000))
+    assert 850 < logged < 1150
+    assert all(sampler.should_log("HOLD") for _ in range(1000))
+    assert not any(sampler.should_log("BLOCKED") for _ in range(1000))
+    assert sampler.should_log("MANUAL_REVIEW")  # unknown decisions are always logged
+
+def test_sampling_drops_decision_lines_but_keeps_warnings(caplog):
+    """Only the INFO [DECISION] line is sampled; warnings on the scoring path always go out"""
+    from app.services.agent import AgentController
+    from benchmarks.replay import generate_transactions
+
+    agent = AgentController(track_aggregates=False)
+    agent.log_sampler = DecisionLogSampler({"APPROVED": 0.0, "HOLD": 0.0, "BLOCKED": 0.0})
+    agent.model = None  # every transaction now logs a WARNING and scores 0.5
+    transactions = generate_transactions(20, 4)
+
+    async def run():
+        for i, tx in enumerate(transactions):
+            tx['id'] = f"tx_{i}"
+            await agent.process_transaction(tx)
+
+    with caplog.at_level(logging.INFO, logger="app.services.agent"):
+        asyncio.run(run())
+    records = [r for r in caplog.records if r.name == "app.services.agent"]
+    assert not [r for r in records if r.levelno == logging.INFO and "[DECISION]" in r.getMessage()]
+    assert len([r for r in records if r.levelno == logging.WARNING]) == len(transactions)
+
+def test_configure_logging_is_idempotent(clean_logging):
+    configure_logging()
+    listener = logging_config._listener
+    handlers = list(logging.getLogger().handlers)
+    configure_logging()
+
+    assert logging_config._listener is listener
+    assert logging.getLogger().handlers == handlers
+    assert len(handlers) == 1 and isinstance(handlers[0], logging_config.DeferredQueueHandler)
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_logging_restarts_after_fork(clean_logging):
+    """A forked child has the queue handler but no listener thread until reset_after_fork()"""
+    configure_logging()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child: log through a rebuilt listener into the pipe, then exit without pytest teardown
+        try:
+            os.close(read_fd)
+            sys.stderr = os.fdopen(write_fd, "w")
+            logging_config.reset_after_fork()
+            assert logging_config._listener._thread.is_alive()
+            logging.getLogger("forked").warning("hello from the child")
+            logging_config._listener.stop()  # drains the queue
+            sys.stderr.flush()
+            os._exit(0)
+        except BaseException:
+            os._exit(1)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        output = pipe.read()
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert "hello from the child" in output
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, User, VerificationToken, VerificationTokenType, AuditLog
+from app.services.maintenance import MaintenanceService
+
+def make_session_factory():
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+def test_purge_verification_tokens_in_batches():
+    """Expired and used tokens are deleted, live ones are kept"""
+    SessionFactory = make_session_factory()
+    now = datetime.utcnow()
+
+    with SessionFactory() as db:
+        db.add(User(id="u1", email="a@example.com", password_hash="x", name="A"))
+        for i in range(7):
+            db.add(VerificationToken(
+                user_id="u1", token=f"expired_{i}",
+                token_type=VerificationTokenType.EMAIL_VERIFY,
+                expires_at=now - timedelta(hours=1)
+            ))
+        db.add(VerificationToken(
+            user_id="u1", token="used", token_type=VerificationTokenType.PASSWORD_RESET,
+            expires_at=now + timedelta(hours=1), is_used=True
+        ))
+        db.add(VerificationToken(
+            user_id="u1", token="live", token_type=VerificationTokenType.PASSWORD_RESET,
+            expires_at=now + timedelta(hours=1)
+        ))
+        db.commit()
+
+    service = MaintenanceService(session_factory=SessionFactory, batch_size=3)
+    assert service.purge_verification_tokens(now=now) == 8
+
+    with SessionFactory() as db:
+        remaining = [t.token for t in db.query(VerificationToken).all()]
+    assert remaining == ["live"]
+
+def test_archive_audit_logs_by_month(tmp_path):
+    """Old audit logs are written to monthly files before deletion"""
+    SessionFactory = make_session_factory()
+    now = datetime(2025, 6, 1)
+
+    with SessionFactory() as db:
+        db.add(AuditLog(event_type="login", event_severity="info", description="old jan",
+                        created_at=datetime(2025, 1, 10)))
+        db.add(AuditLog(event_type="fraud_alert", event_severity="critical", description="old feb",
+                        created_at=datetime(2025, 2, 10)))
+        db.add(AuditLog(event_type="login", event_severity="info", description="recent",
+                        created_at=datetime(2025, 5, 30)))
+        db.commit()
+
+    service = MaintenanceService(
+        session_factory=SessionFactory, batch_size=1,
+        audit_retention_days=30, archive_dir=str(tmp_path)
+    )
+    assert service.archive_audit_logs(now=now) == 2
+
+    with SessionFactory() as db:
+        assert [log.description for log in db.query(AuditLog).all()] == ["recent"]
+
+    jan = (tmp_path / "audit_logs_2025_01.jsonl").read_text().splitlines()
+    assert json.loads(jan[0])["description"] == "old jan"
+    assert (tmp_path / "audit_logs_2025_02.jsonl").exists()
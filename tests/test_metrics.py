@@ -0,0 +1,21 @@
+from app.services.metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    decisions = registry.register(Counter("t_decisions_total", "Decisions", ["decision"]))
+    depth = registry.register(Gauge("t_queue_depth", "Queue depth"))
+    latency = registry.register(Histogram("t_latency_seconds", "Latency", ["phase"], buckets=(0.01, 0.1)))
+
+    decisions.inc("APPROVED")
+    decisions.inc("APPROVED")
+    depth.set_function(lambda: 3)
+    for value in (0.005, 0.05, 0.5):
+        latency.observe(value, "REASON")
+
+    text = registry.render()
+    assert 't_decisions_total{decision="APPROVED"} 2.0' in text
+    assert "t_queue_depth 3.0" in text
+    assert 't_latency_seconds_bucket{phase="REASON",le="0.01"} 1' in text
+    assert 't_latency_seconds_bucket{phase="REASON",le="0.1"} 2' in text
+    assert 't_latency_seconds_bucket{phase="REASON",le="+Inf"} 3' in text
+    assert 't_latency_seconds_count{phase="REASON"} 3' in text
@@ -0,0 +1,44 @@
+import json
+import os
+from app.services.policy import PolicyEngine, APPROVE, HOLD, BLOCK, risk_level
+
+def test_default_thresholds_from_settings():
+    engine = PolicyEngine(rules_path="")
+    codes = engine.decide([0.1, 0.5, 0.79, 0.8], ["FOOD"] * 4, [100] * 4)
+    assert list(codes) == [APPROVE, HOLD, HOLD, BLOCK]
+
+def test_rule_table_first_match_and_hot_reload(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps({"rules": [
+        {"name": "crypto", "merchant_category": ["CRYPTO"], "block": 0.70, "hold": 0.40},
+        {"name": "large", "min_amount": 100000, "hold": 0.30},
+    ]}))
+    engine = PolicyEngine(rules_path=str(rules_path), reload_interval=0)
+
+    codes = engine.decide(
+        [0.72, 0.45, 0.35, 0.35, 0.72],
+        ["crypto", "CRYPTO", "FOOD", "FOOD", "FOOD"],
+        [500, 500, 150000, 500, 500]
+    )
+    assert list(codes) == [BLOCK, HOLD, HOLD, APPROVE, HOLD]
+
+    rules_path.write_text(json.dumps({"rules": []}))
+    os.utime(rules_path, (1, 1))
+    assert engine.decide_one(0.72, "CRYPTO", 500) == HOLD
+
+def test_risk_level_follows_the_rule_that_decided(tmp_path):
+    """A crypto block at 0.72 is CRITICAL, a large-amount approval at 0.6 is not MEDIUM"""
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps({"rules": [
+        {"name": "crypto", "merchant_category": ["CRYPTO"], "block": 0.70, "hold": 0.40},
+        {"name": "trusted", "max_amount": 1000, "block": 0.95, "hold": 0.65},
+    ]}))
+    engine = PolicyEngine(rules_path=str(rules_path), reload_interval=0)
+
+    scores, categories, amounts = [0.72, 0.45, 0.6, 0.9, 0.1], ["CRYPTO", "CRYPTO", "FOOD", "FOOD", "FOOD"], [5000, 5000, 500, 500, 500]
+    codes = engine.decide(scores, categories, amounts)
+    assert list(codes) == [BLOCK, HOLD, APPROVE, HOLD, APPROVE]
+    assert [risk_level(s, int(c)) for s, c in zip(scores, codes)] == ["CRITICAL", "MEDIUM", "LOW", "MEDIUM", "MINIMAL"]
+
+    # Without a decision the default bands apply
+    assert [risk_level(s) for s in scores] == ["MEDIUM", "LOW", "MEDIUM", "CRITICAL", "MINIMAL"]
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+import statistics
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, UserProfile
+from app.services.profile_store import ProfileState, ProfileStore
+
+def _sessions():
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+def _tx(amount, day, lat=19.076, lon=72.878):
+    return {'amount': amount, 'timestamp': datetime(2026, 1, 1) + timedelta(days=day), 'user_location': {'lat': lat, 'lon': lon}}
+
+def test_profile_is_maintained_and_written_behind():
+    sessions = _sessions()
+    store = ProfileStore(session_factory=sessions)
+    amounts = [100.0, 250.0, 400.0, 1200.0]
+
+    for day, amount in enumerate(amounts):
+        store.observe("user_1", _tx(amount, day), blocked=False)
+    store.observe("user_1", _tx(90000.0, 4, lat=40.7, lon=-74.0), blocked=True)
+    assert store.peek("user_1") is None  # stored row not merged yet
+    assert store.flush() == 1
+
+    profile = store.peek("user_1")
+    all_amounts = amounts + [90000.0]
+    assert profile['transaction_count'] == 5
+    assert profile['blocked_count'] == 1
+    assert profile['avg_transaction_amount'] == round(statistics.mean(all_amounts), 2)
+    assert profile['std_transaction_amount'] == round(statistics.stdev(all_amounts), 2)
+    assert profile['typical_locations'] == [{'lat': 19.08, 'lon': 72.88, 'count': 4}]
+
+    with sessions() as db:
+        row = db.get(UserProfile, "user_1")
+        assert row.transaction_count == 5
+
+def test_partial_profile_merges_with_stored_row():
+    """A fresh process folds its new observations into the profile already in the database"""
+    sessions = _sessions()
+    first = ProfileStore(session_factory=sessions)
+    for day, amount in enumerate([100.0, 200.0, 300.0]):
+        first.observe("user_2", _tx(amount, day), blocked=False)
+    first.flush()
+
+    second = ProfileStore(session_factory=sessions)
+    second.observe("user_2", _tx(1000.0, 9, lat=12.97, lon=77.59), blocked=False)
+    second.flush()
+
+    restarted = ProfileStore(session_factory=sessions)
+    profile = restarted.load("user_2")
+    assert profile['transaction_count'] == 4
+    assert profile['avg_transaction_amount'] == 400.0
+    assert profile['typical_daily_frequency'] == round(4 / 9, 2)
+    assert [loc['count'] for loc in profile['typical_locations']] == [3, 1]
+    assert restarted.load("nobody") is None
+
+def test_workers_writing_the_same_user_add_up():
+    """Two stores (workers) with the same user: no lost update, no primary key conflict"""
+    sessions = _sessions()
+    a, b = ProfileStore(session_factory=sessions), ProfileStore(session_factory=sessions)
+    a_amounts, b_amounts = [100.0, 300.0], [1000.0, 2000.0, 6000.0]
+
+    # Neither has a stored row yet: both flushes insert the same new user
+    for day, amount in enumerate(a_amounts):
+        a.observe("user_3", _tx(amount, day), blocked=False)
+    for day, amount in enumerate(b_amounts):
+        b.observe("user_3", _tx(amount, 10 + day), blocked=day == 0)
+    assert a.flush() == 1
+    assert b.flush() == 1
+
+    # Both now hold a loaded cache entry; later writes must still add up
+    a.observe("user_3", _tx(500.0, 20), blocked=False)
+    b.observe("user_3", _tx(700.0, 21), blocked=False)
+    a.flush()
+    b.flush()
+
+    all_amounts = a_amounts + b_amounts + [500.0, 700.0]
+    profile = ProfileStore(session_factory=sessions).load("user_3")
+    assert profile['transaction_count'] == 7
+    assert profile['blocked_count'] == 1
+    assert profile['avg_transaction_amount'] == round(statistics.mean(all_amounts), 2)
+    assert profile['std_transaction_amount'] == round(statistics.stdev(all_amounts), 2)
+    assert profile['first_seen'] == datetime(2026, 1, 1).isoformat()
+    assert profile['last_updated'] == datetime(2026, 1, 22).isoformat()
+
+def test_failed_batch_falls_back_to_single_rows(monkeypatch):
+    sessions = _sessions()
+    store = ProfileStore(session_factory=sessions, retry_interval_seconds=1)
+    upsert = ProfileStore._upsert
+
+    def reject_bad_user(db, rows):
+        if any(row['user_id'] == "bad" for row in rows):
+            raise ValueError("constraint violated")
+        upsert(db, rows)
+
+    monkeypatch.setattr(store, "_upsert", reject_bad_user)
+    for user_id in ("good_1", "bad", "good_2"):
+        store.observe(user_id, _tx(100.0, 0), blocked=False)
+    assert store.flush() == 2
+    assert store.stats['write_errors'] == 1
+
+    # The unwritten delta is kept and merged with what arrives meanwhile
+    store.observe("bad", _tx(300.0, 1), blocked=False)
+    monkeypatch.setattr(store, "_upsert", upsert)
+    assert store.flush() == 1
+    with sessions() as db:
+        assert db.get(UserProfile, "good_1").transaction_count == 1
+        row = db.get(UserProfile, "bad")
+        assert (row.transaction_count, row.avg_transaction_amount) == (2, 200.0)
+
+def test_read_merge_write_fallback_matches_the_upsert():
+    """Dialects without ON CONFLICT merge the deltas in Python with the same arithmetic"""
+    sessions = _sessions()
+    store = ProfileStore(session_factory=sessions)
+    for day, amount in enumerate([100.0, 300.0]):
+        store.observe("user_4", _tx(amount, day), blocked=False)
+    store.flush()
+
+    later = ProfileState()
+    for day, amount in enumerate([1000.0, 2000.0]):
+        later.observe(amount, (datetime(2026, 1, 10) + timedelta(days=day)).timestamp(), 12.97, 77.59, False, 3)
+    fresh = ProfileState()
+    fresh.observe(50.0, datetime(2026, 1, 5).timestamp(), None, None, True, 3)
+    with sessions() as db:
+        ProfileStore._merge_into_stored(db, [later.to_row("user_4"), fresh.to_row("user_5")])
+        db.commit()
+
+    profile = ProfileStore(session_factory=sessions).load("user_4")
+    all_amounts = [100.0, 300.0, 1000.0, 2000.0]
+    assert profile['transaction_count'] == 4
+    assert profile['avg_transaction_amount'] == round(statistics.mean(all_amounts), 2)
+    assert profile['std_transaction_amount'] == round(statistics.stdev(all_amounts), 2)
+    assert profile['last_updated'] == datetime(2026, 1, 11).isoformat()
+    assert profile['typical_locations'] == [{'lat': 12.97, 'lon': 77.59, 'count': 2}]
+    with sessions() as db:
+        assert db.get(UserProfile, "user_5").blocked_count == 1
+
+def test_pending_deltas_are_bounded_while_the_database_is_down():
+    def unavailable():
+        raise ConnectionError("database is down")
+
+    store = ProfileStore(session_factory=unavailable, max_entries=2)
+    for user_id in ("user_a", "user_b", "user_c"):
+        store.observe(user_id, _tx(100.0, 0), blocked=False)
+    assert store.flush() == 0
+    assert store.stats['write_errors'] == 1
+
+    # The least recently seen user is dropped with its unwritten delta
+    assert store.stats['dropped'] == 1
+    assert list(store._cache) == list(store._deltas) == ["user_b", "user_c"]
+
+def test_profile_route_serves_the_partial_profile_when_the_load_fails(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import users
+
+    def unavailable():
+        raise ConnectionError("database is down")
+
+    store = ProfileStore(session_factory=unavailable)
+    monkeypatch.setattr(users, "get_profile_store", lambda: store)
+    app = FastAPI()
+    app.include_router(users.router)
+    client = TestClient(app)
+
+    assert client.get("/api/v1/users/user_6").status_code == 503
+    store.observe("user_6", _tx(250.0, 0), blocked=False)
+    response = client.get("/api/v1/users/user_6")
+    assert response.status_code == 200
+    assert response.json()['partial'] is True
+    assert response.json()['transaction_count'] == 1
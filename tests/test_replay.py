@@ -0,0 +1,18 @@
+import asyncio
+import logging
+from benchmarks.replay import ERROR_SAMPLES, _drive
+
+def test_failed_submissions_are_counted_and_sampled(caplog):
+    async def submit(tx):
+        if tx % 2:
+            raise ValueError(f"bad payload {tx}")
+
+    with caplog.at_level(logging.WARNING, logger="benchmarks.replay"):
+        result = asyncio.run(_drive(list(range(20)), 4, submit))
+
+    assert result["errors"] == 10
+    assert result["error_rate"] == 0.5
+    assert result["latency"]["count"] == 10
+    assert len(result["error_samples"]) == ERROR_SAMPLES
+    assert result["error_samples"][0] == "ValueError: bad payload 1"
+    assert len(caplog.records) == ERROR_SAMPLES
@@ -0,0 +1,64 @@
+from app.services.rollups import RollupStore
+
+NOW = 1_800_000_000.0
+
+def _record(store, minutes_ago, decision, score, merchant="Store A", category="retail", amount=100.0):
+    store.record(
+        {'decision': decision, 'fraud_score': score},
+        {'merchant': merchant, 'merchant_category': category, 'amount': amount},
+        ts=NOW - minutes_ago * 60
+    )
+
+def test_series_histogram_and_totals():
+    store = RollupStore(minute_buckets=60, hour_buckets=48, max_merchants=2)
+    _record(store, 0, "APPROVED", 0.05)
+    _record(store, 0, "BLOCKED", 0.97, merchant="Shady Ltd", category="crypto", amount=5000.0)
+    _record(store, 5, "HOLD", 0.6, merchant="Shady Ltd", category="crypto")
+    _record(store, 5, "APPROVED", 0.1, merchant="Third Shop")
+    _record(store, 5, "APPROVED", 0.1, merchant="Fourth Shop")  # past the per-bucket merchant cap
+    _record(store, 120, "BLOCKED", 0.9)  # only in the hourly tier
+
+    series = store.decision_series(10 * 60, now=NOW)
+    assert series['bucket_seconds'] == 60
+    assert sum(p['total'] for p in series['points']) == 5
+    assert series['points'][-1]['BLOCKED'] == 1
+    assert series['points'][-1]['amount'] == 5100.0
+
+    histogram = store.score_histogram(10 * 60, now=NOW)
+    assert histogram['total'] == 5
+    assert histogram['counts'][19] == 1 and histogram['counts'][2] == 2
+
+    categories = {row['category']: row for row in store.category_totals(10 * 60, now=NOW)}
+    assert categories['crypto']['count'] == 2 and categories['crypto']['blocked'] == 1
+
+    top = store.top_merchants(10 * 60, now=NOW)
+    assert top[0]['merchant'] == "Shady Ltd" and top[0]['blocked'] == 1
+    assert "Fourth Shop" not in {row['merchant'] for row in top}
+
+    # Beyond the minute ring the hourly tier answers
+    day = store.decision_series(24 * 3600, now=NOW)
+    assert day['bucket_seconds'] == 3600
+    assert sum(p['total'] for p in day['points']) == 6
+
+def test_long_ranges_are_downsampled():
+    store = RollupStore(minute_buckets=1440, hour_buckets=24, max_merchants=10)
+    for minute in range(600):
+        _record(store, minute, "APPROVED", 0.1)
+
+    series = store.decision_series(600 * 60, max_points=50, now=NOW)
+    assert len(series['points']) <= 50
+    assert series['bucket_seconds'] == 60 * 12  # 600 buckets, 12 per point
+    assert sum(p['APPROVED'] for p in series['points']) == 600
+
+def test_window_of_n_buckets_covers_exactly_n():
+    store = RollupStore(minute_buckets=60, hour_buckets=48, max_merchants=10)
+    _record(store, 10, "APPROVED", 0.1)  # one bucket older than the window
+    _record(store, 9, "BLOCKED", 0.9)
+
+    for now in (NOW, NOW + 30):  # on and between bucket boundaries
+        tier = store.tiers[0]
+        ids, _, _ = tier.slots(now - 10 * 60, now)
+        assert len(ids) == 10
+        series = store.decision_series(10 * 60, now=now)
+        assert len(series['points']) == 10
+        assert sum(p['total'] for p in series['points']) == 1
@@ -0,0 +1,36 @@
+import asyncio
+from collections import Counter
+from app.services.sharding import ConsistentHashRing, ShardedScorer
+from benchmarks.replay import generate_transactions
+
+def test_ring_spreads_users_and_moves_few_on_resize():
+    users = [f"user_{i:06d}" for i in range(5000)]
+    four = ConsistentHashRing(4)
+    five = ConsistentHashRing(5)
+
+    spread = Counter(four.node_for(user) for user in users)
+    assert set(spread) == {0, 1, 2, 3}
+    assert min(spread.values()) > 5000 / 4 * 0.6
+
+    moved = sum(four.node_for(user) != five.node_for(user) for user in users)
+    assert moved < 5000 * 0.35
+
+def test_sharded_scorer_scores_through_worker_processes():
+    scorer = ShardedScorer(workers=2)
+    transactions = generate_transactions(40, 6)
+
+    async def run():
+        results = []
+        for i, tx in enumerate(transactions):
+            tx['id'] = f"tx_{i}"
+            results.append(scorer.process_transaction(tx))
+        return await asyncio.gather(*results)
+
+    try:
+        scorer.warm_up()
+        results = asyncio.run(run())
+    finally:
+        scorer.close()
+
+    assert [r['transaction_id'] for r in results] == [f"tx_{i}" for i in range(40)]
+    assert all(r['decision'] in ("APPROVED", "HOLD", "BLOCKED") for r in results)
@@ -0,0 +1,49 @@
+import asyncio
+from app.services.agent import AgentController
+from app.services.state_snapshot import StateSnapshotter
+from benchmarks.replay import generate_transactions
+
+def _agent_with_snapshots(directory):
+    agent = AgentController(track_aggregates=False)
+    agent.snapshots = StateSnapshotter(agent, str(directory), flush_seconds=0.01)
+    return agent
+
+def _state(agent, user_ids, now):
+    return {
+        user_id: (
+            sorted(tx['amount'] for tx in agent.history_store._history.get(user_id, [])),
+            agent.velocity.counts(user_id, now),
+            agent.merchant_index._merchants.get(user_id, (None, None))[1].tolist() if user_id in agent.merchant_index._merchants else None,
+            agent.geo_index._centroids[user_id].tolist() if user_id in agent.geo_index._centroids else None,
+        )
+        for user_id in user_ids
+    }
+
+def test_snapshot_plus_journal_restores_state(tmp_path):
+    agent = _agent_with_snapshots(tmp_path)
+    transactions = generate_transactions(60, 8)
+
+    async def score(batch, prefix):
+        for i, tx in enumerate(batch):
+            tx['id'] = f"{prefix}_{i}"
+            await agent.process_transaction(tx)
+
+    asyncio.run(score(transactions[:40], "before"))
+    seq = agent.snapshots.snapshot()
+    # The arrays were exported when snapshot() returned; updates from here on only reach the journal
+    asyncio.run(score(transactions[40:], "after"))
+    agent.snapshots.wait()
+    assert agent.snapshots.snapshot_seq == seq
+    agent.snapshots.close()
+
+    user_ids = {tx['user_id'] for tx in transactions}
+    now = max(tx['timestamp'] for tx in transactions).timestamp()
+
+    restored = AgentController(track_aggregates=False)
+    restored.snapshots = StateSnapshotter(restored, str(tmp_path))
+    report = restored.snapshots.restore()
+    restored.snapshots.close()
+
+    assert report["snapshot"] == seq
+    assert report["journal_updates"] == 20
+    assert _state(restored, user_ids, now) == _state(agent, user_ids, now)
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from app.services.streaming import FileSink, FileSource, InMemoryBroker, StreamConsumer
+
+class RecordingAgent:
+    def __init__(self):
+        self.seen = []
+        self.active = set()
+
+    async def process_transaction(self, transaction):
+        # Same-user transactions must never overlap
+        assert transaction['user_id'] not in self.active
+        self.active.add(transaction['user_id'])
+        await asyncio.sleep(0)
+        self.active.discard(transaction['user_id'])
+        self.seen.append(transaction['id'])
+        return {'transaction_id': transaction['id'], 'decision': 'APPROVED'}
+
+def _tx(user_id, amount=100.0):
+    return {
+        'user_id': user_id, 'amount': amount, 'merchant': 'Shop', 'merchant_category': 'RETAIL',
+        'device_type': 'mobile', 'device_ip': '10.0.0.1', 'user_location': {'lat': 12.9, 'lon': 77.6},
+    }
+
+def test_micro_batches_commit_after_scoring():
+    broker = InMemoryBroker()
+    for i in range(5):
+        broker.produce("tx", _tx(f"user_{i % 2}"), key=f"user_{i % 2}")
+    broker.produce("tx", {'user_id': 'user_9', 'amount': -1})
+    agent = RecordingAgent()
+    consumer = StreamConsumer(agent, broker.source("tx", "scoring"), broker.sink("decisions"), batch_size=4)
+
+    async def run():
+        assert await consumer.run_once() == 4
+        assert broker.committed("scoring", "tx") == 4
+        assert await consumer.run_once() == 2
+
+    asyncio.run(run())
+    decisions = broker.messages("decisions")
+    assert len(decisions) == 6
+    assert broker.committed("scoring", "tx") == 6
+    assert consumer.processed == 5 and consumer.failed == 1
+    assert 'error' in next(d for d in decisions if d['transaction_id'] == 'tx:0:5')
+
+def test_transient_failure_rescores_from_committed_offset():
+    """An agent outage is not a poison record: nothing is committed and the batch is rescored"""
+    class FlakyAgent(RecordingAgent):
+        def __init__(self):
+            super().__init__()
+            self.outage = True
+
+        async def process_transaction(self, transaction):
+            if transaction['user_id'] == 'user_1' and self.outage:
+                self.outage = False
+                raise ConnectionError("scoring backend unavailable")
+            return await super().process_transaction(transaction)
+
+    broker = InMemoryBroker()
+    for i in range(3):
+        broker.produce("tx", _tx(f"user_{i}"), key=f"user_{i}")
+    agent = FlakyAgent()
+    consumer = StreamConsumer(agent, broker.source("tx", "scoring"), broker.sink("decisions"), retry_backoff_seconds=0)
+
+    async def run():
+        try:
+            await consumer.run_once()
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("transient error was swallowed")
+        assert broker.committed("scoring", "tx") == 0
+        assert await consumer.run_once() == 3
+
+    asyncio.run(run())
+    assert broker.committed("scoring", "tx") == 3
+    assert 'tx:0:1' in agent.seen
+    assert not any('error' in d for d in broker.messages("decisions"))
+    assert consumer.failed == 0
+
+def test_file_source_resumes_from_committed_offset(tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    input_path.write_text("".join(json.dumps(_tx(f"user_{i}")) + "\n" for i in range(3)))
+    output_path = tmp_path / "out.jsonl"
+
+    async def consume(batch_size, batches):
+        source = FileSource(str(input_path))
+        consumer = StreamConsumer(RecordingAgent(), source, FileSink(str(output_path)), batch_size=batch_size)
+        for _ in range(batches):
+            await consumer.run_once()
+        await source.close()
+
+    asyncio.run(consume(batch_size=2, batches=1))
+    asyncio.run(consume(batch_size=10, batches=1))
+
+    ids = [json.loads(line)['transaction_id'] for line in output_path.read_text().splitlines()]
+    assert len(ids) == 3 and len(set(ids)) == 3
+    assert (tmp_path / "in.jsonl.offset").read_text() == "3"
+
+def test_process_batch_matches_one_by_one():
+    """Micro-batch scoring (waves, one model call each) decides exactly like process_transaction"""
+    import copy
+    import numpy as np
+    from app.ml.cascade import PreScreen
+    from app.ml.feature_engineering import FEATURE_COLUMNS
+    from app.services.agent import AgentController
+    from benchmarks.replay import generate_transactions
+
+    transactions = generate_transactions(80, 6)
+    for i, tx in enumerate(transactions):
+        tx['id'] = f"tx_{i}"
+    single, batched = AgentController(track_aggregates=False), AgentController(track_aggregates=False)
+    # A pre-screen on amount_zscore alone, so some rows short-circuit and some reach the model
+    weights = np.zeros(len(FEATURE_COLUMNS))
+    weights[FEATURE_COLUMNS.index('amount_zscore')] = 1.0
+    single.prescreen = batched.prescreen = PreScreen(weights, 0.0, approve_below=0.4)
+
+    async def run():
+        one_by_one = [await single.process_transaction(tx) for tx in copy.deepcopy(transactions)]
+        in_batches = []
+        copies = copy.deepcopy(transactions)
+        for start in range(0, len(copies), 32):
+            in_batches.extend(await batched.process_batch(copies[start:start + 32]))
+        return one_by_one, in_batches
+
+    one_by_one, in_batches = asyncio.run(run())
+    assert [r['transaction_id'] for r in in_batches] == [tx['id'] for tx in transactions]
+    assert [r['decision'] for r in in_batches] == [r['decision'] for r in one_by_one]
+    for a, b in zip(in_batches, one_by_one):
+        assert abs(a['fraud_score'] - b['fraud_score']) < 1e-6